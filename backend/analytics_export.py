@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import sqlite3
+from datetime import datetime
+from backend.database import DB_PATH, init_db
+from backend.clause_store import ingest_missing_versions
+
+
+# ==============================
+# Settings
+# ==============================
+
+EXPORT_DIR = os.environ.get("CDD_EXPORT_DIR", "backend/exports")
+
+# Rows per Parquet write; each batch advances the watermark on its own
+EXPORT_BATCH_SIZE = 50_000
+
+
+def _json_list(value):
+    return json.loads(value) if value else []
+
+
+def _json_dict(value):
+    return [{"category": k, "severity": v} for k, v in json.loads(value).items()] if value else []
+
+
+# ==============================
+# Datasets
+# ==============================
+
+# Each query selects rows past the dataset's watermark, first column the
+# watermark key. Values are converted per column before writing.
+#
+# Exports are append-only, but timeline pairs are not: a pair whose scores
+# change is deleted and re-inserted under a new id, and forget_timeline
+# deletes pairs outright. Each deletion is exported to timeline_retractions
+# under the deleted pair's id; the current timeline is the exported timeline
+# rows without a retraction.
+DATASETS = {
+    "timeline": {
+        "query": """
+            SELECT tp.id, c.name, tp.old_version_id, tp.new_version_id,
+                   tp.from_time, tp.to_time, tp.fast_diff,
+                   tp.structural_drift, tp.semantic_score, tp.escalation_intensity,
+                   tp.irreversible, tp.cdi, tp.category_severity, tp.computed_at
+            FROM timeline_pairs tp
+            JOIN companies c ON c.id = tp.company_id
+            WHERE tp.id > ?
+            ORDER BY tp.id
+            LIMIT ?
+        """,
+        "columns": [
+            ("id", "int64", None),
+            ("company", "string", None),
+            ("old_version_id", "int64", None),
+            ("new_version_id", "int64", None),
+            ("from_time", "string", None),
+            ("to_time", "string", None),
+            ("fast_diff", "bool", bool),
+            ("structural_drift", "float64", None),
+            ("semantic_score", "float64", None),
+            ("escalation_intensity", "float64", None),
+            ("irreversible", "bool", bool),
+            ("cdi", "float64", None),
+            ("category_severity", "category_severity", _json_dict),
+            ("computed_at", "string", None),
+        ],
+        "partition_cols": ["company"],
+    },
+    # One row per timeline pair deleted after it was stored
+    "timeline_retractions": {
+        "query": """
+            SELECT tr.id, tr.pair_id, c.name, tr.old_version_id, tr.new_version_id,
+                   tr.fast_diff, tr.retracted_at
+            FROM timeline_retractions tr
+            JOIN companies c ON c.id = tr.company_id
+            WHERE tr.id > ?
+            ORDER BY tr.id
+            LIMIT ?
+        """,
+        "columns": [
+            ("id", "int64", None),
+            ("pair_id", "int64", None),
+            ("company", "string", None),
+            ("old_version_id", "int64", None),
+            ("new_version_id", "int64", None),
+            ("fast_diff", "bool", bool),
+            ("retracted_at", "string", None),
+        ],
+        "partition_cols": ["company"],
+    },
+    "verdicts": {
+        "query": """
+            SELECT v.rowid, v.clause_hash, c.norm_hash, c.text,
+                   v.risk_score, v.expansion, v.categories, v.reason,
+                   v.prompt_version, v.model, v.created_at
+            FROM llm_verdicts v
+            LEFT JOIN clauses c ON c.hash = v.clause_hash
+            WHERE v.rowid > ?
+            ORDER BY v.rowid
+            LIMIT ?
+        """,
+        "columns": [
+            ("seq", "int64", None),
+            ("clause_hash", "string", None),
+            ("norm_hash", "string", None),
+            ("text", "string", None),
+            ("risk_score", "int64", None),
+            ("expansion", "bool", bool),
+            ("categories", "list<string>", _json_list),
+            ("reason", "string", None),
+            ("prompt_version", "string", None),
+            ("model", "string", None),
+            ("created_at", "string", None),
+        ],
+        "partition_cols": None,
+    },
+    # Every occurrence of a clause carrying expansion signals, per version
+    "signals": {
+        "query": """
+            SELECT vc.version_id, co.name, pv.timestamp, vc.position,
+                   cl.hash, cl.norm_hash, cl.rule_categories, cl.expansion_signals
+            FROM version_clauses vc
+            JOIN clauses cl ON cl.id = vc.clause_id
+            JOIN policy_versions pv ON pv.id = vc.version_id
+            JOIN companies co ON co.id = pv.company_id
+            WHERE vc.version_id > ?
+              AND vc.version_id IN (
+                  SELECT version_id FROM version_clauses
+                  WHERE version_id > ?
+                  GROUP BY version_id
+                  ORDER BY version_id
+                  LIMIT ?
+              )
+              AND cl.expansion_signals != '[]'
+            ORDER BY vc.version_id, vc.position
+        """,
+        "columns": [
+            ("version_id", "int64", None),
+            ("company", "string", None),
+            ("timestamp", "string", None),
+            ("position", "int64", None),
+            ("clause_hash", "string", None),
+            ("norm_hash", "string", None),
+            ("rule_categories", "list<string>", _json_list),
+            ("expansion_signals", "list<string>", _json_list),
+        ],
+        "partition_cols": ["company"],
+        # Batches are whole versions, so a version is never split across watermarks
+        "batch_by_version": True,
+    },
+}
+
+
+def _arrow_type(pa, name):
+    return {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "bool": pa.bool_(),
+        "list<string>": pa.list_(pa.string()),
+        "category_severity": pa.list_(pa.struct([
+            ("category", pa.string()), ("severity", pa.int64()),
+        ])),
+    }[name]
+
+
+# ==============================
+# Watermarks
+# ==============================
+
+def get_watermark(conn, dataset, path):
+    row = conn.execute(
+        "SELECT watermark FROM export_state WHERE dataset=? AND path=?", (dataset, path)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def set_watermark(conn, dataset, path, watermark):
+    conn.execute("""
+        INSERT OR REPLACE INTO export_state (dataset, path, watermark, exported_at)
+        VALUES (?, ?, ?, ?)
+    """, (dataset, path, watermark, datetime.now().isoformat(timespec="seconds")))
+    conn.commit()
+
+
+# ==============================
+# Export
+# ==============================
+
+def _fetch_batch(conn, spec, watermark, batch_size):
+    """(rows, next watermark) for one batch past watermark; rows empty when done."""
+
+    if spec.get("batch_by_version"):
+        last = conn.execute("""
+            SELECT MAX(version_id) FROM (
+                SELECT version_id FROM version_clauses
+                WHERE version_id > ?
+                GROUP BY version_id
+                ORDER BY version_id
+                LIMIT ?
+            )
+        """, (watermark, batch_size)).fetchone()[0]
+        if last is None:
+            return [], watermark
+        # Versions without any signal-bearing clause still advance the watermark
+        rows = conn.execute(spec["query"], (watermark, watermark, batch_size)).fetchall()
+        return rows, last
+
+    rows = conn.execute(spec["query"], (watermark, batch_size)).fetchall()
+    return rows, (rows[-1][0] if rows else watermark)
+
+
+def export_dataset(conn, name, output_dir=EXPORT_DIR, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Append rows computed since the last export of this dataset to
+    <output_dir>/<name>/ as Parquet (hive-partitioned by company where the
+    dataset has one). Returns the number of rows written.
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spec = DATASETS[name]
+    path = os.path.join(output_dir, name)
+    schema = pa.schema([(col, _arrow_type(pa, kind)) for col, kind, _ in spec["columns"]])
+
+    watermark = get_watermark(conn, name, os.path.abspath(path))
+    written = 0
+
+    while True:
+        rows, next_watermark = _fetch_batch(conn, spec, watermark, batch_size)
+        if next_watermark == watermark:
+            break
+
+        if rows:
+            columns = {
+                col: [convert(r[i]) if convert and r[i] is not None else r[i] for r in rows]
+                for i, (col, _, convert) in enumerate(spec["columns"])
+            }
+            table = pa.Table.from_pydict(columns, schema=schema)
+
+            # File names carry the watermark range, so appends never collide
+            pq.write_to_dataset(
+                table,
+                root_path=path,
+                partition_cols=spec["partition_cols"],
+                basename_template=f"part-{watermark + 1}-{next_watermark}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            written += len(rows)
+
+        watermark = next_watermark
+        set_watermark(conn, name, os.path.abspath(path), watermark)
+
+    return written
+
+
+def export_all(output_dir=EXPORT_DIR, datasets=None):
+    """Incremental export of every dataset. Returns {dataset: rows written}."""
+
+    conn = sqlite3.connect(DB_PATH)
+
+    # Signals are read from stored clause sequences; make sure all versions have one
+    ingest_missing_versions(conn)
+
+    counts = {}
+    for name in datasets or DATASETS:
+        counts[name] = export_dataset(conn, name, output_dir)
+
+    conn.close()
+
+    return counts
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "export":
+        init_db()
+        output_dir = sys.argv[2] if len(sys.argv) >= 3 else EXPORT_DIR
+        for name, rows in export_all(output_dir).items():
+            print(f"{name:<20} {rows} new rows -> {os.path.join(output_dir, name)}")
+
+    else:
+        print("Usage: python -m backend.analytics_export export [output_dir]")
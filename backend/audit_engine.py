@@ -1,6 +1,8 @@
 import sys
 from backend.drift_engine import compute_policy_drift
 from backend.timeline_engine import compute_timeline_drift
+from backend.metrics import print_timing_summary
+from backend.profiling import profile_run, print_profile, strip_profile_flags
 
 
 def run_full_audit(company_name):
@@ -13,7 +15,15 @@ def run_full_audit(company_name):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python -m backend.audit_engine <CompanyName>")
+    args, profile_format = strip_profile_flags(sys.argv[1:])
+
+    if len(args) != 1:
+        print("Usage: python -m backend.audit_engine <CompanyName> [--profile[=collapsed|pstats]]")
+    elif profile_format:
+        with profile_run(f"audit-{args[0]}", fmt=profile_format) as profile:
+            run_full_audit(args[0])
+        print_timing_summary()
+        print_profile(profile)
     else:
-        run_full_audit(sys.argv[1])
\ No newline at end of file
+        run_full_audit(args[0])
+        print_timing_summary()
\ No newline at end of file
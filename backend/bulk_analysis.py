@@ -0,0 +1,175 @@
+import os
+import json
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from backend.expansion_signal_engine import analyze_text_signals
+
+
+# ==============================
+# Limits
+# ==============================
+
+MAX_BULK_DOCUMENTS = 500
+MAX_DOCUMENT_CHARS = 200_000
+MAX_BULK_BYTES = 50 * 1024 * 1024
+
+# Analysis is pure-Python regex work, so it runs in processes (threads would
+# share the GIL). Requests with fewer documents than this stay in-process.
+BULK_WORKERS = int(os.environ.get("CDD_BULK_WORKERS", str(os.cpu_count() or 2)))
+BULK_POOL_MIN_DOCUMENTS = 8
+
+
+class BulkRequestError(ValueError):
+    """Raised when a bulk request body is malformed or over its limits."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ==============================
+# Request Parsing
+# ==============================
+
+def _coerce_document(item, index):
+    if isinstance(item, str):
+        return {"id": index, "text": item}
+
+    if isinstance(item, dict):
+        return {"id": item.get("id", index), "text": item.get("text", "")}
+
+    raise BulkRequestError(f"Document {index} must be a string or an object with a 'text' field")
+
+
+def parse_bulk_documents(raw_body, content_type=""):
+    """
+    Accepts either a JSON array (or {"documents": [...]}) or an NDJSON body
+    where each line is one document. Returns a list of {"id", "text"} dicts.
+    """
+
+    if isinstance(raw_body, bytes):
+        raw_body = raw_body.decode("utf-8", errors="ignore")
+
+    body = raw_body.strip()
+    if not body:
+        raise BulkRequestError("No documents provided")
+
+    items = None
+
+    if "ndjson" not in (content_type or "") and body[0] in "[{":
+        try:
+            parsed = json.loads(body)
+        except ValueError:
+            parsed = None
+
+        if isinstance(parsed, list):
+            items = parsed
+        elif isinstance(parsed, dict) and "documents" in parsed:
+            items = parsed["documents"]
+        elif isinstance(parsed, dict):
+            items = [parsed]
+
+    if items is None:
+        items = []
+        for line_number, line in enumerate(body.split("\n"), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise BulkRequestError(f"Invalid JSON on NDJSON line {line_number}")
+
+            if len(items) > MAX_BULK_DOCUMENTS:
+                break
+
+    if not isinstance(items, list):
+        raise BulkRequestError("'documents' must be a list")
+
+    if len(items) > MAX_BULK_DOCUMENTS:
+        raise BulkRequestError(
+            f"Too many documents (limit is {MAX_BULK_DOCUMENTS})", status=413
+        )
+
+    return [_coerce_document(item, i) for i, item in enumerate(items)]
+
+
+# ==============================
+# Analysis
+# ==============================
+
+def _analyze_document(document):
+    text = document["text"]
+
+    if not isinstance(text, str) or not text.strip():
+        return {"id": document["id"], "error": "No text provided"}
+
+    if len(text) > MAX_DOCUMENT_CHARS:
+        return {
+            "id": document["id"],
+            "error": f"Document exceeds {MAX_DOCUMENT_CHARS} characters",
+        }
+
+    return {"id": document["id"], **analyze_text_signals(text)}
+
+
+def _analyze_isolated(document):
+    """One document's result; a failure becomes that document's error."""
+    try:
+        return _analyze_document(document)
+    except Exception as e:
+        return {"id": document["id"], "error": str(e)}
+
+
+# One pool for every request, started on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: workers must not inherit the server's threads and locks
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def analyze_documents(documents, workers=BULK_WORKERS):
+    """
+    Runs every document through the chunk + expansion-signal pipeline on a
+    process pool and yields per-document results in order, each as soon as
+    it and every earlier one are done. If the pool breaks (e.g. a worker is
+    killed), the remaining documents are analyzed in this process.
+    """
+
+    if workers <= 1 or len(documents) < BULK_POOL_MIN_DOCUMENTS:
+        for document in documents:
+            yield _analyze_isolated(document)
+        return
+
+    pool = _get_pool(workers)
+    chunksize = max(1, len(documents) // (workers * 4))
+
+    done = 0
+    try:
+        for result in pool.map(_analyze_isolated, documents, chunksize=chunksize):
+            yield result
+            done += 1
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        for document in documents[done:]:
+            yield _analyze_isolated(document)
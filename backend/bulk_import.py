@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from backend.database import DB_PATH, init_db
+from backend.crawler import generate_hash
+from backend.persistence import upsert_companies
+from backend.clause_store import is_ingested, ingest_version_clauses
+from backend.fingerprint import classify_company_versions
+from backend.versioning import forget_timeline
+
+
+# ==============================
+# Archive Reading
+# ==============================
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def _records_from_file(path):
+    with open(path, "r") as f:
+        if path.endswith(".jsonl") or path.endswith(".ndjson"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        data = json.load(f)
+        if isinstance(data, list):
+            yield from data
+        else:
+            yield data
+
+
+def iter_snapshots(path):
+    """
+    Yields snapshot dicts (company, url, timestamp, text) from a JSONL file
+    or from every .json/.jsonl/.ndjson file under a directory, in name order.
+    """
+
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith((".json", ".jsonl", ".ndjson")):
+                    yield from _records_from_file(os.path.join(root, name))
+    else:
+        yield from _records_from_file(path)
+
+
+def normalize_timestamp(value):
+    """Store timestamps in SQLite's CURRENT_TIMESTAMP format (UTC) so they sort correctly."""
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ==============================
+# Import
+# ==============================
+
+def _write_batch(conn, batch, earliest):
+    """
+    One transaction per batch; re-importing the same snapshot is a no-op.
+    earliest: {company id: timestamp of its oldest inserted version}, updated.
+    """
+
+    with conn:
+        company_ids = upsert_companies(conn, ((r["company"], r["url"]) for r in batch))
+
+        max_before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM policy_versions").fetchone()[0]
+        before = conn.total_changes
+        conn.executemany("""
+            INSERT OR IGNORE INTO policy_versions (company_id, timestamp, hash, content)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (company_ids[r["company"]], r["timestamp"], r["hash"], r["text"])
+            for r in batch
+        ])
+        inserted = conn.total_changes - before
+
+        # Chunk each version once, at import, in the same transaction
+        for r in batch:
+            company_id = company_ids[r["company"]]
+            version_id = conn.execute("""
+                SELECT id FROM policy_versions
+                WHERE company_id=? AND timestamp=? AND hash=?
+            """, (company_id, r["timestamp"], r["hash"])).fetchone()[0]
+            if not is_ingested(conn, version_id):
+                ingest_version_clauses(conn, version_id, r["text"])
+
+            if version_id > max_before and r["timestamp"] < earliest.get(company_id, "9999"):
+                earliest[company_id] = r["timestamp"]
+
+        return inserted
+
+
+def import_snapshots(path, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Ingest historical snapshots in batched transactions.
+
+    Within the archive, a snapshot whose text is identical to the previous
+    snapshot of the same company is skipped (archives usually capture many
+    unchanged days), so records should be chronological per company.
+    Returns (read, inserted, skipped).
+    """
+
+    conn = sqlite3.connect(DB_PATH)
+    # Fewer fsyncs during bulk load; each batch is still atomic
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    last_hash = {}
+    earliest = {}
+    batch = []
+    read = inserted = skipped = 0
+    start = time.perf_counter()
+
+    for record in iter_snapshots(path):
+        read += 1
+
+        text = record.get("text") or record.get("content")
+        if not text or not record.get("company") or not record.get("timestamp"):
+            skipped += 1
+            continue
+
+        hash_value = generate_hash(text)
+        if last_hash.get(record["company"]) == hash_value:
+            skipped += 1
+            continue
+        last_hash[record["company"]] = hash_value
+
+        batch.append({
+            "company": record["company"],
+            "url": record.get("url", ""),
+            "timestamp": normalize_timestamp(record["timestamp"]),
+            "hash": hash_value,
+            "text": text,
+        })
+
+        if len(batch) >= batch_size:
+            inserted += _write_batch(conn, batch, earliest)
+            batch = []
+            print(f"  {read} read, {inserted} inserted ({read / (time.perf_counter() - start):.0f}/s)")
+
+    if batch:
+        inserted += _write_batch(conn, batch, earliest)
+
+    # Snapshots may land anywhere in a company's history: timelines past the
+    # oldest one are stale, and cosmetic flags need a re-walk
+    for company_id, timestamp in earliest.items():
+        forget_timeline(conn, company_id, timestamp)
+    conn.commit()
+
+    cosmetic = 0
+    for (company_id,) in conn.execute("""
+        SELECT id FROM companies WHERE name IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(last_hash)),)).fetchall():
+        cosmetic += classify_company_versions(conn, company_id)
+
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Imported {inserted} versions from {read} snapshots in {elapsed:.1f}s "
+          f"({skipped} skipped, {read - skipped - inserted} already present; "
+          f"{cosmetic} cosmetic revisions in the imported companies).")
+
+    return read, inserted, skipped
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m backend.bulk_import <snapshots.jsonl | directory>")
+    else:
+        init_db()
+        import_snapshots(sys.argv[1])
+        print("Run `python -m backend.clause_index update` to index the imported versions.")
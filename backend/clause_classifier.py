@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+from backend.database import DB_PATH, init_db
+from backend.llm_risk_engine import ALLOWED_CATEGORIES, MODEL_NAME, extract_rule_categories, analyze_clause_with_llm
+from backend.clause_store import clause_hash, embed_clauses
+from backend.metrics import inc
+
+
+# ==============================
+# Settings
+# ==============================
+
+MODEL_PATH = os.environ.get("CDD_CLASSIFIER_PATH", "backend/models/clause_classifier.joblib")
+
+# Minimum predicted probability of "benign" for a clause to skip the LLM
+CONFIDENCE_THRESHOLD = float(os.environ.get("CDD_CLASSIFIER_THRESHOLD", "0.9"))
+
+# LLM verdicts at or below this score, with no expansion or categories, are benign
+BENIGN_MAX_SCORE = 3
+
+# Share of confident clauses still sent to the LLM to keep measuring agreement.
+# Chosen by clause hash, so the same clause is always (or never) audited and
+# reruns give identical verdicts.
+AUDIT_RATE = 0.05
+
+MIN_TRAINING_SAMPLES = 50
+
+CATEGORIES = sorted(ALLOWED_CATEGORIES)
+
+
+def is_benign(verdict):
+    return (
+        verdict["risk_score"] <= BENIGN_MAX_SCORE
+        and not verdict["expansion"]
+        and not verdict["categories"]
+    )
+
+
+def clause_features(text, embedding, rule_categories):
+    """Embedding, rule category flags and a length feature for one clause."""
+    return np.concatenate([
+        np.asarray(embedding, dtype=np.float32),
+        [1.0 if cat in rule_categories else 0.0 for cat in CATEGORIES],
+        [min(len(text), 1000) / 1000],
+    ])
+
+
+# ==============================
+# Model Loading
+# ==============================
+
+_lock = threading.Lock()
+_bundle = None
+_bundle_mtime = None
+
+
+def load_classifier(path=MODEL_PATH):
+    """The trained model bundle, reloaded when the file changes; None if untrained."""
+
+    global _bundle, _bundle_mtime
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _lock:
+        if _bundle is None or mtime != _bundle_mtime:
+            try:
+                import joblib
+                _bundle = joblib.load(path)
+                _bundle_mtime = mtime
+            except Exception as e:
+                print("Classifier load error:", e)
+                return None
+
+        return _bundle
+
+
+# ==============================
+# Tiered Analysis
+# ==============================
+
+def is_audited(text):
+    return int(clause_hash(text)[:8], 16) / 2 ** 32 < AUDIT_RATE
+
+
+def classify_clause(text, embedding, rule_categories, threshold=CONFIDENCE_THRESHOLD):
+    """
+    Returns (local verdict or None, predicted probability of benign).
+    Only clauses with no rule signals can be settled locally, and only when
+    the model is confident they are benign; everything else goes to the LLM.
+    """
+
+    if rule_categories or embedding is None:
+        return None, None
+
+    bundle = load_classifier()
+    if bundle is None:
+        return None, None
+
+    features = clause_features(text, embedding, rule_categories)
+    p_benign = float(bundle["model"].predict_proba([features])[0][bundle["benign_index"]])
+
+    if p_benign < threshold or is_audited(text):
+        return None, p_benign
+
+    return {
+        "risk_score": bundle["benign_score"],
+        "expansion": False,
+        "categories": [],
+        "reason": f"Local classifier: benign (p={p_benign:.2f})",
+        "verdict_source": "classifier",
+        "confidence": round(p_benign, 4),
+    }, p_benign
+
+
+def analyze_clause_tiered(old_clauses, new_clause, old_embeddings=None, new_embedding=None,
+                          threshold=CONFIDENCE_THRESHOLD):
+    """
+    Drop-in for analyze_clause_with_llm: confident benign clauses are
+    settled by the local classifier, the rest escalate to the LLM.
+    """
+
+    rule_categories = extract_rule_categories(new_clause)
+    local, p_benign = classify_clause(new_clause, new_embedding, rule_categories, threshold)
+
+    if local:
+        inc("cdd_classifier_decisions_total", {"decision": "local"})
+        return local
+
+    inc("cdd_classifier_decisions_total", {"decision": "escalated"})
+    result = analyze_clause_with_llm(old_clauses, new_clause, old_embeddings, new_embedding)
+
+    # Escalated clauses the model had an opinion on measure its agreement with the LLM
+    if p_benign is not None and result.get("verdict_source") == "llm":
+        agree = (p_benign >= 0.5) == is_benign(result)
+        inc("cdd_classifier_agreement_total", {"agree": "yes" if agree else "no"})
+
+    return result
+
+
+# ==============================
+# Training
+# ==============================
+
+def load_training_data(conn):
+    """Features and benign labels for every clause with a stored LLM verdict."""
+
+    cursor = conn.execute("""
+        SELECT c.text, v.risk_score, v.expansion, v.categories
+        FROM llm_verdicts v
+        JOIN clauses c ON c.hash = v.clause_hash
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        return np.zeros((0, 0)), np.zeros(0, dtype=int), []
+
+    texts = [r[0] for r in rows]
+    embeddings = embed_clauses(conn, texts)
+
+    features = np.stack([
+        clause_features(text, emb, extract_rule_categories(text))
+        for text, emb in zip(texts, embeddings)
+    ])
+    labels = np.array([
+        int(is_benign({"risk_score": r[1], "expansion": r[2], "categories": json.loads(r[3])}))
+        for r in rows
+    ])
+    scores = [r[1] for r in rows]
+
+    return features, labels, scores
+
+
+def threshold_report(p_benign, labels, has_rules, thresholds=(0.8, 0.9, 0.95, 0.99)):
+    """Escalation rate and agreement of locally settled clauses per threshold."""
+
+    report = {}
+    for threshold in thresholds:
+        local = (p_benign >= threshold) & ~has_rules
+        settled = int(local.sum())
+        report[str(threshold)] = {
+            "escalation_rate": round(1 - settled / len(labels), 4) if len(labels) else 1.0,
+            "local_agreement": round(float(labels[local].mean()), 4) if settled else None,
+        }
+    return report
+
+
+def train_classifier(path=MODEL_PATH, seed=0):
+    """
+    Fit the benign-vs-risky model on cached LLM verdicts and save it.
+    A held-out split reports escalation rate and agreement per threshold
+    before the final model is refit on all data.
+    """
+
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    import joblib
+
+    conn = sqlite3.connect(DB_PATH)
+    features, labels, scores = load_training_data(conn)
+    conn.close()
+
+    if len(labels) < MIN_TRAINING_SAMPLES:
+        print(f"Need at least {MIN_TRAINING_SAMPLES} LLM verdicts to train (have {len(labels)}).")
+        return None
+    if len(set(labels.tolist())) < 2:
+        print("LLM verdicts are all one class; nothing to learn yet.")
+        return None
+
+    def fit(X, y):
+        return LogisticRegression(max_iter=1000, class_weight="balanced").fit(X, y)
+
+    # Rule-flag columns sit right after the embedding
+    rules_start = features.shape[1] - len(CATEGORIES) - 1
+    has_rules = features[:, rules_start:rules_start + len(CATEGORIES)].any(axis=1)
+
+    X_train, X_test, y_train, y_test, _, rules_test = train_test_split(
+        features, labels, has_rules, test_size=0.2, random_state=seed, stratify=labels
+    )
+    held_out = fit(X_train, y_train)
+    benign_index = list(held_out.classes_).index(1)
+    p_test = held_out.predict_proba(X_test)[:, benign_index]
+
+    report = {
+        "samples": len(labels),
+        "benign_share": round(float(labels.mean()), 4),
+        "held_out_accuracy": round(float(((p_test >= 0.5) == y_test).mean()), 4),
+        "thresholds": threshold_report(p_test, y_test, rules_test),
+    }
+
+    model = fit(features, labels)
+    benign_scores = [s for s, label in zip(scores, labels) if label]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump({
+        "model": model,
+        "benign_index": list(model.classes_).index(1),
+        "benign_score": int(round(float(np.median(benign_scores)))),
+        "llm_model": MODEL_NAME,
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "report": report,
+    }, path)
+
+    return report
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "train":
+        init_db()
+        report = train_classifier()
+        if report:
+            print(json.dumps(report, indent=2))
+            print(f"Saved classifier to {MODEL_PATH}")
+
+    elif len(sys.argv) >= 2 and sys.argv[1] == "status":
+        bundle = load_classifier()
+        if bundle is None:
+            print(f"No classifier at {MODEL_PATH}; run `python -m backend.clause_classifier train`.")
+        else:
+            print(f"Trained {bundle['trained_at']} on {bundle['report']['samples']} verdicts "
+                  f"(threshold {CONFIDENCE_THRESHOLD})")
+            print(json.dumps(bundle["report"], indent=2))
+
+    else:
+        print("Usage: python -m backend.clause_classifier train")
+        print("       python -m backend.clause_classifier status")
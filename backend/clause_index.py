@@ -0,0 +1,441 @@
+import sqlite3
+import threading
+import time
+import sys
+from datetime import datetime
+import numpy as np
+from backend.database import DB_PATH, init_db
+from backend.embedding_engine import embed_chunks
+from backend.clause_store import clause_hash, load_version_chunks, embed_clauses, load_clause_signals
+from backend.expansion_signal_engine import EXPANSION_CATEGORIES
+from backend.metrics import stage, record_cache
+
+
+# ==============================
+# Clause Identity
+# ==============================
+
+CATEGORY_BITS = {cat: 1 << i for i, cat in enumerate(EXPANSION_CATEGORIES)}
+
+
+def categories_to_mask(categories):
+    mask = 0
+    for cat in categories:
+        mask |= CATEGORY_BITS.get(cat, 0)
+    return mask
+
+
+def mask_to_categories(mask):
+    return [cat for cat, bit in CATEGORY_BITS.items() if mask & bit]
+
+
+def to_epoch(timestamp):
+    if timestamp is None:
+        return 0
+    return int(datetime.fromisoformat(str(timestamp)).timestamp())
+
+
+# ==============================
+# Incremental Indexing
+# ==============================
+
+def index_version(conn, version_id):
+    """
+    Add every clause of one stored version to the search index.
+    Clauses already indexed for the company only get their first/last seen
+    bounds widened; new ones take their vectors from the shared clause
+    store, so a clause is embedded at most once across all companies.
+    Returns the number of newly indexed clauses.
+    """
+
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT 1 FROM clause_index_versions WHERE version_id=?", (version_id,))
+    if cursor.fetchone():
+        return 0
+
+    cursor.execute("""
+        SELECT company_id, timestamp FROM policy_versions WHERE id=?
+    """, (version_id,))
+    row = cursor.fetchone()
+    if not row:
+        return 0
+
+    company_id, timestamp = row
+    chunks = list(dict.fromkeys(load_version_chunks(conn, version_id)))
+    hashes = [clause_hash(c) for c in chunks]
+
+    known = set()
+    for i in range(0, len(hashes), 500):
+        batch = hashes[i:i + 500]
+        placeholders = ",".join("?" for _ in batch)
+        cursor.execute(f"""
+            SELECT clause_hash FROM clause_index
+            WHERE company_id=? AND clause_hash IN ({placeholders})
+        """, (company_id, *batch))
+        known.update(r[0] for r in cursor.fetchall())
+
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM clause_index")
+    seq = cursor.fetchone()[0]
+
+    new_positions = [i for i, h in enumerate(hashes) if h not in known]
+    record_cache("clause_index", True, len(known))
+    record_cache("clause_index", False, len(new_positions))
+
+    with stage("clause_index.embed_chunks", items=len(new_positions)):
+        new_embeddings = embed_clauses(conn, [chunks[i] for i in new_positions])
+
+    signals = load_clause_signals(conn, [chunks[i] for i in new_positions])
+
+    cursor.executemany("""
+        INSERT INTO clause_index (
+            company_id, clause_hash, text, categories,
+            first_version_id, first_seen, last_version_id, last_seen,
+            embedding, seq
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (
+            company_id, hashes[i], chunks[i],
+            categories_to_mask(signals[chunks[i]][1]),
+            version_id, timestamp, version_id, timestamp,
+            np.asarray(emb, dtype=np.float32).tobytes(), seq,
+        )
+        for i, emb in zip(new_positions, new_embeddings)
+    ])
+
+    cursor.executemany("""
+        UPDATE clause_index SET
+            first_version_id = CASE WHEN ? < first_seen THEN ? ELSE first_version_id END,
+            first_seen = MIN(first_seen, ?),
+            last_version_id = CASE WHEN ? >= last_seen THEN ? ELSE last_version_id END,
+            last_seen = MAX(last_seen, ?),
+            seq = ?
+        WHERE company_id=? AND clause_hash=?
+    """, [
+        (timestamp, version_id, timestamp, timestamp, version_id, timestamp, seq, company_id, h)
+        for h in known
+    ])
+
+    cursor.execute("INSERT INTO clause_index_versions (version_id) VALUES (?)", (version_id,))
+    conn.commit()
+
+    return len(new_positions)
+
+
+def index_missing_versions(conn=None):
+    """Backfill the index with every analyzed (non-cosmetic) version not yet indexed."""
+
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT pv.id FROM policy_versions pv
+        LEFT JOIN clause_index_versions civ ON civ.version_id = pv.id
+        WHERE civ.version_id IS NULL AND pv.cosmetic = 0
+        ORDER BY pv.timestamp ASC, pv.id ASC
+    """)
+    version_ids = [r[0] for r in cursor.fetchall()]
+
+    embedded = 0
+    for version_id in version_ids:
+        embedded += index_version(conn, version_id)
+
+    if own_conn:
+        conn.close()
+
+    return len(version_ids), embedded
+
+
+def reindex_company(conn, company_id):
+    """
+    Rebuild a company's index rows from its analyzed versions, e.g. after
+    their stored text was rewritten. Returns the number of indexed clauses.
+    """
+
+    top_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM clause_index").fetchone()[0]
+
+    conn.execute("DELETE FROM clause_index WHERE company_id=?", (company_id,))
+    conn.execute("""
+        DELETE FROM clause_index_versions
+        WHERE version_id IN (SELECT id FROM policy_versions WHERE company_id=?)
+    """, (company_id,))
+
+    version_ids = [r[0] for r in conn.execute("""
+        SELECT id FROM policy_versions
+        WHERE company_id=? AND cosmetic=0
+        ORDER BY timestamp ASC, id ASC
+    """, (company_id,)).fetchall()]
+
+    indexed = 0
+    for version_id in version_ids:
+        indexed += index_version(conn, version_id)
+
+    # seq restarts below the deleted rows' values; loaded search indexes only
+    # pick up rows above the highest seq they have seen
+    top_seq = max(top_seq, conn.execute("SELECT COALESCE(MAX(seq), 0) FROM clause_index").fetchone()[0])
+    conn.execute("UPDATE clause_index SET seq=? WHERE company_id=?", (top_seq + 1, company_id))
+    conn.commit()
+
+    return indexed
+
+
+# ==============================
+# In-Memory Search
+# ==============================
+
+# Seconds a loaded index serves searches before checking the table again
+SEARCH_REFRESH_INTERVAL = 5
+
+# Share of dropped rows (e.g. after reindex_company) that triggers a compaction
+COMPACT_FRACTION = 0.25
+
+_INT_COLUMNS = ("ids", "company_ids", "first_seen", "last_seen", "category_masks")
+
+
+class ClauseSearchIndex:
+    """
+    Dense in-memory copy of clause_index: one contiguous float32 matrix plus
+    numpy metadata columns, so filters are vector masks and top-k is a single
+    matrix-vector product with argpartition.
+    Refreshes incrementally from the table's seq counter; rows deleted from
+    the table are masked out, and compacted away once they are
+    COMPACT_FRACTION of the matrix.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.size = 0
+        self.dead = 0
+        self.refreshed_at = None
+        self.loaded_seq = 0
+        self.max_row_id = 0
+        self.row_ids = {}
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.company_ids = np.zeros(0, dtype=np.int64)
+        self.first_seen = np.zeros(0, dtype=np.int64)
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.category_masks = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.companies = {}
+
+    @property
+    def indexed(self):
+        """Number of clauses searches can return."""
+        return self.size - self.dead
+
+    def _grow(self, needed, dim):
+        capacity = len(self.ids)
+        if self.size + needed <= capacity and self.embeddings.shape[1] == dim:
+            return
+
+        new_capacity = max(1024, capacity * 2, self.size + needed)
+
+        embeddings = np.zeros((new_capacity, dim), dtype=np.float32)
+        if self.size:
+            embeddings[:self.size] = self.embeddings[:self.size]
+        self.embeddings = embeddings
+
+        for name in _INT_COLUMNS:
+            column = np.zeros(new_capacity, dtype=np.int64)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        self.alive = alive
+
+    def _evict(self, live_ids, newest):
+        """
+        Mask out loaded rows up to id newest that are missing from live_ids,
+        compacting if enough are gone. Rows above newest were inserted after
+        live_ids was read (and loaded by a concurrent refresh).
+        """
+
+        for row_id in [r for r in self.row_ids if r not in live_ids and r <= newest]:
+            self.alive[self.row_ids.pop(row_id)] = False
+            self.dead += 1
+
+        if self.dead <= self.size * COMPACT_FRACTION:
+            return
+
+        keep = np.flatnonzero(self.alive[:self.size])
+        self.embeddings = self.embeddings[keep]
+        for name in _INT_COLUMNS:
+            setattr(self, name, getattr(self, name)[keep])
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.size = len(keep)
+        self.dead = 0
+        self.row_ids = {int(row_id): pos for pos, row_id in enumerate(self.ids)}
+
+    def refresh(self):
+        known_row_id = self.max_row_id
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id, name FROM companies")
+        companies = dict(cursor.fetchall())
+
+        cursor.execute("""
+            SELECT id, company_id, categories, first_seen, last_seen, seq,
+                   CASE WHEN id > ? THEN embedding END
+            FROM clause_index
+            WHERE seq > ?
+            ORDER BY id
+        """, (self.max_row_id, self.loaded_seq))
+        rows = cursor.fetchall()
+
+        # Fewer rows in the table than loaded: some were deleted (reindex)
+        cursor.execute("SELECT COUNT(*) FROM clause_index")
+        live_ids = None
+        if cursor.fetchone()[0] < self.indexed + sum(r[0] not in self.row_ids for r in rows):
+            cursor.execute("SELECT id FROM clause_index")
+            live_ids = {r[0] for r in cursor.fetchall()}
+            newest = max([known_row_id, *live_ids, *(r[0] for r in rows)])
+        conn.close()
+
+        with self.lock:
+            self.companies = companies
+
+            new_rows = [r for r in rows if r[0] not in self.row_ids]
+            if new_rows:
+                dim = len(new_rows[0][6]) // 4
+                self._grow(len(new_rows), dim)
+
+            for row_id, company_id, categories, first_seen, last_seen, seq, embedding in rows:
+                pos = self.row_ids.get(row_id)
+                if pos is None:
+                    pos = self.size
+                    self.size += 1
+                    self.row_ids[row_id] = pos
+                    self.ids[pos] = row_id
+                    self.alive[pos] = True
+                    self.embeddings[pos] = np.frombuffer(embedding, dtype=np.float32)
+                    self.max_row_id = max(self.max_row_id, row_id)
+
+                self.company_ids[pos] = company_id
+                self.category_masks[pos] = categories
+                self.first_seen[pos] = to_epoch(first_seen)
+                self.last_seen[pos] = to_epoch(last_seen)
+                self.loaded_seq = max(self.loaded_seq, seq)
+
+            if live_ids is not None:
+                self._evict(live_ids, newest)
+
+            self.refreshed_at = time.monotonic()
+
+    def search(self, query, k=10, companies=None, since=None, until=None, categories=None):
+        """
+        Top-k clauses by cosine similarity to the query.
+        since/until filter on when the clause first appeared in a company's policy.
+        """
+
+        query_embedding = np.asarray(embed_chunks([query])[0], dtype=np.float32)
+
+        with stage("clause_index.search"), self.lock:
+            n = self.size
+            if n == 0:
+                return []
+
+            mask = self.alive[:n].copy()
+
+            if companies:
+                name_to_id = {name: cid for cid, name in self.companies.items()}
+                wanted = [name_to_id[c] for c in companies if c in name_to_id]
+                mask &= np.isin(self.company_ids[:n], wanted)
+
+            if since:
+                mask &= self.first_seen[:n] >= to_epoch(since)
+            if until:
+                mask &= self.first_seen[:n] <= to_epoch(until)
+
+            if categories:
+                mask &= (self.category_masks[:n] & categories_to_mask(categories)) != 0
+
+            candidates = np.flatnonzero(mask)
+            if len(candidates) == 0:
+                return []
+
+            if len(candidates) == n:
+                scores = self.embeddings[:n] @ query_embedding
+            else:
+                scores = self.embeddings[candidates] @ query_embedding
+
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            hits = [(int(self.ids[candidates[i]]), float(scores[i])) for i in top]
+            company_names = dict(self.companies)
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        placeholders = ",".join("?" for _ in hits)
+        cursor.execute(f"""
+            SELECT id, company_id, text, categories,
+                   first_version_id, first_seen, last_version_id, last_seen
+            FROM clause_index WHERE id IN ({placeholders})
+        """, [row_id for row_id, _ in hits])
+        details = {r[0]: r for r in cursor.fetchall()}
+        conn.close()
+
+        results = []
+        for row_id, score in hits:
+            r = details.get(row_id)
+            if r is None:
+                continue  # dropped since it was loaded (company reindexed)
+            results.append({
+                "score": round(score, 4),
+                "company": company_names.get(r[1]),
+                "text": r[2],
+                "expansion_signals": mask_to_categories(r[3]),
+                "first_version_id": r[4],
+                "first_seen": r[5],
+                "last_version_id": r[6],
+                "last_seen": r[7],
+            })
+
+        return results
+
+
+_search_index = None
+
+
+def get_search_index(max_age=SEARCH_REFRESH_INTERVAL):
+    """The shared index, refreshed if it was last refreshed over max_age seconds ago."""
+
+    global _search_index
+    if _search_index is None:
+        _search_index = ClauseSearchIndex()
+    index = _search_index
+    if index.refreshed_at is None or time.monotonic() - index.refreshed_at >= max_age:
+        index.refresh()
+    return index
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "update":
+        init_db()
+        versions, embedded = index_missing_versions()
+        print(f"Indexed {versions} versions ({embedded} new clauses).")
+
+    elif len(sys.argv) >= 3 and sys.argv[1] == "search":
+        index = get_search_index()
+        start = time.perf_counter()
+        hits = index.search(" ".join(sys.argv[2:]))
+        print(f"{len(hits)} results in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+        for hit in hits:
+            print(f"[{hit['score']}] {hit['company']} ({hit['first_seen']}): {hit['text']}")
+
+    else:
+        print("Usage: python -m backend.clause_index update")
+        print("       python -m backend.clause_index search <query>")
@@ -0,0 +1,791 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import difflib
+import numpy as np
+from backend.database import DB_PATH, init_db
+from backend.versioning import get_company_versions
+from backend.text_processing import normalize_text
+from backend.chunking import chunk_text
+from backend.embedding_engine import embed_chunks, compute_similarity_matrix
+from backend.similarity_engine import match_clauses, MODIFIED_THRESHOLD
+from backend.llm_risk_engine import extract_rule_categories
+from backend.expansion_signal_engine import extract_expansion_signals
+from backend.metrics import stage, record_cache
+
+
+# ==============================
+# Clause Identity
+# ==============================
+
+# SQLite caps bound parameters per statement; stay well below it
+_IN_CLAUSE_LIMIT = 500
+
+
+def clause_hash(clause):
+    return hashlib.sha256(clause.encode("utf-8")).hexdigest()
+
+
+def normalize_clause(clause):
+    """
+    Case and whitespace folded. The embedding model is uncased, so clauses
+    that only differ this way get identical vectors and share one verdict.
+    """
+    return " ".join(clause.lower().split())
+
+
+def normalized_hash(clause):
+    return clause_hash(normalize_clause(clause))
+
+
+def _insert_clauses(conn, texts):
+    """texts: {hash: text}. Adds unseen clauses with their normalized hash and rule signals."""
+
+    conn.executemany("""
+        INSERT OR IGNORE INTO clauses (hash, text, norm_hash, rule_categories, expansion_signals)
+        VALUES (?, ?, ?, ?, ?)
+    """, [
+        (
+            h, text, normalized_hash(text),
+            json.dumps(extract_rule_categories(text)),
+            json.dumps(extract_expansion_signals(text)),
+        )
+        for h, text in texts.items()
+    ])
+
+
+def fill_clause_signals(conn):
+    """Backfill normalized hashes and rule signals of clauses stored before they existed. Commits."""
+
+    rows = conn.execute("SELECT hash, text FROM clauses WHERE norm_hash IS NULL").fetchall()
+
+    conn.executemany("""
+        UPDATE clauses SET norm_hash=?, rule_categories=?, expansion_signals=?
+        WHERE hash=?
+    """, [
+        (
+            normalized_hash(text),
+            json.dumps(extract_rule_categories(text)),
+            json.dumps(extract_expansion_signals(text)),
+            h,
+        )
+        for h, text in rows
+    ])
+    conn.commit()
+
+    return len(rows)
+
+
+def _clause_ids(conn, hashes):
+    """{hash: clause id} for hashes already in the clauses table."""
+
+    ids = {}
+    hashes = list(hashes)
+    for i in range(0, len(hashes), _IN_CLAUSE_LIMIT):
+        batch = hashes[i:i + _IN_CLAUSE_LIMIT]
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(
+            f"SELECT hash, id FROM clauses WHERE hash IN ({placeholders})", batch
+        )
+        ids.update(cursor.fetchall())
+    return ids
+
+
+# ==============================
+# Ingest
+# ==============================
+
+def is_ingested(conn, version_id):
+    cursor = conn.execute(
+        "SELECT 1 FROM clause_store_versions WHERE version_id=?", (version_id,)
+    )
+    return cursor.fetchone() is not None
+
+
+def ingest_version_clauses(conn, version_id, content=None):
+    """
+    Normalize and chunk one version once, storing each clause by hash and
+    the version's clause sequence in version_clauses.
+    Does not commit, so crawl writes can include it in their transaction.
+    Returns the version's chunks.
+    """
+
+    if content is None:
+        row = conn.execute(
+            "SELECT content FROM policy_versions WHERE id=?", (version_id,)
+        ).fetchone()
+        if not row:
+            return []
+        content = row[0]
+
+    chunks = chunk_text(normalize_text(content))
+    hashes = [clause_hash(c) for c in chunks]
+
+    _insert_clauses(conn, dict(zip(hashes, chunks)))
+    ids = _clause_ids(conn, set(hashes))
+
+    conn.execute("DELETE FROM version_clauses WHERE version_id=?", (version_id,))
+    conn.executemany("""
+        INSERT INTO version_clauses (version_id, position, clause_id)
+        VALUES (?, ?, ?)
+    """, [(version_id, position, ids[h]) for position, h in enumerate(hashes)])
+
+    conn.execute(
+        "INSERT OR IGNORE INTO clause_store_versions (version_id) VALUES (?)", (version_id,)
+    )
+
+    return chunks
+
+
+def forget_versions(conn, version_ids):
+    """Drop stored clause sequences (e.g. after a version's text is rewritten). Does not commit."""
+
+    conn.executemany(
+        "DELETE FROM version_clauses WHERE version_id=?", [(v,) for v in version_ids]
+    )
+    conn.executemany(
+        "DELETE FROM clause_store_versions WHERE version_id=?", [(v,) for v in version_ids]
+    )
+
+
+def ingest_missing_versions(conn=None):
+    """Backfill clause storage for every version stored before it existed."""
+
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT pv.id FROM policy_versions pv
+        LEFT JOIN clause_store_versions csv ON csv.version_id = pv.id
+        WHERE csv.version_id IS NULL
+        ORDER BY pv.id
+    """)
+    version_ids = [r[0] for r in cursor.fetchall()]
+
+    clauses = 0
+    for version_id in version_ids:
+        clauses += len(ingest_version_clauses(conn, version_id))
+        conn.commit()
+
+    fill_clause_signals(conn)
+
+    if own_conn:
+        conn.close()
+
+    return len(version_ids), clauses
+
+
+# ==============================
+# Reads
+# ==============================
+
+def load_clause_signals(conn, clauses):
+    """{clause text: (rule categories, expansion signals)} as stored at insert."""
+
+    texts = {clause_hash(c): c for c in clauses}
+    signals = {}
+    hashes = list(texts)
+    for i in range(0, len(hashes), _IN_CLAUSE_LIMIT):
+        batch = hashes[i:i + _IN_CLAUSE_LIMIT]
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(f"""
+            SELECT hash, rule_categories, expansion_signals FROM clauses
+            WHERE hash IN ({placeholders}) AND norm_hash IS NOT NULL
+        """, batch)
+        signals.update(
+            (texts[h], (json.loads(rules), json.loads(expansion)))
+            for h, rules, expansion in cursor.fetchall()
+        )
+
+    # Rows from before signals were stored
+    for clause in texts.values():
+        if clause not in signals:
+            signals[clause] = (extract_rule_categories(clause), extract_expansion_signals(clause))
+
+    return signals
+
+
+def load_version_chunks(conn, version_id):
+    """
+    A version's clauses in document order, read from version_clauses.
+    Versions stored before clause storage existed are ingested on first use.
+    """
+
+    if not is_ingested(conn, version_id):
+        chunks = ingest_version_clauses(conn, version_id)
+        conn.commit()
+        return chunks
+
+    cursor = conn.execute("""
+        SELECT c.text FROM version_clauses vc
+        JOIN clauses c ON c.id = vc.clause_id
+        WHERE vc.version_id=?
+        ORDER BY vc.position
+    """, (version_id,))
+    return [r[0] for r in cursor.fetchall()]
+
+
+def diff_versions(conn, old_id, new_id):
+    """
+    Exact clause-level diff of two ingested versions, computed in SQLite.
+    Returns counts of shared clauses plus the removed and added clauses
+    (with their positions), without loading either version's content.
+    """
+
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT clause_id FROM version_clauses WHERE version_id=?
+            INTERSECT
+            SELECT clause_id FROM version_clauses WHERE version_id=?
+        )
+    """, (old_id, new_id))
+    shared = cursor.fetchone()[0]
+
+    def only_in(version_id, other_id):
+        cursor.execute("""
+            SELECT vc.position, c.text FROM version_clauses vc
+            JOIN clauses c ON c.id = vc.clause_id
+            WHERE vc.version_id=?
+              AND vc.clause_id NOT IN (
+                  SELECT clause_id FROM version_clauses WHERE version_id=?
+              )
+            ORDER BY vc.position
+        """, (version_id, other_id))
+        return [{"position": p, "text": t} for p, t in cursor.fetchall()]
+
+    removed = only_in(old_id, new_id)
+    added = only_in(new_id, old_id)
+
+    return {
+        "old_version_id": old_id,
+        "new_version_id": new_id,
+        "shared": shared,
+        "removed": removed,
+        "added": added,
+    }
+
+
+def exact_matches(conn, old_id, new_id):
+    """
+    {old position: first new position} for old clauses whose exact text is
+    still present in the new version.
+    """
+
+    cursor = conn.execute("""
+        SELECT o.position, MIN(n.position)
+        FROM version_clauses o
+        JOIN version_clauses n ON n.clause_id = o.clause_id AND n.version_id=?
+        WHERE o.version_id=?
+        GROUP BY o.position
+    """, (new_id, old_id))
+    return dict(cursor.fetchall())
+
+
+def compute_clause_diff(company_name, old_id=None, new_id=None):
+    """
+    Exact clause diff between two versions of a company (default: earliest
+    vs latest). Returns (result, error) where error is (message, status).
+    """
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT id FROM companies WHERE name=?", (company_name,))
+        company = cursor.fetchone()
+        if not company:
+            return None, ("Company not found", 404)
+
+        versions = dict(get_company_versions(cursor, company[0]))
+        if len(versions) < 2:
+            return None, ("Not enough versions for comparison", 400)
+
+        ordered = list(versions)
+        old_id = ordered[0] if old_id is None else old_id
+        new_id = ordered[-1] if new_id is None else new_id
+
+        if old_id not in versions or new_id not in versions:
+            return None, ("Version not found", 404)
+
+        for version_id in (old_id, new_id):
+            if not is_ingested(conn, version_id):
+                ingest_version_clauses(conn, version_id)
+        conn.commit()
+
+        with stage("clause_store.diff"):
+            diff = diff_versions(conn, old_id, new_id)
+
+        return {
+            "company": company_name,
+            "old_version_date": versions[old_id],
+            "new_version_date": versions[new_id],
+            **diff,
+        }, None
+
+    finally:
+        conn.close()
+
+
+# ==============================
+# Embedding Cache
+# ==============================
+
+def embed_clauses(conn, chunks, memo=None):
+    """
+    Embeddings for chunks, in order. Each distinct clause is embedded once
+    ever; the vector is kept on its clauses row and reused afterwards, also
+    for clauses of any company that only differ in case or whitespace.
+    memo ({hash: vector}) is checked before SQLite and filled with every
+    vector returned, so callers walking a sequence can carry vectors over.
+    """
+
+    if not chunks:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    hashes = [clause_hash(c) for c in chunks]
+    texts = dict(zip(hashes, chunks))
+
+    cached = {h: memo[h] for h in texts if h in memo} if memo else {}
+    unique = [h for h in texts if h not in cached]
+
+    if unique:
+        _insert_clauses(conn, {h: texts[h] for h in unique})
+
+    for i in range(0, len(unique), _IN_CLAUSE_LIMIT):
+        batch = unique[i:i + _IN_CLAUSE_LIMIT]
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(f"""
+            SELECT hash, embedding FROM clauses
+            WHERE hash IN ({placeholders}) AND embedding IS NOT NULL
+        """, batch)
+        cached.update(
+            (h, np.frombuffer(blob, dtype=np.float32)) for h, blob in cursor.fetchall()
+        )
+
+    missing = [h for h in unique if h not in cached]
+
+    # Variants of an already embedded clause take its vector
+    shared = _embeddings_by_normalized_hash(conn, {normalized_hash(texts[h]) for h in missing})
+    reused = {
+        h: shared[normalized_hash(texts[h])]
+        for h in missing if normalized_hash(texts[h]) in shared
+    }
+    missing = [h for h in missing if h not in reused]
+
+    record_cache("clause_embeddings", True, len(texts) - len(missing))
+    record_cache("clause_embeddings", False, len(missing))
+
+    if missing:
+        with stage("clause_store.embed_chunks", items=len(missing)):
+            vectors = np.asarray(embed_chunks([texts[h] for h in missing]), dtype=np.float32)
+        reused.update(zip(missing, vectors))
+
+    if reused:
+        conn.executemany(
+            "UPDATE clauses SET embedding=? WHERE hash=?",
+            [(v.tobytes(), h) for h, v in reused.items()],
+        )
+        cached.update(reused)
+
+    if unique:
+        conn.commit()
+
+    if memo is not None:
+        memo.update(cached)
+
+    return np.stack([cached[h] for h in hashes])
+
+
+def _embeddings_by_normalized_hash(conn, norm_hashes):
+    found = {}
+    norm_hashes = list(norm_hashes)
+    for i in range(0, len(norm_hashes), _IN_CLAUSE_LIMIT):
+        batch = norm_hashes[i:i + _IN_CLAUSE_LIMIT]
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(f"""
+            SELECT norm_hash, embedding FROM clauses
+            WHERE norm_hash IN ({placeholders}) AND embedding IS NOT NULL
+        """, batch)
+        found.update(
+            (h, np.frombuffer(blob, dtype=np.float32)) for h, blob in cursor.fetchall()
+        )
+    return found
+
+
+# ==============================
+# LLM Verdicts
+# ==============================
+
+# Reuse a stored verdict for any clause that normalizes to the same text,
+# whichever company or version it came from. The verdict was given with
+# that other version's old clauses as prompt context; reuse ignores the
+# context, trading it for skipped LLM calls.
+REUSE_VERDICTS = os.environ.get("CDD_REUSE_VERDICTS", "1") != "0"
+
+
+def verdict_snapshot(conn):
+    """
+    Current database time. A run passes it to load_verdicts as `before`, so
+    it only reuses verdicts stored before it started, never ones its own
+    parallel workers happen to store first.
+    """
+    return conn.execute("SELECT CURRENT_TIMESTAMP").fetchone()[0]
+
+
+def load_verdicts(conn, clauses, model=None, prompt_version=None, before=None):
+    """
+    Stored LLM verdicts for clauses, as {clause text: result} shaped like
+    analyze_clause_with_llm output (verdict_source "store").
+    Only verdicts from the same model and prompt version, and stored
+    before `before` (see verdict_snapshot) if given, are reused.
+    """
+
+    if not REUSE_VERDICTS or not clauses:
+        return {}
+
+    by_norm = {}
+    for clause in clauses:
+        by_norm.setdefault(normalized_hash(clause), []).append(clause)
+
+    found = {}
+    norm_hashes = list(by_norm)
+    for i in range(0, len(norm_hashes), _IN_CLAUSE_LIMIT):
+        batch = norm_hashes[i:i + _IN_CLAUSE_LIMIT]
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(f"""
+            SELECT c.norm_hash, v.risk_score, v.expansion, v.categories, v.reason
+            FROM llm_verdicts v
+            JOIN clauses c ON c.hash = v.clause_hash
+            WHERE c.norm_hash IN ({placeholders}) AND v.model IS ? AND v.prompt_version IS ?
+              AND (? IS NULL OR v.created_at < ?)
+            ORDER BY v.created_at
+        """, (*batch, model, prompt_version, before, before))
+
+        for norm_hash, risk_score, expansion, categories, reason in cursor.fetchall():
+            for clause in by_norm[norm_hash]:
+                found[clause] = {
+                    "risk_score": risk_score,
+                    "expansion": bool(expansion),
+                    "categories": json.loads(categories),
+                    "reason": reason,
+                    "prompt_version": prompt_version,
+                    "prompt_tokens": 0,
+                    "verdict_source": "store",
+                }
+
+    record_cache("llm_verdicts", True, len(found))
+    record_cache("llm_verdicts", False, len(set(clauses)) - len(found))
+
+    return found
+
+
+def store_verdicts(conn, verdicts, model=None):
+    """
+    verdicts: iterable of (clause text, result) from analyze_clause_with_llm.
+    Keeps the latest successful LLM verdict per clause. Commits.
+    """
+
+    rows = [
+        (
+            clause_hash(clause), int(result["risk_score"]), int(bool(result["expansion"])),
+            json.dumps(sorted(result["categories"])), result.get("reason", ""),
+            result.get("prompt_version"), model,
+        )
+        for clause, result in verdicts
+        if result.get("verdict_source") == "llm"
+    ]
+
+    conn.executemany("""
+        INSERT OR REPLACE INTO llm_verdicts (
+            clause_hash, risk_score, expansion, categories, reason, prompt_version, model
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+
+    return len(rows)
+
+
+def store_pair_outputs(conn, old_id, new_id, fast_diff, old_count, new_count, match, verdicts):
+    """
+    Keep the raw outcome of one analyzed pair: each old clause's best
+    similarity and best new index (from compare_versions), and the verdict
+    (risk score, categories) of every unmatched new clause, as (position,
+    result) pairs. Enough to rescore the pair without embeddings or the LLM.
+    Doesn't commit.
+    """
+
+    conn.execute("""
+        INSERT OR REPLACE INTO pair_outputs (
+            old_version_id, new_version_id, fast_diff, old_count, new_count,
+            best_scores, best_indices, verdicts
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        old_id, new_id, int(fast_diff), old_count, new_count,
+        np.asarray(match["best_scores"], dtype=np.float32).tobytes(),
+        np.asarray(match["best_indices"], dtype=np.int32).tobytes(),
+        json.dumps([
+            [j, result.get("risk_score", 0), list(result.get("categories", []))]
+            for j, result in verdicts
+        ]),
+    ))
+
+
+# ==============================
+# Version Comparison
+# ==============================
+
+# Unchanged clauses on each side of an edited hunk that are still
+# considered as match candidates in fast-diff mode
+FAST_DIFF_CONTEXT = 3
+
+
+def change_regions(old_chunks, new_chunks, context=FAST_DIFF_CONTEXT):
+    """
+    Align two clause sequences and yield (old positions, new window) for
+    every hunk that removed or rewrote old clauses. The window is the
+    hunk's new side widened by `context` clauses in both directions.
+    """
+
+    matcher = difflib.SequenceMatcher(None, old_chunks, new_chunks, autojunk=False)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            yield (
+                range(i1, i2),
+                range(max(0, j1 - context), min(len(new_chunks), j2 + context)),
+            )
+
+
+def _keep_best(best, rows, match):
+    """Copy a match's per-row best scores/indices into best, at old positions rows."""
+    scores, indices = match.pop("best_scores"), match.pop("best_indices")
+    if best is not None and len(rows):
+        best[0][rows] = scores
+        best[1][rows] = indices
+
+
+def _match_full(conn, old_chunks, new_chunks, residual, stage_prefix, memo=None, best=None):
+    if not residual or not new_chunks:
+        return {
+            "unchanged": 0,
+            "modified": 0,
+            "removed": len(residual),
+            "matched_new_indices": set(),
+        }
+
+    with stage(f"{stage_prefix}.embed_chunks", items=len(residual) + len(new_chunks)):
+        old_embeddings = embed_clauses(conn, [old_chunks[i] for i in residual], memo)
+        new_embeddings = embed_clauses(conn, new_chunks, memo)
+
+    with stage(f"{stage_prefix}.similarity_matrix"):
+        similarity_matrix = compute_similarity_matrix(old_embeddings, new_embeddings)
+
+    match = match_clauses(similarity_matrix)
+    _keep_best(best, residual, match)
+    return match
+
+
+def _match_regions(conn, old_chunks, new_chunks, exact, stage_prefix, memo=None, best=None):
+    """
+    Fast-diff matching: each edited hunk is first matched against its own
+    window. Rows with no match there (would-be removals) are re-checked
+    against the whole new version, since rewritten clauses often move.
+    """
+
+    with stage(f"{stage_prefix}.fast_diff"):
+        regions = []
+        for old_range, window in change_regions(old_chunks, new_chunks):
+            rows = [i for i in old_range if i not in exact]
+            if rows:
+                regions.append((rows, list(window)))
+
+    match = {"unchanged": 0, "modified": 0, "removed": 0, "matched_new_indices": set()}
+    if not regions:
+        return match
+
+    texts = list(dict.fromkeys(
+        [old_chunks[i] for rows, _ in regions for i in rows] +
+        [new_chunks[j] for _, window in regions for j in window]
+    ))
+
+    with stage(f"{stage_prefix}.embed_chunks", items=len(texts)):
+        vectors = dict(zip(texts, embed_clauses(conn, texts, memo)))
+
+    escalated = []
+
+    with stage(f"{stage_prefix}.similarity_matrix"):
+        for rows, window in regions:
+            if not window:
+                escalated.extend(rows)
+                continue
+
+            similarity_matrix = compute_similarity_matrix(
+                np.stack([vectors[old_chunks[i]] for i in rows]),
+                np.stack([vectors[new_chunks[j]] for j in window]),
+            )
+
+            # Compare in numpy, as match_clauses does
+            found = similarity_matrix.max(axis=1) > MODIFIED_THRESHOLD
+            escalated.extend(i for i, ok in zip(rows, found) if not ok)
+
+            region_match = match_clauses(similarity_matrix[found])
+            region_match["best_indices"] = np.asarray(window)[region_match["best_indices"]]
+            _keep_best(best, [i for i, ok in zip(rows, found) if ok], region_match)
+            match["unchanged"] += region_match["unchanged"]
+            match["modified"] += region_match["modified"]
+            match["matched_new_indices"].update(
+                window[k] for k in region_match["matched_new_indices"]
+            )
+
+    if escalated:
+        full = _match_full(conn, old_chunks, new_chunks, escalated, stage_prefix, memo, best)
+        for key in ("unchanged", "modified", "removed"):
+            match[key] += full[key]
+        match["matched_new_indices"].update(full["matched_new_indices"])
+
+    return match
+
+
+def compare_versions(conn, old_id, new_id, stage_prefix="compare", fast_diff=False,
+                     old_chunks=None, memo=None):
+    """
+    Match every old clause against the new version.
+    Old clauses whose exact text survives are taken from SQL as unchanged
+    (matched to the first identical new clause, as argmax would); only the
+    rest go through the similarity matrix. Embeddings come from the cache,
+    so only never-seen clauses are sent to the model.
+
+    With fast_diff=True the remaining old clauses are only compared with
+    the new clauses of their own edited hunk (plus FAST_DIFF_CONTEXT on
+    each side) instead of the whole new version. This can differ from the
+    full matrix when a rewritten clause moved far from where it was.
+
+    Callers walking a version history can pass the old version's chunks
+    from the previous step and an embedding memo (see embed_clauses).
+
+    Returns (old_chunks, new_chunks, match) with match as in match_clauses;
+    best_scores/best_indices cover every old clause (exact matches score 1.0).
+    In fast-diff mode they are the best within the candidates compared.
+    """
+
+    with stage(f"{stage_prefix}.load_clauses") as timer:
+        if old_chunks is None:
+            old_chunks = load_version_chunks(conn, old_id)
+        new_chunks = load_version_chunks(conn, new_id)
+        exact = exact_matches(conn, old_id, new_id)
+        timer.add_items(len(old_chunks) + len(new_chunks))
+
+    best = (
+        np.full(len(old_chunks), -np.inf, dtype=np.float32),
+        np.full(len(old_chunks), -1, dtype=np.int32),
+    )
+
+    if fast_diff:
+        match = _match_regions(conn, old_chunks, new_chunks, exact, stage_prefix, memo, best)
+    else:
+        residual = [i for i in range(len(old_chunks)) if i not in exact]
+        match = _match_full(conn, old_chunks, new_chunks, residual, stage_prefix, memo, best)
+
+    match["unchanged"] += len(exact)
+    match["matched_new_indices"].update(exact.values())
+
+    for i, j in exact.items():
+        best[0][i] = 1.0
+        best[1][i] = j
+    match["best_scores"], match["best_indices"] = best
+
+    return old_chunks, new_chunks, match
+
+
+# ==============================
+# Dedup Report
+# ==============================
+
+def dedup_report(conn):
+    """
+    How much the shared store saves across the tracked corpus:
+    clause occurrences in all versions vs distinct (normalized) clauses,
+    and how many of those appear at more than one company.
+    """
+
+    fill_clause_signals(conn)
+
+    occurrences, exact, normalized = conn.execute("""
+        SELECT COUNT(*), COUNT(DISTINCT vc.clause_id), COUNT(DISTINCT c.norm_hash)
+        FROM version_clauses vc
+        JOIN clauses c ON c.id = vc.clause_id
+    """).fetchone()
+
+    # Distinct clauses per company, summed: what per-company storage would hold
+    per_company, shared = conn.execute("""
+        SELECT COALESCE(SUM(companies), 0), COALESCE(SUM(companies > 1), 0) FROM (
+            SELECT c.norm_hash, COUNT(DISTINCT pv.company_id) AS companies
+            FROM version_clauses vc
+            JOIN clauses c ON c.id = vc.clause_id
+            JOIN policy_versions pv ON pv.id = vc.version_id
+            GROUP BY c.norm_hash
+        )
+    """).fetchone()
+
+    embedded, with_verdict = conn.execute("""
+        SELECT
+            COUNT(DISTINCT CASE WHEN c.embedding IS NOT NULL THEN c.norm_hash END),
+            COUNT(DISTINCT CASE WHEN v.clause_hash IS NOT NULL THEN c.norm_hash END)
+        FROM clauses c
+        LEFT JOIN llm_verdicts v ON v.clause_hash = c.hash
+    """).fetchone()
+
+    return {
+        "occurrences": occurrences,
+        "unique_exact": exact,
+        "unique_normalized": normalized,
+        "dedup_ratio": round(occurrences / normalized, 2) if normalized else 0.0,
+        "per_company_unique": per_company,
+        "cross_company_ratio": round(per_company / normalized, 2) if normalized else 0.0,
+        "shared_across_companies": shared,
+        "embedded": embedded,
+        "with_verdict": with_verdict,
+    }
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "backfill":
+        init_db()
+        versions, clauses = ingest_missing_versions()
+        print(f"Stored clauses for {versions} versions ({clauses} clauses).")
+
+    elif len(sys.argv) >= 2 and sys.argv[1] == "stats":
+        init_db()
+        conn = sqlite3.connect(DB_PATH)
+        print(json.dumps(dedup_report(conn), indent=2))
+        conn.close()
+
+    elif len(sys.argv) == 4 and sys.argv[1] == "diff":
+        conn = sqlite3.connect(DB_PATH)
+        old_id, new_id = int(sys.argv[2]), int(sys.argv[3])
+        for version_id in (old_id, new_id):
+            load_version_chunks(conn, version_id)
+        diff = diff_versions(conn, old_id, new_id)
+        conn.close()
+
+        print(f"{diff['shared']} shared, {len(diff['removed'])} removed, {len(diff['added'])} added")
+        for clause in diff["removed"]:
+            print(f"- [{clause['position']}] {clause['text']}")
+        for clause in diff["added"]:
+            print(f"+ [{clause['position']}] {clause['text']}")
+
+    else:
+        print("Usage: python -m backend.clause_store backfill")
+        print("       python -m backend.clause_store diff <old_version_id> <new_version_id>")
+        print("       python -m backend.clause_store stats")
@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import queue
+import sqlite3
+import zlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from backend.database import init_db, DB_PATH
+from backend.crawler import (
+    download_static,
+    download_dynamic,
+    extract_text,
+    generate_hash,
+    crawl_entry,
+)
+from backend.persistence import CrawlResultWriter
+from backend.clause_store import forget_versions, ingest_version_clauses
+from backend.clause_index import reindex_company
+from backend.fingerprint import classify_company_versions
+from backend.versioning import forget_timeline
+from backend.metrics import stage, inc, observe, bind_context
+
+
+# ==============================
+# Pipeline Settings
+# ==============================
+
+DOWNLOAD_WORKERS = 8
+EXTRACT_WORKERS = os.cpu_count() or 2
+
+# Downloads block once this many pages are waiting for extraction
+EXTRACT_QUEUE_SIZE = 16
+
+
+def _extract_pool(workers):
+    # spawn: workers must not inherit the parent's model/thread state
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+# ==============================
+# Download (I/O threads)
+# ==============================
+
+def _download(entry, html_queue):
+    url = entry["url"]
+    html = None
+
+    try:
+        with stage("crawl.download_static"):
+            html = download_static(url)
+
+        if not html:
+            print(f"Static failed for {entry['company']}. Trying dynamic...")
+            with stage("crawl.download_dynamic"):
+                html = download_dynamic(url)
+    finally:
+        # Always hand something over so the consumer can account for the entry
+        html_queue.put((entry, html, time.perf_counter()))
+
+
+# ==============================
+# Crawl Pipeline
+# ==============================
+
+def run_crawl_pipeline(registry, download_workers=DOWNLOAD_WORKERS, extract_workers=EXTRACT_WORKERS):
+    """
+    Crawl the registry with downloads on a thread pool and trafilatura
+    extraction on a process pool, connected by a bounded queue.
+    All database writes happen on this thread, in batched transactions.
+    Multi-page entries fetch their sections on their own threads but send
+    the HTML to the same extraction pool.
+    """
+
+    conn = sqlite3.connect(DB_PATH)
+    writer = CrawlResultWriter(conn)
+
+    # Multi-page entries manage their own concurrent section fetches
+    plain = [e for e in registry if not e.get("sections")]
+    sectioned = [e for e in registry if e.get("sections")]
+
+    outcomes = {}
+    html_queue = queue.Queue(maxsize=EXTRACT_QUEUE_SIZE)
+
+    with ThreadPoolExecutor(max_workers=download_workers) as io_pool, \
+            _extract_pool(extract_workers) as cpu_pool:
+
+        for entry in plain:
+            io_pool.submit(bind_context(_download), entry, html_queue)
+
+        received = 0
+        pending = {}
+
+        while received < len(plain) or pending:
+
+            # Move downloaded pages into the process pool, keeping it just full
+            while received < len(plain) and len(pending) < extract_workers * 2:
+                try:
+                    entry, html, queued_at = html_queue.get(timeout=0.05 if pending else None)
+                except queue.Empty:
+                    break
+
+                received += 1
+                observe("cdd_extract_queue_wait_seconds", time.perf_counter() - queued_at)
+
+                if not html:
+                    writer.add(entry, None)
+                    continue
+
+                pending[cpu_pool.submit(extract_text, html)] = (entry, html)
+
+            if not pending:
+                continue
+
+            done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                entry, html = pending.pop(future)
+
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print("Extraction error:", entry["company"], e)
+                    text = None
+
+                inc("cdd_extractions_total", {"result": "ok" if text else "empty"})
+                writer.add(entry, text, html)
+
+        outcomes.update(writer.flush())
+
+        def extract(html):
+            return cpu_pool.submit(extract_text, html).result() if html else None
+
+        for entry in sectioned:
+            outcomes[entry["company"]] = crawl_entry(conn, entry, extract)
+
+    conn.close()
+    return outcomes
+
+
+# ==============================
+# Bulk Re-Extraction
+# ==============================
+
+def reextract_snapshots(company_name=None, apply=False, extract_workers=EXTRACT_WORKERS):
+    """
+    Re-run extraction over stored raw HTML (e.g. after a trafilatura
+    upgrade) without re-fetching. With apply=True, versions whose text
+    changes are rewritten and their clauses re-stored. Everything derived
+    from their old text is dropped or rebuilt: cached quick-stats, stored
+    pair outputs, timeline pairs from them onward, cosmetic flags and the
+    companies' search index rows.
+    """
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    query = """
+        SELECT rs.id, rs.version_id, rs.html, pv.hash, pv.company_id, pv.timestamp
+        FROM raw_snapshots rs
+        JOIN policy_versions pv ON pv.id = rs.version_id
+        JOIN companies c ON c.id = rs.company_id
+    """
+    params = ()
+    if company_name:
+        query += " WHERE c.name=?"
+        params = (company_name,)
+
+    cursor.execute(query + " ORDER BY rs.id", params)
+    snapshots = cursor.fetchall()
+
+    changed = []
+    earliest = {}   # company id: timestamp of its oldest changed version
+    batch_size = extract_workers * 8
+
+    with _extract_pool(extract_workers) as cpu_pool:
+        # Batches keep only a bounded amount of decompressed HTML in memory
+        for start in range(0, len(snapshots), batch_size):
+            batch = snapshots[start:start + batch_size]
+            htmls = [zlib.decompress(row[2]).decode("utf-8") for row in batch]
+
+            for row, text in zip(batch, cpu_pool.map(extract_text, htmls)):
+                if text and generate_hash(text) != row[3]:
+                    changed.append((row[1], text))
+                    if row[5] < earliest.get(row[4], "9999"):
+                        earliest[row[4]] = row[5]
+
+    print(f"Re-extracted {len(snapshots)} snapshots, {len(changed)} differ from stored text.")
+
+    if apply and changed:
+        conn.executemany(
+            "UPDATE policy_versions SET content=?, hash=? WHERE id=?",
+            [(text, generate_hash(text), version_id) for version_id, text in changed],
+        )
+        conn.executemany(
+            "DELETE FROM quick_stats_cache WHERE old_version_id=? OR new_version_id=?",
+            [(version_id, version_id) for version_id, _ in changed],
+        )
+        conn.executemany(
+            "DELETE FROM pair_outputs WHERE old_version_id=? OR new_version_id=?",
+            [(version_id, version_id) for version_id, _ in changed],
+        )
+        forget_versions(conn, [version_id for version_id, _ in changed])
+        for version_id, text in changed:
+            ingest_version_clauses(conn, version_id, text)
+        for company_id, timestamp in earliest.items():
+            forget_timeline(conn, company_id, timestamp)
+        conn.commit()
+
+        # New text may turn versions cosmetic (or back), which the index follows
+        for company_id in earliest:
+            classify_company_versions(conn, company_id)
+            reindex_company(conn, company_id)
+        print(f"Updated {len(changed)} versions.")
+
+    conn.close()
+    return len(snapshots), len(changed)
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "reextract":
+        init_db()
+        args = sys.argv[2:]
+        apply = "--apply" in args
+        names = [a for a in args if not a.startswith("--")]
+        reextract_snapshots(names[0] if names else None, apply=apply)
+    else:
+        print("Usage: python -m backend.crawl_pipeline reextract [CompanyName] [--apply]")
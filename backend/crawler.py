@@ -2,9 +2,16 @@ import requests
 import trafilatura
 import json
 import hashlib
-import sqlite3
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urldefrag
+from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
-from backend.database import init_db, DB_PATH
+from backend.database import init_db
+from backend.clause_index import index_version
+from backend.clause_store import ingest_version_clauses
+from backend.fingerprint import classify_new_version
+from backend.metrics import stage, inc, print_timing_summary, bind_context
 
 
 # ==============================
@@ -19,36 +26,49 @@ def generate_hash(text):
 # Static Fetch (Improved Headers)
 # ==============================
 
-def fetch_static(url):
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/120.0.0.0 Safari/537.36",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept": "text/html,application/xhtml+xml"
-        }
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept": "text/html,application/xhtml+xml"
+}
 
-        response = requests.get(url, headers=headers, timeout=30)
+
+def download_static(url):
+    """Raw HTML of a page, or None."""
+    try:
+        response = requests.get(url, headers=HEADERS, timeout=30)
 
         print("Static Status Code:", response.status_code)
 
         if response.status_code != 200:
             return None
 
-        extracted = trafilatura.extract(response.text)
-        return extracted
+        return response.text
 
     except Exception as e:
         print("Static fetch error:", e)
         return None
 
 
+def extract_text(html):
+    """CPU-heavy trafilatura extraction (safe to run in a worker process)."""
+    if not html:
+        return None
+    return trafilatura.extract(html)
+
+
+def fetch_static(url):
+    return extract_text(download_static(url))
+
+
 # ==============================
 # Dynamic Fetch (Stronger)
 # ==============================
 
-def fetch_dynamic(url):
+def download_dynamic(url):
+    """Rendered HTML of a JavaScript-heavy page, or None."""
     try:
         with sync_playwright() as p:
 
@@ -82,13 +102,207 @@ def fetch_dynamic(url):
 
             browser.close()
 
-        extracted = trafilatura.extract(html)
-        return extracted
+        return html
 
     except Exception as e:
         print("Dynamic fetch error:", e)
         return None
 
+
+def fetch_dynamic(url):
+    return extract_text(download_dynamic(url))
+
+
+# ==============================
+# Multi-Page Sections
+# ==============================
+
+SECTION_WORKERS = 8
+DEFAULT_MAX_DEPTH = 1
+DEFAULT_MAX_PAGES = 25
+
+
+def normalize_link(page_url, href):
+    link, _ = urldefrag(urljoin(page_url, href))
+    return link.rstrip("/")
+
+
+def discover_section_links(html, page_url, scope):
+    """Links under the configured URL scope, in document order."""
+    soup = BeautifulSoup(html, "html.parser")
+    scope = scope.rstrip("/")
+
+    links = []
+    seen = set()
+    for anchor in soup.find_all("a", href=True):
+        link = normalize_link(page_url, anchor["href"])
+        if link.startswith(scope) and link not in seen:
+            seen.add(link)
+            links.append(link)
+
+    return links
+
+
+def load_section_state(conn, company_id):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT url, etag, last_modified, html_hash, content, links
+        FROM policy_sections WHERE company_id=?
+    """, (company_id,))
+
+    return {
+        row[0]: {
+            "etag": row[1],
+            "last_modified": row[2],
+            "html_hash": row[3],
+            "content": row[4],
+            "links": json.loads(row[5] or "[]"),
+        }
+        for row in cursor.fetchall()
+    }
+
+
+def fetch_section(url, scope, state=None, extract=extract_text):
+    """
+    Conditional fetch of one section page. Unchanged pages (304, or same raw
+    HTML) reuse the stored extraction instead of running trafilatura again.
+    Changed pages go through extract, which the crawl pipeline points at its
+    extraction process pool.
+    """
+
+    headers = dict(HEADERS)
+    if state and state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state and state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    try:
+        response = requests.get(url, headers=headers, timeout=30)
+    except Exception as e:
+        print("Section fetch error:", url, e)
+        inc("cdd_section_fetches_total", {"result": "failed"})
+        return None
+
+    if response.status_code == 304 and state:
+        inc("cdd_section_fetches_total", {"result": "not_modified"})
+        return dict(state, url=url, changed=False)
+
+    if response.status_code != 200:
+        print("Section Status Code:", response.status_code, url)
+        inc("cdd_section_fetches_total", {"result": "failed"})
+        return None
+
+    result = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "html_hash": generate_hash(response.text),
+    }
+
+    if state and state["html_hash"] == result["html_hash"]:
+        inc("cdd_section_fetches_total", {"result": "unchanged_html"})
+        return dict(result, content=state["content"], links=state["links"], changed=False)
+
+    inc("cdd_section_fetches_total", {"result": "fetched"})
+    return dict(
+        result,
+        content=extract(response.text),
+        links=discover_section_links(response.text, url, scope),
+        changed=True,
+    )
+
+
+def save_section_state(conn, company_id, sections):
+    conn.executemany("""
+        INSERT INTO policy_sections (
+            company_id, url, etag, last_modified, html_hash, content, links, fetched_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(company_id, url) DO UPDATE SET
+            etag=excluded.etag,
+            last_modified=excluded.last_modified,
+            html_hash=excluded.html_hash,
+            content=excluded.content,
+            links=excluded.links,
+            fetched_at=excluded.fetched_at
+    """, [
+        (
+            company_id, s["url"], s.get("etag"), s.get("last_modified"),
+            s["html_hash"], s["content"], json.dumps(s["links"]),
+        )
+        for s in sections
+    ])
+    conn.commit()
+
+
+def fetch_policy_sections(conn, company_id, entry, extract=extract_text):
+    """
+    Crawl the landing page plus section links under the entry's scope,
+    breadth-first with a depth and page cap, fetching each level concurrently.
+    Returns (document text, ordered sections) or (None, []) on failure.
+    """
+
+    config = entry.get("sections") or {}
+    scope = config.get("scope", entry["url"])
+    max_depth = config.get("max_depth", DEFAULT_MAX_DEPTH)
+    max_pages = config.get("max_pages", DEFAULT_MAX_PAGES)
+
+    state = load_section_state(conn, company_id)
+
+    landing = normalize_link(entry["url"], entry["url"])
+    ordered = [landing]
+    queued = {landing}
+    results = {}
+
+    frontier = [landing]
+    depth = 0
+
+    with ThreadPoolExecutor(max_workers=SECTION_WORKERS) as executor:
+        while frontier:
+            fetched = list(executor.map(
+                lambda task, url: task(url, scope, state.get(url), extract),
+                [bind_context(fetch_section) for _ in frontier],
+                frontier,
+            ))
+
+            next_frontier = []
+            for url, result in zip(frontier, fetched):
+                results[url] = result
+                if result is None or depth >= max_depth:
+                    continue
+
+                for link in result["links"]:
+                    if link not in queued and len(ordered) < max_pages:
+                        queued.add(link)
+                        ordered.append(link)
+                        next_frontier.append(link)
+
+            frontier = next_frontier
+            depth += 1
+
+    if not results.get(landing):
+        return None, []
+
+    # Stable order: landing page first, then discovery order
+    sections = [results[url] for url in ordered if results.get(url) and results[url]["content"]]
+    save_section_state(conn, company_id, sections)
+
+    changed = sum(1 for s in sections if s["changed"])
+    print(f"Sections: {len(sections)} assembled, {changed} re-extracted")
+
+    text = "\n\n".join(s["content"] for s in sections)
+    return text, sections
+
+
+def save_version_sections(conn, version_id, sections):
+    conn.executemany("""
+        INSERT INTO version_sections (version_id, position, url, hash)
+        VALUES (?, ?, ?, ?)
+    """, [
+        (version_id, position, s["url"], generate_hash(s["content"]))
+        for position, s in enumerate(sections)
+    ])
+
+
 # ==============================
 # Database Helpers
 # ==============================
@@ -106,7 +320,6 @@ def get_company_id(conn, name, url):
         "INSERT INTO companies (name, url) VALUES (?, ?)",
         (name, url)
     )
-    conn.commit()
     return cursor.lastrowid
 
 
@@ -115,7 +328,7 @@ def get_latest_hash(conn, company_id):
     cursor.execute("""
         SELECT hash FROM policy_versions
         WHERE company_id=?
-        ORDER BY timestamp DESC
+        ORDER BY timestamp DESC, id DESC
         LIMIT 1
     """, (company_id,))
     result = cursor.fetchone()
@@ -128,47 +341,169 @@ def save_new_version(conn, company_id, hash_value, content):
         INSERT INTO policy_versions (company_id, hash, content)
         VALUES (?, ?, ?)
     """, (company_id, hash_value, content))
-    conn.commit()
+    return cursor.lastrowid
 
 
-# ==============================
-# Main Execution
-# ==============================
+def save_raw_snapshot(conn, company_id, url, html, version_id=None):
+    """
+    Keep the fetched HTML (zlib-compressed) so extraction can be re-run
+    later without re-fetching. Identical consecutive snapshots are skipped.
+    """
 
-if __name__ == "__main__":
+    html_hash = generate_hash(html)
+    cursor = conn.cursor()
 
-    init_db()
+    cursor.execute("""
+        SELECT id, html_hash FROM raw_snapshots
+        WHERE company_id=? AND url=?
+        ORDER BY id DESC LIMIT 1
+    """, (company_id, url))
+    latest = cursor.fetchone()
+
+    if latest and latest[1] == html_hash:
+        if version_id is not None:
+            cursor.execute(
+                "UPDATE raw_snapshots SET version_id=? WHERE id=?",
+                (version_id, latest[0]),
+            )
+        return latest[0]
+
+    cursor.execute("""
+        INSERT INTO raw_snapshots (company_id, url, html_hash, html, version_id)
+        VALUES (?, ?, ?, ?, ?)
+    """, (company_id, url, html_hash, zlib.compress(html.encode("utf-8")), version_id))
+    return cursor.lastrowid
 
-    with open("backend/registry.json") as f:
-        registry = json.load(f)
 
-    conn = sqlite3.connect(DB_PATH)
+# ==============================
+# Crawl One Registry Entry
+# ==============================
+
+REGISTRY_PATH = "backend/registry.json"
 
-    for entry in registry:
-        company = entry["company"]
-        url = entry["url"]
 
-        print(f"\nFetching {company}...")
+def load_registry(path=REGISTRY_PATH):
+    with open(path) as f:
+        return json.load(f)
 
-        text = fetch_static(url)
 
-        if not text:
-            print("Static failed. Trying dynamic...")
-            text = fetch_dynamic(url)
+def store_crawl_result(conn, entry, text, html=None, sections=None):
+    """
+    Persist the outcome of one fetch: new version (if the text changed),
+    its clauses, section hashes, raw HTML and clause index.
+    A near-duplicate of the last analyzed version is stored as a cosmetic
+    revision and not indexed.
+    Returns "changed", "cosmetic", "unchanged" or "failed".
+    """
 
-        if not text:
-            print(f"❌ Failed to fetch {company}")
-            continue
+    company = entry["company"]
+    url = entry["url"]
 
+    if not text:
+        print(f"❌ Failed to fetch {company}")
+        return "failed"
+
+    with stage("crawl.sqlite_read"):
         company_id = get_company_id(conn, company, url)
         new_hash = generate_hash(text)
         old_hash = get_latest_hash(conn, company_id)
 
-        if old_hash == new_hash:
-            print(f"✓ No change detected for {company}")
-        else:
-            save_new_version(conn, company_id, new_hash, text)
-            print(f"✓ New version stored for {company}")
+    if old_hash == new_hash:
+        if html:
+            save_raw_snapshot(conn, company_id, url, html)
+        conn.commit()
+        print(f"✓ No change detected for {company}")
+        return "unchanged"
+
+    # Version, clauses, sections and raw HTML land in one transaction
+    with stage("crawl.sqlite_write"):
+        version_id = save_new_version(conn, company_id, new_hash, text)
+        ingest_version_clauses(conn, version_id, text)
+        if sections:
+            save_version_sections(conn, version_id, sections)
+        if html:
+            save_raw_snapshot(conn, company_id, url, html, version_id)
+        near = classify_new_version(conn, company_id, version_id, text)
+        conn.commit()
+
+    if near["cosmetic"]:
+        print(f"✓ Cosmetic revision stored for {company} "
+              f"(same clauses as version {near['anchor_id']})")
+        return "cosmetic"
+
+    print(f"✓ New version stored for {company}")
+
+    try:
+        with stage("crawl.clause_index") as timer:
+            embedded = index_version(conn, version_id)
+            timer.add_items(embedded)
+        print(f"✓ Indexed {embedded} new clauses for {company}")
+    except Exception as e:
+        print("Clause index error:", e)
+
+    return "changed"
+
+
+def crawl_entry(conn, entry, extract=extract_text):
+    """
+    Fetch one registry entry and store a new version if it changed.
+    extract(html) runs trafilatura; pass one that hands the HTML to a
+    process pool to keep extraction off the fetch threads.
+    Returns "changed", "cosmetic", "unchanged" or "failed".
+    """
+
+    company = entry["company"]
+    url = entry["url"]
+
+    print(f"\nFetching {company}...")
+
+    text = None
+    html = None
+    sections = []
+
+    if entry.get("sections"):
+        company_id = get_company_id(conn, company, url)
+        with stage("crawl.fetch_sections") as timer:
+            text, sections = fetch_policy_sections(conn, company_id, entry, extract)
+            timer.add_items(len(sections))
+
+    if not text:
+        with stage("crawl.fetch_static"):
+            html = download_static(url)
+            text = extract(html)
+
+    if not text:
+        print("Static failed. Trying dynamic...")
+        with stage("crawl.fetch_dynamic"):
+            html = download_dynamic(url)
+            text = extract(html)
+
+    return store_crawl_result(conn, entry, text, html, sections)
+
+
+# ==============================
+# Main Execution
+# ==============================
+
+if __name__ == "__main__":
+    import sys
+    from backend.crawl_pipeline import run_crawl_pipeline
+    from backend.profiling import profile_run, print_profile, strip_profile_flags
+
+    _, profile_format = strip_profile_flags(sys.argv[1:])
+
+    init_db()
+
+    registry = load_registry()
+
+    # Extraction worker processes are not sampled; their time shows up as waits
+    if profile_format:
+        with profile_run("crawl", fmt=profile_format) as profile:
+            run_crawl_pipeline(registry)
+    else:
+        run_crawl_pipeline(registry)
 
-    conn.close()
-    print("\nDone.")
\ No newline at end of file
+    print("\nDone.")
+    print_timing_summary()
+    if profile_format:
+        print_profile(profile)
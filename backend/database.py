@@ -1,6 +1,7 @@
+import os
 import sqlite3
 
-DB_PATH = "backend/policies.db"
+DB_PATH = os.environ.get("CDD_DB_PATH", "backend/policies.db")
 
 def init_db():
     conn = sqlite3.connect(DB_PATH)
@@ -27,5 +28,317 @@ def init_db():
         )
     """)
 
+    # Makes re-importing the same snapshot idempotent
+    try:
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_policy_versions_snapshot
+            ON policy_versions(company_id, timestamp, hash)
+        """)
+    except sqlite3.IntegrityError:
+        print("Warning: duplicate policy_versions rows; snapshot index not created.")
+
+    # Near-duplicate revisions (backend.fingerprint) are kept but not analyzed
+    try:
+        cursor.execute("ALTER TABLE policy_versions ADD COLUMN cosmetic INTEGER DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # already present
+
+    # Cached quick-stats results per version pair
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quick_stats_cache (
+            old_version_id INTEGER,
+            new_version_id INTEGER,
+            result TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (old_version_id, new_version_id)
+        )
+    """)
+
+    # Settings a cached result was computed under (scoring_config.scoring_hash)
+    try:
+        cursor.execute("ALTER TABLE quick_stats_cache ADD COLUMN scoring_hash TEXT")
+    except sqlite3.OperationalError:
+        pass  # already present
+
+    # Cross-company clause search index (one row per company + clause)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clause_index (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER,
+            clause_hash TEXT,
+            text TEXT,
+            categories INTEGER DEFAULT 0,
+            first_version_id INTEGER,
+            first_seen DATETIME,
+            last_version_id INTEGER,
+            last_seen DATETIME,
+            embedding BLOB,
+            seq INTEGER,
+            UNIQUE (company_id, clause_hash),
+            FOREIGN KEY(company_id) REFERENCES companies(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clause_index_seq ON clause_index(seq)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clause_index_versions (
+            version_id INTEGER PRIMARY KEY
+        )
+    """)
+
+    # Adaptive recrawl scheduler state
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_schedule (
+            company TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            domain TEXT,
+            interval_seconds REAL,
+            next_crawl_at REAL,
+            last_crawled_at REAL,
+            last_changed_at REAL,
+            failures INTEGER DEFAULT 0,
+            last_outcome TEXT
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_domains (
+            domain TEXT PRIMARY KEY,
+            next_allowed_at REAL
+        )
+    """)
+
+    # Latest fetch state of each policy sub-page (multi-page policies)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS policy_sections (
+            company_id INTEGER,
+            url TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            html_hash TEXT,
+            content TEXT,
+            links TEXT,
+            fetched_at DATETIME,
+            PRIMARY KEY (company_id, url),
+            FOREIGN KEY(company_id) REFERENCES companies(id)
+        )
+    """)
+
+    # Per-section hashes of each assembled version
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS version_sections (
+            version_id INTEGER,
+            position INTEGER,
+            url TEXT,
+            hash TEXT,
+            PRIMARY KEY (version_id, position),
+            FOREIGN KEY(version_id) REFERENCES policy_versions(id)
+        )
+    """)
+
+    # Raw fetched HTML (zlib) for re-extraction without re-fetching
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS raw_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER,
+            url TEXT,
+            fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            html_hash TEXT,
+            html BLOB,
+            version_id INTEGER,
+            FOREIGN KEY(company_id) REFERENCES companies(id),
+            FOREIGN KEY(version_id) REFERENCES policy_versions(id)
+        )
+    """)
+
+    # Every distinct clause text, stored once across all companies
+    # (embedding filled on first use, rule signals at insert)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clauses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT NOT NULL UNIQUE,
+            text TEXT NOT NULL,
+            embedding BLOB,
+            norm_hash TEXT,
+            rule_categories TEXT,
+            expansion_signals TEXT
+        )
+    """)
+
+    # Columns added after the table was introduced; filled by the clause store backfill
+    for column in ("norm_hash TEXT", "rule_categories TEXT", "expansion_signals TEXT"):
+        try:
+            cursor.execute(f"ALTER TABLE clauses ADD COLUMN {column}")
+        except sqlite3.OperationalError:
+            pass  # already present
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clauses_norm_hash ON clauses(norm_hash)")
+
+    # Clause sequence of each version
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS version_clauses (
+            version_id INTEGER,
+            position INTEGER,
+            clause_id INTEGER,
+            PRIMARY KEY (version_id, position),
+            FOREIGN KEY(version_id) REFERENCES policy_versions(id),
+            FOREIGN KEY(clause_id) REFERENCES clauses(id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_version_clauses_clause
+        ON version_clauses (version_id, clause_id)
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clause_store_versions (
+            version_id INTEGER PRIMARY KEY
+        )
+    """)
+
+    # Successful LLM verdicts per clause (training data for the local classifier)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_verdicts (
+            clause_hash TEXT PRIMARY KEY,
+            risk_score INTEGER,
+            expansion INTEGER,
+            categories TEXT,
+            reason TEXT,
+            prompt_version TEXT,
+            model TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Every computed timeline pair (append-only; feeds the analytics export)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS timeline_pairs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER,
+            old_version_id INTEGER,
+            new_version_id INTEGER,
+            from_time DATETIME,
+            to_time DATETIME,
+            fast_diff INTEGER,
+            structural_drift REAL,
+            semantic_score REAL,
+            escalation_intensity REAL,
+            irreversible INTEGER,
+            cdi REAL,
+            category_severity TEXT,
+            computed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (old_version_id, new_version_id, fast_diff),
+            FOREIGN KEY(company_id) REFERENCES companies(id)
+        )
+    """)
+
+    # Hash of the version chain, prompt and scoring config a pair's CDI was
+    # computed under; NULL when it can't seed a windowed run (see load_checkpoint)
+    try:
+        cursor.execute("ALTER TABLE timeline_pairs ADD COLUMN chain_hash TEXT")
+    except sqlite3.OperationalError:
+        pass  # already present
+
+    # Tombstone per deleted timeline pair (recomputed or forgotten), so the
+    # append-only analytics export can retract rows it already wrote
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS timeline_retractions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pair_id INTEGER,
+            company_id INTEGER,
+            old_version_id INTEGER,
+            new_version_id INTEGER,
+            fast_diff INTEGER,
+            retracted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS timeline_pairs_retract
+        AFTER DELETE ON timeline_pairs
+        BEGIN
+            INSERT INTO timeline_retractions (pair_id, company_id, old_version_id, new_version_id, fast_diff)
+            VALUES (OLD.id, OLD.company_id, OLD.old_version_id, OLD.new_version_id, OLD.fast_diff);
+        END
+    """)
+
+    # Latest consent risk per policy domain, for the browser extension feed
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS risk_feed (
+            domain TEXT PRIMARY KEY,
+            company TEXT,
+            cdi REAL,
+            risk_level TEXT,
+            irreversible INTEGER,
+            last_change DATETIME,
+            version INTEGER
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_risk_feed_version ON risk_feed(version)")
+
+    # Full feed per encoding (gzip), rebuilt whenever the feed changes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS risk_feed_snapshots (
+            format TEXT PRIMARY KEY,
+            version INTEGER,
+            body BLOB
+        )
+    """)
+
+    # Last exported row per dataset and output directory
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS export_state (
+            dataset TEXT,
+            path TEXT,
+            watermark INTEGER,
+            exported_at DATETIME,
+            PRIMARY KEY (dataset, path)
+        )
+    """)
+
+    # Raw matching output and verdicts per analyzed version pair, so scores
+    # can be recomputed under new weights/thresholds (backend.rescoring)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pair_outputs (
+            old_version_id INTEGER,
+            new_version_id INTEGER,
+            fast_diff INTEGER,
+            old_count INTEGER,
+            new_count INTEGER,
+            best_scores BLOB,
+            best_indices BLOB,
+            verdicts TEXT,
+            computed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (old_version_id, new_version_id, fast_diff)
+        )
+    """)
+
+    # MinHash fingerprint per version; cosmetic_of is the analyzed version it nearly duplicates
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS version_fingerprints (
+            version_id INTEGER PRIMARY KEY,
+            company_id INTEGER,
+            minhash BLOB,
+            cosmetic_of INTEGER,
+            similarity REAL,
+            FOREIGN KEY(version_id) REFERENCES policy_versions(id)
+        )
+    """)
+
+    # LSH index: one bucket per signature band, for near-duplicate lookups
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS version_lsh (
+            company_id INTEGER,
+            band INTEGER,
+            bucket INTEGER,
+            version_id INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_version_lsh_bucket
+        ON version_lsh(company_id, band, bucket)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_version_lsh_version ON version_lsh(version_id)")
+
     conn.commit()
     conn.close()
\ No newline at end of file
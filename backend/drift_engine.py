@@ -1,17 +1,22 @@
 import sqlite3
 import json
 from backend.database import DB_PATH
-from backend.text_processing import normalize_text
-from backend.chunking import chunk_text
-from backend.embedding_engine import embed_chunks, compute_similarity_matrix
-from backend.llm_risk_engine import analyze_clause_with_llm
+from backend.versioning import get_company_versions
+from backend.clause_store import (
+    compare_versions, embed_clauses, load_verdicts, store_pair_outputs, store_verdicts
+)
+from backend.clause_classifier import analyze_clause_tiered
+from backend.llm_risk_engine import MODEL_NAME, PROMPT_VERSION
+from backend.metrics import stage
+from backend.scoring_config import SCORING
 
 
 # ==========================================
 # Structural Drift
 # ==========================================
 
-def compute_structural_drift(modified, removed, added, total_old):
+def compute_structural_drift(modified, removed, added, total_old,
+                             weights=SCORING["structural_weights"]):
     if total_old == 0:
         return 0.0
 
@@ -20,9 +25,9 @@ def compute_structural_drift(modified, removed, added, total_old):
     added_ratio = added / total_old
 
     score = (
-        modified_ratio * 0.4 +
-        removed_ratio * 0.3 +
-        added_ratio * 0.3
+        modified_ratio * weights["modified"] +
+        removed_ratio * weights["removed"] +
+        added_ratio * weights["added"]
     ) * 100
 
     return round(score, 2)
@@ -32,31 +37,35 @@ def compute_structural_drift(modified, removed, added, total_old):
 # Semantic Risk Aggregation
 # ==========================================
 
-def aggregate_semantic_risk(clause_results, structural_drift):
+def aggregate_semantic_risk(clause_results, structural_drift,
+                            weights=SCORING["semantic_risk"]):
 
     if not clause_results:
         return 0.0, "LOW"
 
     scores = [c["risk_score"] for c in clause_results]
 
+    high = weights["high_clause_score"]
+    medium = weights["medium_clause_score"]
+
     max_risk = max(scores)
-    high_risk_count = len([s for s in scores if s >= 7])
-    medium_risk_count = len([s for s in scores if 4 <= s < 7])
+    high_risk_count = len([s for s in scores if s >= high])
+    medium_risk_count = len([s for s in scores if medium <= s < high])
 
     base_score = (
-        max_risk * 0.5 +
-        high_risk_count * 0.7 +
-        medium_risk_count * 0.3
+        max_risk * weights["max_weight"] +
+        high_risk_count * weights["high_count_weight"] +
+        medium_risk_count * weights["medium_count_weight"]
     )
 
-    structural_multiplier = 1 + (structural_drift / 200)
+    structural_multiplier = 1 + (structural_drift / weights["structural_divisor"])
 
     final_score = base_score * structural_multiplier
     final_score = min(round(final_score, 2), 10)
 
-    if final_score >= 7:
+    if final_score >= weights["high_level"]:
         level = "HIGH"
-    elif final_score >= 4:
+    elif final_score >= weights["medium_level"]:
         level = "MEDIUM"
     else:
         level = "LOW"
@@ -68,7 +77,7 @@ def aggregate_semantic_risk(clause_results, structural_drift):
 # Policy Drift Engine
 # ==========================================
 
-def compute_policy_drift(company_name, mode="baseline", return_data=False):
+def compute_policy_drift(company_name, mode="baseline", return_data=False, fast_diff=False):
 
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
@@ -82,60 +91,39 @@ def compute_policy_drift(company_name, mode="baseline", return_data=False):
 
     company_id = company[0]
 
-    cursor.execute("""
-        SELECT content, timestamp FROM policy_versions
-        WHERE company_id=?
-        ORDER BY timestamp ASC
-    """, (company_id,))
-
-    versions = cursor.fetchall()
-    conn.close()
+    with stage("drift.sqlite_read") as timer:
+        versions = get_company_versions(cursor, company_id)
+        timer.add_items(len(versions))
 
     if len(versions) < 2:
+        conn.close()
         print("Not enough versions.")
         return
 
     if mode == "baseline":
-        old_text, old_time = versions[0]
-        new_text, new_time = versions[-1]
+        old_id, old_time = versions[0]
+        new_id, new_time = versions[-1]
     else:  # incremental
-        old_text, old_time = versions[-2]
-        new_text, new_time = versions[-1]
-
-    old_clean = normalize_text(old_text)
-    new_clean = normalize_text(new_text)
-
-    old_chunks = chunk_text(old_clean)
-    new_chunks = chunk_text(new_clean)
-
-    old_embeddings = embed_chunks(old_chunks)
-    new_embeddings = embed_chunks(new_chunks)
-
-    similarity_matrix = compute_similarity_matrix(old_embeddings, new_embeddings)
-
-    unchanged = 0
-    modified = 0
-    removed = 0
-    added = 0
-
-    matched_new_indices = set()
-
-    for row in similarity_matrix:
-        max_similarity = max(row)
-        max_index = row.tolist().index(max_similarity)
+        old_id, old_time = versions[-2]
+        new_id, new_time = versions[-1]
+
+    # Clauses come pre-chunked from the clause store; exact matches are
+    # resolved in SQL and only never-seen clauses are embedded.
+    # fast_diff further limits matching to the edited hunks.
+    old_chunks, new_chunks, match = compare_versions(
+        conn, old_id, new_id, "drift", fast_diff=fast_diff
+    )
 
-        if max_similarity > 0.95:
-            unchanged += 1
-            matched_new_indices.add(max_index)
-        elif max_similarity > 0.75:
-            modified += 1
-            matched_new_indices.add(max_index)
-        else:
-            removed += 1
+    modified = match["modified"]
+    removed = match["removed"]
+    matched_new_indices = match["matched_new_indices"]
+    added = len(new_chunks) - len(matched_new_indices)
 
-    for j in range(len(new_chunks)):
-        if j not in matched_new_indices:
-            added += 1
+    # Cached embeddings used to pick each new clause's prompt context
+    unmatched = [j for j in range(len(new_chunks)) if j not in matched_new_indices]
+    with stage("drift.llm_context", items=len(unmatched)):
+        old_embeddings = embed_clauses(conn, old_chunks) if unmatched else None
+        new_embeddings = embed_clauses(conn, [new_chunks[j] for j in unmatched])
 
     structural_drift = compute_structural_drift(
         modified, removed, added, len(old_chunks)
@@ -143,15 +131,30 @@ def compute_policy_drift(company_name, mode="baseline", return_data=False):
 
     clause_results = []
 
-    for j in range(len(new_chunks)):
-        if j not in matched_new_indices:
+    # Clauses any company already had analyzed skip the LLM
+    stored = load_verdicts(conn, [new_chunks[j] for j in unmatched], MODEL_NAME, PROMPT_VERSION)
+
+    with stage("drift.llm_analysis") as timer:
+        for j, new_embedding in zip(unmatched, new_embeddings):
 
-            result = analyze_clause_with_llm(
+            result = stored.get(new_chunks[j]) or analyze_clause_tiered(
                 old_chunks,
-                new_chunks[j]
+                new_chunks[j],
+                old_embeddings,
+                new_embedding
             )
 
             clause_results.append(result)
+            timer.add_items(1)
+
+    store_pair_outputs(
+        conn, old_id, new_id, fast_diff, len(old_chunks), len(new_chunks),
+        match, zip(unmatched, clause_results)
+    )
+
+    # LLM verdicts double as training data for the local classifier
+    store_verdicts(conn, zip([new_chunks[j] for j in unmatched], clause_results), MODEL_NAME)
+    conn.close()
 
     semantic_score, semantic_level = aggregate_semantic_risk(
         clause_results,
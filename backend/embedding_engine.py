@@ -1,16 +1,42 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from backend.embedding_service import EmbeddingClient
+from backend.metrics import inc
 
-# Load once globally
-model = SentenceTransformer("all-MiniLM-L6-v2")
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Loaded once per process, on first use (crawler worker processes never need it,
+# nor do processes served by the embedding service)
+model = None
+
+_client = EmbeddingClient(model_name=MODEL_NAME)
+
+
+def get_model():
+    global model
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME)
+    return model
+
+
+def encode_local(chunks):
+    return get_model().encode(chunks, convert_to_numpy=True, normalize_embeddings=True)
 
 
 def embed_chunks(chunks):
     """
-    Convert list of text chunks into embedding vectors
+    Convert list of text chunks into embedding vectors.
+    Uses the shared embedding service when one is running, otherwise
+    loads the model in this process.
     """
-    embeddings = model.encode(chunks, convert_to_numpy=True, normalize_embeddings=True)
-    return embeddings
+    if len(chunks):
+        embeddings = _client.embed(chunks)
+        if embeddings is not None:
+            inc("cdd_embedding_requests_total", {"path": "service"})
+            return embeddings
+
+    inc("cdd_embedding_requests_total", {"path": "local"})
+    return encode_local(chunks)
 
 
 def compute_similarity_matrix(old_embeddings, new_embeddings):
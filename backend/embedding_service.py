@@ -0,0 +1,363 @@
+import os
+import sys
+import json
+import time
+import stat
+import queue
+import signal
+import socket
+import struct
+import tempfile
+import threading
+import socketserver
+import numpy as np
+from backend.metrics import inc, observe
+
+
+# ==============================
+# Settings
+# ==============================
+
+# Private to the current user: $XDG_RUNTIME_DIR, or a 0700 directory in the temp dir
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(
+    tempfile.gettempdir(), f"cdd-{os.getuid()}"
+)
+
+# "unix:<path>" or "<host>:<port>"; "off" disables the service for this process.
+# A unix socket is only used if it and its directory belong to the current user.
+SERVICE_ADDRESS = os.environ.get(
+    "CDD_EMBEDDING_SERVICE",
+    "unix:" + os.path.join(RUNTIME_DIR, "cdd-embedding.sock"),
+)
+
+# Requests arriving within this window are encoded as one batch
+MAX_BATCH_WAIT = 0.005
+MAX_BATCH_TEXTS = 256
+
+CLIENT_TIMEOUT = 60
+
+# After a failed connection, encode in-process for this long before retrying
+RECONNECT_INTERVAL = 30
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_FRAME = struct.Struct(">I")
+
+
+def _parse_address(address):
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _trusted_socket(path):
+    """
+    True if path is a socket owned by the current user, in a directory no
+    other user can replace it in (owned by the user and not writable by
+    others, or sticky like /tmp).
+    """
+    try:
+        info = os.lstat(path)
+        parent = os.stat(os.path.dirname(os.path.abspath(path)))
+    except OSError:
+        return False
+
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        return False
+    if parent.st_mode & stat.S_ISVTX:
+        return True
+    return parent.st_uid in (os.getuid(), 0) and not parent.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+# ==============================
+# Framing
+# ==============================
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def send_frame(sock, payload):
+    sock.sendall(_FRAME.pack(len(payload)) + payload)
+
+
+def recv_frame(sock):
+    (size,) = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    return _recv_exact(sock, size)
+
+
+# ==============================
+# Server
+# ==============================
+
+class MicroBatcher:
+    """
+    Collects encode requests from concurrent connections and runs them
+    through the model together: a batch closes MAX_BATCH_WAIT after its
+    first request arrives, or once it holds MAX_BATCH_TEXTS texts.
+    """
+
+    def __init__(self, encode, max_wait=MAX_BATCH_WAIT, max_texts=MAX_BATCH_TEXTS):
+        self.encode = encode
+        self.max_wait = max_wait
+        self.max_texts = max_texts
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def submit(self, texts):
+        item = {"texts": texts, "done": threading.Event(), "vectors": None, "error": None}
+        self.queue.put(item)
+        item["done"].wait()
+        if item["error"] is not None:
+            raise item["error"]
+        return item["vectors"]
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            size = len(first["texts"])
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+
+            while size < self.max_texts:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item["texts"])
+
+            self._encode_batch(batch, size)
+
+            if stopping:
+                return
+
+    def _encode_batch(self, batch, size):
+        observe("cdd_embedding_service_batch_texts", size, buckets=BATCH_SIZE_BUCKETS)
+        observe("cdd_embedding_service_batch_requests", len(batch), buckets=BATCH_SIZE_BUCKETS)
+
+        try:
+            vectors = np.asarray(
+                self.encode([t for item in batch for t in item["texts"]]), dtype=np.float32
+            )
+            offset = 0
+            for item in batch:
+                item["vectors"] = vectors[offset:offset + len(item["texts"])]
+                offset += len(item["texts"])
+        except Exception as e:
+            for item in batch:
+                item["error"] = e
+
+        for item in batch:
+            item["done"].set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """One persistent client connection; each request frame gets a header and a vector frame."""
+
+    def handle(self):
+        while True:
+            try:
+                request = json.loads(recv_frame(self.request))
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                texts = request.get("texts", [])
+                vectors = self.server.batcher.submit(texts) if texts else np.zeros((0, 0), np.float32)
+                header = {"model": self.server.model_name, "rows": vectors.shape[0],
+                          "dim": vectors.shape[1] if vectors.ndim == 2 else 0}
+                payload = vectors.tobytes()
+            except Exception as e:
+                header, payload = {"error": str(e)}, b""
+
+            try:
+                send_frame(self.request, json.dumps(header).encode("utf-8"))
+                send_frame(self.request, payload)
+            except OSError:
+                return
+
+
+# Many clients (e.g. timeline worker threads) may connect at once
+LISTEN_BACKLOG = 128
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+def serve(address=SERVICE_ADDRESS):
+    """Load the model once and serve embeddings until interrupted."""
+
+    from backend.embedding_engine import MODEL_NAME, encode_local, get_model
+
+    family, target = _parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.dirname(os.path.abspath(target)) == os.path.abspath(RUNTIME_DIR):
+            os.makedirs(RUNTIME_DIR, mode=0o700, exist_ok=True)
+            info = os.lstat(RUNTIME_DIR)
+            if info.st_uid != os.getuid() or info.st_mode & 0o077:
+                raise PermissionError(f"{RUNTIME_DIR} must be a directory owned by this user with mode 0700")
+
+        # A socket file left by a previous run would block bind(); anything
+        # else at that path isn't ours to remove
+        if os.path.lexists(target):
+            if not _trusted_socket(target):
+                raise PermissionError(f"{target} exists and is not a socket owned by this user")
+            os.unlink(target)
+
+        # Only this user may connect
+        umask = os.umask(0o077)
+        try:
+            server = _UnixServer(target, _Handler)
+        finally:
+            os.umask(umask)
+    else:
+        server = _TCPServer(target, _Handler)
+
+    get_model()
+    server.model_name = MODEL_NAME
+    server.batcher = MicroBatcher(encode_local).start()
+
+    # Stop cleanly (and remove the socket file) under a process manager too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    print(f"Embedding service ({MODEL_NAME}) listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.stop()
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.unlink(target)
+
+
+# ==============================
+# Client
+# ==============================
+
+class EmbeddingClient:
+    """
+    Talks to the service over one connection per thread. embed() returns
+    None whenever the service can't be used, and the caller encodes locally.
+    """
+
+    def __init__(self, address=SERVICE_ADDRESS, model_name=None):
+        self.address = address
+        self.model_name = model_name
+        self.local = threading.local()
+        self.retry_at = 0.0
+
+    def _connect(self):
+        family, target = _parse_address(self.address)
+        if family == socket.AF_UNIX and not os.path.exists(target):
+            return None  # no service running; not worth a warning
+        if family == socket.AF_UNIX and not _trusted_socket(target):
+            inc("cdd_embedding_service_fallbacks_total", {"reason": "untrusted"})
+            print(f"Ignoring embedding service socket {target}: not owned by this user.")
+            return None
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(CLIENT_TIMEOUT)
+        sock.connect(target)
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self.local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self.local.sock = None
+
+    def embed(self, texts):
+        if self.address == "off" or time.monotonic() < self.retry_at:
+            return None
+
+        try:
+            if getattr(self.local, "sock", None) is None:
+                self.local.sock = self._connect()
+            sock = self.local.sock
+            if sock is None:
+                self.retry_at = time.monotonic() + RECONNECT_INTERVAL
+                return None
+
+            send_frame(sock, json.dumps({"texts": list(texts)}).encode("utf-8"))
+            header = json.loads(recv_frame(sock))
+            payload = recv_frame(sock)
+        except (OSError, ValueError) as e:
+            self._disconnect()
+            self.retry_at = time.monotonic() + RECONNECT_INTERVAL
+            inc("cdd_embedding_service_fallbacks_total", {"reason": "unavailable"})
+            print(f"Embedding service unavailable ({e}); encoding in-process.")
+            return None
+
+        if "error" in header:
+            inc("cdd_embedding_service_fallbacks_total", {"reason": "error"})
+            return None
+
+        # Vectors from another model would not match the embedding cache
+        if self.model_name and header["model"] != self.model_name:
+            inc("cdd_embedding_service_fallbacks_total", {"reason": "model"})
+            self.retry_at = time.monotonic() + RECONNECT_INTERVAL
+            return None
+
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["rows"], header["dim"])
+
+    def ping(self):
+        vectors = self.embed(["ping"])
+        return vectors is not None
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        serve(sys.argv[2] if len(sys.argv) >= 3 else SERVICE_ADDRESS)
+
+    elif len(sys.argv) >= 2 and sys.argv[1] == "status":
+        client = EmbeddingClient()
+        start = time.perf_counter()
+        if client.ping():
+            print(f"Embedding service up at {SERVICE_ADDRESS} "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms round trip)")
+        else:
+            print(f"No embedding service at {SERVICE_ADDRESS}")
+
+    else:
+        print("Usage: python -m backend.embedding_service serve [unix:/path.sock | host:port]")
+        print("       python -m backend.embedding_service status")
@@ -1,3 +1,7 @@
+from backend.text_processing import normalize_text
+from backend.chunking import chunk_text
+
+
 # ======================================
 # Rule-Based Expansion Signal Extraction
 # ======================================
@@ -44,4 +48,36 @@ def extract_expansion_signals(clause_text: str):
                 detected_categories.append(category)
                 break
 
-    return detected_categories
\ No newline at end of file
+    return detected_categories
+
+# ======================================
+# Text Screening Pipeline
+# ======================================
+
+def analyze_text_signals(text: str):
+    """
+    Chunk a policy text and collect the clauses that carry expansion signals.
+    """
+
+    cleaned = normalize_text(text)
+    chunks = chunk_text(cleaned)
+
+    results = []
+    signal_summary = {}
+
+    for chunk in chunks:
+        signals = extract_expansion_signals(chunk)
+        if signals:
+            results.append({
+                "text": chunk,
+                "expansion_signals": signals,
+            })
+            for s in signals:
+                signal_summary[s] = signal_summary.get(s, 0) + 1
+
+    return {
+        "total_chunks": len(chunks),
+        "flagged_chunks": len(results),
+        "flagged_clauses": results,
+        "signal_summary": signal_summary,
+    }
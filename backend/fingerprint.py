@@ -0,0 +1,330 @@
+import os
+import re
+import sys
+import sqlite3
+import hashlib
+import numpy as np
+from backend.database import DB_PATH, init_db
+from backend.text_processing import normalize_text as clean_text
+from backend.chunking import chunk_text
+from backend.clause_store import normalized_hash
+from backend.versioning import forget_timeline
+
+
+# ==============================
+# Settings
+# ==============================
+
+# A new version whose clauses are the same as the last analyzed version's, in
+# the same order, once dates are masked and case/whitespace folded, is a
+# cosmetic revision: stored, but not analyzed. There is deliberately no
+# similarity threshold: any clause-level change, however small, is analyzed.
+# Set to 0 to analyze every version.
+COSMETIC_REVISIONS = os.environ.get("CDD_COSMETIC_REVISIONS", "1") != "0"
+
+# Words per shingle
+SHINGLE_SIZE = 5
+
+# MinHash signature length, split into LSH_BANDS bands for the index.
+# 16 bands of 8 rows make versions above ~0.8 similarity near-certain candidates.
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16
+
+# Default estimated similarity for history lookups
+LOOKUP_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed: signatures must stay comparable across runs
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+# ==============================
+# Fingerprints
+# ==============================
+
+_MONTHS = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+    r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+
+# Calendar dates only; every other number (retention periods, ages, amounts) is kept
+_DATES = re.compile(
+    rf"\b{_MONTHS}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}\b"           # January 5, 2024
+    rf"|\b\d{{1,2}}(?:st|nd|rd|th)?(?:\s+of)?\s+{_MONTHS}\s+\d{{4}}\b"  # 5th of January 2024
+    rf"|\b{_MONTHS}\s+\d{{4}}\b"                                          # January 2024
+    r"|\b\d{4}-\d{1,2}-\d{1,2}\b"                                         # 2024-01-05
+    r"|\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b",                               # 01/05/2024
+    re.IGNORECASE,
+)
+
+# Short "Last updated: ..." / "Effective 2024" lines, whatever their date format
+_DATE_LINES = re.compile(
+    r"^(?:last\s+(?:updated|modified|revised)|effective(?:\s+date)?|updated|revised)\b"
+    r"(?=[^\n]*\d)[^\n]{0,60}$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def mask_dates(text):
+    """Dates and "last updated" lines replaced by a placeholder."""
+    return _DATES.sub("#date#", _DATE_LINES.sub("#date#", text))
+
+
+def normalize_text(text):
+    """Lowercase, dates masked, whitespace collapsed."""
+    return re.sub(r"\s+", " ", mask_dates(text).lower()).strip()
+
+
+def clause_keys(text):
+    """
+    Normalized hashes of a version's clauses in document order, chunked as
+    the clause store does, with dates masked first. Compared as sequences,
+    so reordered, duplicated or dropped repeated clauses are changes.
+    """
+    return [normalized_hash(c) for c in chunk_text(mask_dates(clean_text(text)))]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of 32-bit hashes of every `size`-word window of the normalized text."""
+
+    words = normalize_text(text).split(" ")
+    windows = [" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))]
+    return {
+        int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=4).digest(), "big")
+        for w in windows
+    }
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash_signature(shingle_set):
+    """MINHASH_PERMUTATIONS minimum hashes (uint32) over the shingle set."""
+
+    values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    if not len(values):
+        return np.full(MINHASH_PERMUTATIONS, _MAX_HASH, dtype=np.uint32)
+
+    # (a*x + b) mod p; uint64 products wrap, as in the usual numpy MinHash
+    permuted = (_PERM_A[:, None] * values[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return np.bitwise_and(permuted, _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def estimate_similarity(signature_a, signature_b):
+    return float(np.mean(signature_a == signature_b))
+
+
+def lsh_buckets(signature, bands=LSH_BANDS):
+    """[(band, bucket)] with each band of the signature hashed to a signed 64-bit bucket."""
+
+    rows = len(signature) // bands
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            "big", signed=True,
+        ))
+        for band in range(bands)
+    ]
+
+
+# ==============================
+# Storage
+# ==============================
+
+def _content(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="ignore")
+    return value or ""
+
+
+def store_fingerprint(conn, company_id, version_id, signature, cosmetic_of=None, similarity=None):
+    """Fingerprint, LSH buckets and cosmetic flag of one version. Doesn't commit."""
+
+    conn.execute("""
+        INSERT OR REPLACE INTO version_fingerprints (
+            version_id, company_id, minhash, cosmetic_of, similarity
+        ) VALUES (?, ?, ?, ?, ?)
+    """, (version_id, company_id, signature.tobytes(), cosmetic_of, similarity))
+
+    conn.execute("DELETE FROM version_lsh WHERE version_id=?", (version_id,))
+    conn.executemany("""
+        INSERT INTO version_lsh (company_id, band, bucket, version_id)
+        VALUES (?, ?, ?, ?)
+    """, [(company_id, band, bucket, version_id) for band, bucket in lsh_buckets(signature)])
+
+    conn.execute(
+        "UPDATE policy_versions SET cosmetic=? WHERE id=?",
+        (int(cosmetic_of is not None), version_id),
+    )
+
+
+def latest_analyzed_version(conn, company_id, exclude=None):
+    """(id, content) of the company's newest non-cosmetic version, or None."""
+
+    return conn.execute("""
+        SELECT id, content FROM policy_versions
+        WHERE company_id=? AND cosmetic=0 AND id IS NOT ?
+        ORDER BY timestamp DESC, id DESC
+        LIMIT 1
+    """, (company_id, exclude)).fetchone()
+
+
+def classify_new_version(conn, company_id, version_id, text):
+    """
+    Fingerprint a just-stored version and compare its clauses with the last
+    analyzed version of the company. A version with the same clauses in the
+    same order is flagged cosmetic, which keeps it out of drift and timeline
+    analysis. Doesn't commit.
+    Returns {"cosmetic", "similarity", "anchor_id"}; similarity is the
+    shingle overlap, for information only.
+    """
+
+    new_shingles = shingles(text)
+    anchor = latest_analyzed_version(conn, company_id, exclude=version_id)
+
+    similarity = None
+    cosmetic = False
+    if anchor:
+        anchor_text = _content(anchor[1])
+        similarity = round(jaccard(shingles(anchor_text), new_shingles), 4)
+        cosmetic = COSMETIC_REVISIONS and clause_keys(anchor_text) == clause_keys(text)
+
+    store_fingerprint(
+        conn, company_id, version_id, minhash_signature(new_shingles),
+        cosmetic_of=anchor[0] if cosmetic else None, similarity=similarity,
+    )
+
+    return {"cosmetic": cosmetic, "similarity": similarity, "anchor_id": anchor[0] if anchor else None}
+
+
+def classify_company_versions(conn, company_id):
+    """
+    Re-fingerprint a company's whole history in order (after bulk imports,
+    or after changing how versions are compared). Commits. Returns the
+    number of cosmetic versions. Stored timeline pairs from the first
+    version whose classification changed onward are dropped.
+    """
+
+    rows = conn.execute("""
+        SELECT id, timestamp, content, cosmetic FROM policy_versions
+        WHERE company_id=?
+        ORDER BY timestamp ASC, id ASC
+    """, (company_id,)).fetchall()
+
+    anchor_id, anchor_shingles, anchor_keys = None, None, None
+    cosmetic_count = 0
+    first_changed = None
+
+    for version_id, timestamp, content, was_cosmetic in rows:
+        text = _content(content)
+        version_shingles = shingles(text)
+        version_keys = clause_keys(text)
+
+        similarity = None
+        cosmetic_of = None
+        if anchor_id is not None:
+            similarity = round(jaccard(anchor_shingles, version_shingles), 4)
+            if COSMETIC_REVISIONS and version_keys == anchor_keys:
+                cosmetic_of = anchor_id
+
+        store_fingerprint(
+            conn, company_id, version_id, minhash_signature(version_shingles),
+            cosmetic_of=cosmetic_of, similarity=similarity,
+        )
+
+        if cosmetic_of is None:
+            anchor_id, anchor_shingles, anchor_keys = version_id, version_shingles, version_keys
+        else:
+            cosmetic_count += 1
+
+        if first_changed is None and bool(was_cosmetic) != (cosmetic_of is not None):
+            first_changed = timestamp
+
+    if first_changed is not None:
+        forget_timeline(conn, company_id, first_changed)
+
+    conn.commit()
+    return cosmetic_count
+
+
+# ==============================
+# History Lookup
+# ==============================
+
+def find_near_duplicates(conn, company_id, signature, threshold=LOOKUP_THRESHOLD):
+    """
+    Versions of the company whose estimated similarity to signature is at
+    least threshold, found through the LSH index rather than a scan of the
+    history. Returns [(version_id, estimated similarity)], most similar first.
+    """
+
+    candidates = set()
+    for band, bucket in lsh_buckets(signature):
+        candidates.update(
+            row[0] for row in conn.execute("""
+                SELECT version_id FROM version_lsh
+                WHERE company_id=? AND band=? AND bucket=?
+            """, (company_id, band, bucket))
+        )
+
+    matches = []
+    for version_id in candidates:
+        row = conn.execute(
+            "SELECT minhash FROM version_fingerprints WHERE version_id=?", (version_id,)
+        ).fetchone()
+        similarity = estimate_similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+        if similarity >= threshold:
+            matches.append((version_id, similarity))
+
+    return sorted(matches, key=lambda m: (-m[1], m[0]))
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "backfill":
+        init_db()
+        conn = sqlite3.connect(DB_PATH)
+        query = "SELECT id, name FROM companies"
+        params = ()
+        if len(sys.argv) >= 3:
+            query += " WHERE name=?"
+            params = (sys.argv[2],)
+        for company_id, name in conn.execute(query, params).fetchall():
+            total = conn.execute(
+                "SELECT COUNT(*) FROM policy_versions WHERE company_id=?", (company_id,)
+            ).fetchone()[0]
+            cosmetic = classify_company_versions(conn, company_id)
+            print(f"{name:<30} {total} versions, {cosmetic} cosmetic")
+        conn.close()
+
+    elif len(sys.argv) == 4 and sys.argv[1] == "similar":
+        init_db()
+        conn = sqlite3.connect(DB_PATH)
+        row = conn.execute("""
+            SELECT f.company_id, f.minhash FROM version_fingerprints f
+            JOIN companies c ON c.id = f.company_id
+            WHERE c.name=? AND f.version_id=?
+        """, (sys.argv[2], int(sys.argv[3]))).fetchone()
+        if not row:
+            print("Version not fingerprinted (run backfill first).")
+        else:
+            signature = np.frombuffer(row[1], dtype=np.uint32)
+            for version_id, similarity in find_near_duplicates(conn, row[0], signature):
+                if version_id != int(sys.argv[3]):
+                    print(f"version {version_id:<8} ~{similarity:.3f}")
+        conn.close()
+
+    else:
+        print("Usage: python -m backend.fingerprint backfill [CompanyName]")
+        print("       python -m backend.fingerprint similar <CompanyName> <version_id>")
@@ -0,0 +1,468 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+import requests
+from urllib3.exceptions import ReadTimeoutError
+from backend.metrics import observe, inc
+
+
+# ==========================================
+# Settings
+# ==========================================
+
+OLLAMA_URL = os.environ.get("CDD_OLLAMA_URL", "http://127.0.0.1:11434/api/generate")
+MODEL_NAME = os.environ.get("CDD_OLLAMA_MODEL", "mistral:instruct")
+PROVIDER_NAME = os.environ.get("CDD_LLM_PROVIDER", "ollama")
+
+# Streaming mode closes the request as soon as a complete verdict has
+# been generated instead of waiting for the model to stop on its own
+STREAM_RESPONSES = os.environ.get("CDD_OLLAMA_STREAM", "1") != "0"
+
+# Per-clause generation budgets
+MAX_RESPONSE_TOKENS = 256
+CLAUSE_TIME_BUDGET = 60
+
+# Connecting should be instant on a local server; reads allow for a slow first
+# token (raise CDD_LLM_READ_TIMEOUT if loading the model takes longer)
+CONNECT_TIMEOUT = float(os.environ.get("CDD_LLM_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.environ.get("CDD_LLM_READ_TIMEOUT", "20"))
+HEALTH_TIMEOUT = 2
+
+# Circuit breaker: open once this share of the recent calls failed, or after
+# this many timeouts in a row (a hung server shouldn't cost BREAKER_MIN_CALLS
+# full read timeouts)
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 5
+BREAKER_ERROR_RATE = 0.5
+BREAKER_TIMEOUT_STREAK = 2
+BREAKER_COOLDOWN = 30
+
+# Retries may add at most this fraction on top of first attempts
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MIN = 3
+
+TOKEN_RATE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500)
+
+
+class LLMUnavailable(Exception):
+    """Raised without contacting the provider while the circuit is open."""
+
+
+# ==========================================
+# Safe JSON Extraction
+# ==========================================
+
+def safe_extract_json(text):
+    if not text:
+        return None
+
+    # Remove markdown code fences if present
+    text = text.strip()
+    text = text.replace("```json", "").replace("```", "").strip()
+
+    # Try direct parse first
+    try:
+        return json.loads(text)
+    except:
+        pass
+
+    # Try to extract first JSON object non-greedily
+    matches = re.findall(r"\{.*?\}", text, re.DOTALL)
+    for match in matches:
+        try:
+            return json.loads(match)
+        except:
+            continue
+
+    return None
+
+
+class JsonObjectScanner:
+    """
+    Incremental scan for the first complete top-level JSON object in text
+    that arrives piece by piece. feed() returns the parsed object once its
+    closing brace has been seen, otherwise None.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.depth = 0
+        self.start = None
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, piece):
+        offset = len(self.text)
+        self.text += piece
+
+        for i in range(offset, len(self.text)):
+            ch = self.text[i]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+
+            if ch == '"' and self.depth > 0:
+                self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.start = i
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        return json.loads(self.text[self.start:i + 1])
+                    except ValueError:
+                        continue
+
+        return None
+
+
+# ==========================================
+# Providers
+# ==========================================
+
+class LLMProvider:
+    """
+    A model server. generate() returns the parsed JSON object the model
+    produced (or None if it produced no JSON) and raises on transport
+    errors; is_complete(obj) lets streaming providers stop early.
+    """
+
+    name = "base"
+
+    def generate(self, prompt, is_complete=None):
+        raise NotImplementedError
+
+    def health(self):
+        return True
+
+
+class OllamaProvider(LLMProvider):
+
+    name = "ollama"
+
+    def __init__(self, url=OLLAMA_URL, model=MODEL_NAME, stream=STREAM_RESPONSES,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.url = url
+        self.model = model
+        self.stream = stream
+        self.timeout = (connect_timeout, read_timeout)
+
+    @property
+    def tags_url(self):
+        return self.url.rsplit("/api/", 1)[0] + "/api/tags"
+
+    def health(self):
+        try:
+            response = requests.get(self.tags_url, timeout=HEALTH_TIMEOUT)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def generate(self, prompt, is_complete=None):
+        if self.stream:
+            return self.generate_streaming(prompt, is_complete)
+        return self.generate_blocking(prompt)
+
+    def generate_blocking(self, prompt):
+        """Waits for the full generation, then parses it."""
+
+        response = requests.post(
+            self.url,
+            json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": False,
+                "format": "json",   # 🔥 THIS IS IMPORTANT
+                "options": {"num_predict": MAX_RESPONSE_TOKENS},
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        raw_json = response.json()
+
+        raw_output = raw_json.get("response", "")
+
+        return safe_extract_json(raw_output)
+
+    def generate_streaming(self, prompt, is_complete=None, max_tokens=MAX_RESPONSE_TOKENS,
+                           time_budget=CLAUSE_TIME_BUDGET):
+        """
+        Parses the response as it arrives and closes the connection as soon
+        as a complete object satisfies is_complete.
+        Stops with an error once the token or time budget is spent.
+        Records time-to-first-token and generation rate.
+        """
+
+        start = time.perf_counter()
+        first_token_at = None
+        tokens = 0
+        scanner = JsonObjectScanner()
+        result = None
+
+        response = requests.post(
+            self.url,
+            json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True,
+                "format": "json",
+                "options": {"num_predict": max_tokens},
+            },
+            timeout=self.timeout,
+            stream=True,
+        )
+
+        try:
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+
+                chunk = json.loads(line)
+                piece = chunk.get("response", "")
+
+                if piece:
+                    tokens += 1
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        observe("cdd_llm_ttft_seconds", first_token_at - start)
+
+                    parsed = scanner.feed(piece)
+                    if parsed is not None and (is_complete is None or is_complete(parsed)):
+                        result = parsed
+                        if not chunk.get("done"):
+                            inc("cdd_llm_early_stops_total")
+                        break
+
+                if chunk.get("done"):
+                    break
+
+                if tokens >= max_tokens:
+                    raise ValueError(f"LLM token budget exceeded ({max_tokens} tokens)")
+                if time.perf_counter() - start > time_budget:
+                    raise TimeoutError(f"LLM time budget exceeded ({time_budget}s)")
+
+        finally:
+            # Closing mid-stream makes Ollama stop generating for this request
+            response.close()
+
+        if first_token_at is not None and tokens > 1:
+            generation_time = time.perf_counter() - first_token_at
+            if generation_time > 0:
+                observe("cdd_llm_tokens_per_second", (tokens - 1) / generation_time,
+                        buckets=TOKEN_RATE_BUCKETS)
+
+        # Stream ended without a complete object; salvage what we can
+        return result or safe_extract_json(scanner.text)
+
+
+PROVIDERS = {
+    "ollama": OllamaProvider,
+}
+
+
+def register_provider(name, provider_class):
+    PROVIDERS[name] = provider_class
+
+
+# ==========================================
+# Failure Handling
+# ==========================================
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and outcomes are tracked over a sliding window;
+    it opens on the window's error rate, or on `timeout_streak` timeouts in
+    a row.
+    Open: calls fail immediately for `cooldown` seconds.
+    Half-open: after the cooldown, a health probe decides whether a single
+    trial call may go through; its outcome closes or re-opens the circuit.
+    Calls admitted before the circuit opened may still finish meanwhile;
+    their outcomes don't count.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 error_rate=BREAKER_ERROR_RATE, cooldown=BREAKER_COOLDOWN,
+                 timeout_streak=BREAKER_TIMEOUT_STREAK):
+        self.outcomes = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.timeout_streak = timeout_streak
+        self.timeouts = 0
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trial = None
+        self.lock = threading.Lock()
+
+    def _transition(self, state):
+        self.state = state
+        inc("cdd_llm_breaker_transitions_total", {"state": state})
+        print(f"LLM circuit {state}")
+
+    def allow(self, probe):
+        """
+        probe: callable returning True if the provider looks healthy.
+        Returns False if the call must fail fast, otherwise a ticket to pass
+        to record() with the call's outcome.
+        """
+
+        with self.lock:
+            if self.state == "closed":
+                return True
+
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self._transition("half_open")
+
+            if self.trial is not None:
+                return False
+            trial = self.trial = object()
+
+        # Probe outside the lock; other callers keep failing fast meanwhile
+        if probe():
+            return trial
+
+        with self.lock:
+            self.trial = None
+            self.opened_at = time.monotonic()
+            self._transition("open")
+        return False
+
+    def record(self, success, ticket=True, timed_out=False):
+        with self.lock:
+            if self.state == "half_open":
+                if ticket is not self.trial:
+                    return
+                self.trial = None
+                self.outcomes.clear()
+                self.timeouts = 0
+                if success:
+                    self._transition("closed")
+                else:
+                    self.opened_at = time.monotonic()
+                    self._transition("open")
+                return
+
+            self.outcomes.append(success)
+            self.timeouts = self.timeouts + 1 if timed_out else 0
+            failures = self.outcomes.count(False)
+            if self.state == "closed" and (
+                self.timeouts >= self.timeout_streak
+                or (len(self.outcomes) >= self.min_calls
+                    and failures / len(self.outcomes) >= self.error_rate)
+            ):
+                self.opened_at = time.monotonic()
+                self.timeouts = 0
+                self._transition("open")
+
+
+class RetryBudget:
+    """Each first attempt earns `ratio` of a retry; a retry spends one."""
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, minimum=RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.balance = float(minimum)
+        self.cap = float(max(minimum, 1 / ratio if ratio else minimum))
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.balance = min(self.cap, self.balance + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.balance >= 1:
+                self.balance -= 1
+                return True
+            return False
+
+
+def _timed_out(error):
+    """Read timeouts (before or mid-stream) and spent time budgets: the server may be hung."""
+    if isinstance(error, (requests.ReadTimeout, TimeoutError)):
+        return True
+    # requests reports a read timeout while streaming as a ConnectionError
+    return isinstance(error, requests.ConnectionError) and any(
+        isinstance(arg, ReadTimeoutError) for arg in error.args
+    )
+
+
+def _retryable(error):
+    if _timed_out(error):
+        return False  # retrying a hung server only doubles the wait
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
+
+
+# ==========================================
+# Backend
+# ==========================================
+
+class LLMBackend:
+    """A provider behind a circuit breaker and a retry budget."""
+
+    def __init__(self, provider, breaker=None, retry_budget=None):
+        self.provider = provider
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+
+    def generate(self, prompt, is_complete=None):
+        ticket = self.breaker.allow(self.provider.health)
+        if not ticket:
+            inc("cdd_llm_short_circuits_total")
+            raise LLMUnavailable(f"{self.provider.name} unavailable (circuit {self.breaker.state})")
+
+        self.retry_budget.deposit()
+
+        while True:
+            try:
+                result = self.provider.generate(prompt, is_complete)
+            except Exception as e:
+                if _retryable(e) and self.breaker.state == "closed" and self.retry_budget.withdraw():
+                    inc("cdd_llm_retries_total")
+                    continue
+                self.breaker.record(False, ticket, timed_out=_timed_out(e))
+                raise
+
+            self.breaker.record(True, ticket)
+            return result
+
+    def health(self):
+        return self.provider.health()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = LLMBackend(PROVIDERS[PROVIDER_NAME]())
+        return _backend
+
+
+def set_backend(backend):
+    """Swap the process-wide backend (another provider, or tuned breaker settings)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -1,9 +1,25 @@
-import requests
-import json
-import re
+import time
+import numpy as np
+from backend.metrics import record_llm_request, observe
+from backend.llm_backend import (
+    MODEL_NAME,
+    LLMUnavailable,
+    get_backend,
+)
 
-OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
-MODEL_NAME = "mistral:instruct"
+# Bump whenever the prompt text or context selection changes, so stored
+# results and benchmark runs can be compared per prompt version
+PROMPT_VERSION = "retrieval-v1"
+
+# Most similar old clauses given to the model as context
+PROMPT_CONTEXT_CLAUSES = 5
+
+# Rough prompt cap (~4 characters per token); prompt tokens dominate latency
+PROMPT_TOKEN_BUDGET = 512
+
+PROMPT_TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096)
+
+REQUIRED_VERDICT_KEYS = ("risk_score", "expansion", "categories", "reason")
 
 
 # ==========================================
@@ -85,96 +101,108 @@ def extract_rule_categories(text):
 
 
 # ==========================================
-# Safe JSON Extraction
+# Prompt Construction
 # ==========================================
 
-def safe_extract_json(text):
-    if not text:
-        return None
+PROMPT_TEMPLATE = """You are a privacy policy risk analysis system.
+Compare the related OLD policy clauses to the NEW clause.
 
-    # Remove markdown code fences if present
-    text = text.strip()
-    text = text.replace("```json", "").replace("```", "").strip()
+OLD CLAUSES:
+{context}
 
-    # Try direct parse first
-    try:
-        return json.loads(text)
-    except:
-        pass
-
-    # Try to extract first JSON object non-greedily
-    matches = re.findall(r"\{.*?\}", text, re.DOTALL)
-    for match in matches:
-        try:
-            return json.loads(match)
-        except:
-            continue
+NEW CLAUSE:
+{new_clause}
 
-    return None
+Allowed categories: {categories}
+Return ONLY valid JSON:
+{{"risk_score": 0-10, "expansion": true/false, "categories": [allowed categories only], "reason": "short explanation"}}
+"""
 
+PROMPT_CATEGORIES = ", ".join(sorted(ALLOWED_CATEGORIES))
 
-# ==========================================
-# Hybrid LLM + Rule Analysis
-# ==========================================
 
-def analyze_clause_with_llm(old_clauses, new_clause):
+def estimate_tokens(text):
+    return len(text) // 4 + 1
 
-    # Rule-based categories
-    rule_categories = extract_rule_categories(new_clause)
 
-    prompt = f"""
-You are a privacy policy risk analysis system.
+def select_context_clauses(old_clauses, old_embeddings=None, new_embedding=None,
+                           k=PROMPT_CONTEXT_CLAUSES):
+    """
+    The k old clauses most similar to the new clause, most similar first.
+    Without embeddings, falls back to the first k clauses of the old policy.
+    """
 
-Compare OLD policy clauses to NEW clause.
+    if old_embeddings is None or new_embedding is None or len(old_clauses) <= k:
+        return list(old_clauses[:k])
 
-OLD POLICY:
-{old_clauses[:10]}
+    scores = np.asarray(old_embeddings) @ np.asarray(new_embedding)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
 
-NEW CLAUSE:
-{new_clause}
+    return [old_clauses[i] for i in top]
 
-Allowed categories:
-- ai_training
-- profiling
-- cross_platform_sharing
-- data_aggregation
-- retention_expansion
-- third_party_sharing
-- automated_decision_making
-- historical_data_reclassification
 
-Return ONLY valid JSON:
+def build_prompt(context_clauses, new_clause, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Compact prompt: one numbered line per context clause, added in rank
+    order until the budget is used up. Over-long new clauses are clipped.
+    """
 
-{{
-  "risk_score": number (0-10),
-  "expansion": true/false,
-  "categories": [list from allowed categories only],
-  "reason": "short explanation"
-}}
-"""
+    new_clause = new_clause[:token_budget * 2]
+    prompt = PROMPT_TEMPLATE.format(
+        context="(none)", new_clause=new_clause, categories=PROMPT_CATEGORIES
+    )
+    remaining = token_budget - estimate_tokens(prompt)
 
-    try:
-        response = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": MODEL_NAME,
-                "prompt": prompt,
-                "stream": False,
-                "format": "json"   # 🔥 THIS IS IMPORTANT
-            },
-            timeout=120
-        )
-       
+    lines = []
+    for clause in context_clauses:
+        line = f"{len(lines) + 1}. {clause}"
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            continue
+        lines.append(line)
+        remaining -= cost
 
-        raw_json = response.json()
+    if not lines:
+        return prompt
 
-        raw_output = raw_json.get("response", "")
+    return PROMPT_TEMPLATE.format(
+        context="\n".join(lines), new_clause=new_clause, categories=PROMPT_CATEGORIES
+    )
 
-        parsed = safe_extract_json(raw_output)
+
+def is_verdict(obj):
+    return isinstance(obj, dict) and all(key in obj for key in REQUIRED_VERDICT_KEYS)
+
+
+# ==========================================
+# Hybrid LLM + Rule Analysis
+# ==========================================
+
+def analyze_clause_with_llm(old_clauses, new_clause, old_embeddings=None, new_embedding=None):
+    """
+    Risk verdict for one new clause. With embeddings, the prompt carries the
+    old clauses most similar to it instead of the start of the old policy.
+    """
+
+    # Rule-based categories
+    rule_categories = extract_rule_categories(new_clause)
+
+    context = select_context_clauses(old_clauses, old_embeddings, new_embedding)
+    prompt = build_prompt(context, new_clause)
+    prompt_tokens = estimate_tokens(prompt)
+    observe("cdd_llm_prompt_tokens", prompt_tokens, buckets=PROMPT_TOKEN_BUCKETS)
+
+    start = time.perf_counter()
+
+    try:
+        parsed = get_backend().generate(prompt, is_verdict)
 
         if not parsed:
             raise ValueError("Invalid JSON from LLM")
 
+        record_llm_request(time.perf_counter() - start, "ok")
+
         # Filter LLM categories to allowed ontology only
         llm_categories = [
             cat for cat in parsed.get("categories", [])
@@ -188,13 +216,33 @@ Return ONLY valid JSON:
             "risk_score": int(parsed.get("risk_score", 0)),
             "expansion": bool(parsed.get("expansion", False)),
             "categories": final_categories,
-            "reason": parsed.get("reason", "")
+            "reason": parsed.get("reason", ""),
+            "prompt_version": PROMPT_VERSION,
+            "prompt_tokens": prompt_tokens,
+            "verdict_source": "llm",
+        }
+
+    except LLMUnavailable as e:
+        # Circuit open: fall back to rules without waiting on the server
+        record_llm_request(time.perf_counter() - start, "unavailable")
+        return {
+            "risk_score": 0,
+            "expansion": False,
+            "categories": rule_categories,
+            "reason": f"LLM unavailable: {str(e)}",
+            "prompt_version": PROMPT_VERSION,
+            "prompt_tokens": prompt_tokens,
+            "verdict_source": "rules",
         }
 
     except Exception as e:
+        record_llm_request(time.perf_counter() - start, "error")
         return {
             "risk_score": 0,
             "expansion": False,
             "categories": rule_categories,
-            "reason": f"LLM error: {str(e)}"
+            "reason": f"LLM error: {str(e)}",
+            "prompt_version": PROMPT_VERSION,
+            "prompt_tokens": prompt_tokens,
+            "verdict_source": "rules",
         }
\ No newline at end of file
@@ -0,0 +1,264 @@
+import threading
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+
+
+# ==============================
+# Metric Store
+# ==============================
+
+# Histogram buckets (seconds) shared by stage and LLM timings
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {
+    "cdd_stage_duration_seconds": "Time spent per pipeline stage",
+    "cdd_stage_items_total": "Items processed per pipeline stage",
+    "cdd_cache_requests_total": "Cache lookups by cache and result",
+    "cdd_llm_request_seconds": "LLM request latency",
+    "cdd_llm_requests_total": "LLM requests by outcome",
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name, labels=None, value=1):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, labels=None, buckets=DURATION_BUCKETS):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            _histograms[key] = hist
+
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                hist["counts"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# ==============================
+# Instrumentation Helpers
+# ==============================
+
+# Active stage names per thread, kept only while a profiler asks for them, and
+# only for threads working for the profiled run (see bind_context)
+_track_stages = False
+_stage_stacks = {}
+_profiled = contextvars.ContextVar("cdd_profiled", default=False)
+
+
+def track_stages():
+    """
+    Start recording the stage stacks of the calling context, and of pool
+    work bound to it with bind_context. Returns a token for untrack_stages.
+    """
+    global _track_stages
+    _track_stages = True
+    return _profiled.set(True)
+
+
+def untrack_stages(token):
+    global _track_stages
+    _track_stages = False
+    _profiled.reset(token)
+    with _lock:
+        _stage_stacks.clear()
+
+
+def bind_context(fn):
+    """
+    fn bound to a copy of the caller's context, for work handed to a thread
+    pool: its stages then count towards the caller's profile, if any.
+    Bind once per task (one context can't run in two threads at once).
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def active_stages():
+    """{thread id: [stage names, outermost first]} for profiled threads inside a stage."""
+    with _lock:
+        return {tid: list(names) for tid, names in _stage_stacks.items() if names}
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+
+    def add_items(self, count):
+        self.items += count
+
+
+@contextmanager
+def stage(name, items=0):
+    """
+    Time a pipeline stage:
+
+        with stage("drift.embed_chunks", items=len(chunks)):
+            ...
+    """
+    handle = _Stage(name)
+    handle.add_items(items)
+
+    names = None
+    if _track_stages and _profiled.get():
+        with _lock:
+            names = _stage_stacks.setdefault(threading.get_ident(), [])
+            names.append(name)
+
+    start = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        if names is not None:
+            with _lock:
+                if names and names[-1] == name:
+                    names.pop()
+        observe("cdd_stage_duration_seconds", time.perf_counter() - start, {"stage": name})
+        if handle.items:
+            inc("cdd_stage_items_total", {"stage": name}, handle.items)
+
+
+def record_cache(cache, hit, count=1):
+    inc("cdd_cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"}, count)
+
+
+def record_llm_request(seconds, outcome):
+    observe("cdd_llm_request_seconds", seconds)
+    inc("cdd_llm_requests_total", {"outcome": outcome})
+
+
+# ==============================
+# Prometheus Exposition
+# ==============================
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + list(extra or [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: dict(v, counts=list(v["counts"])) for k, v in _histograms.items()}
+
+    lines = []
+    seen = set()
+
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {_help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), hist in sorted(histograms.items()):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {_help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+
+        for bound, count in zip(hist["buckets"], hist["counts"]):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {round(hist['sum'], 6)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ==============================
+# CLI Timing Summary
+# ==============================
+
+def timing_summary():
+    """Structured per-stage, cache and LLM summary of everything recorded so far."""
+
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: dict(v) for k, v in _histograms.items()}
+
+    stages = {}
+    for (name, labels), hist in histograms.items():
+        if name != "cdd_stage_duration_seconds":
+            continue
+        stage_name = dict(labels)["stage"]
+        stages[stage_name] = {
+            "calls": hist["count"],
+            "total_seconds": round(hist["sum"], 4),
+            "items": counters.get(_key("cdd_stage_items_total", {"stage": stage_name}), 0),
+        }
+
+    caches = {}
+    for (name, labels), value in counters.items():
+        if name != "cdd_cache_requests_total":
+            continue
+        label_map = dict(labels)
+        entry = caches.setdefault(label_map["cache"], {"hit": 0, "miss": 0})
+        entry[label_map["result"]] += value
+
+    for entry in caches.values():
+        total = entry["hit"] + entry["miss"]
+        entry["hit_rate"] = round(entry["hit"] / total, 4) if total else 0.0
+
+    llm_hist = histograms.get(_key("cdd_llm_request_seconds", None))
+    llm = {
+        "requests": llm_hist["count"] if llm_hist else 0,
+        "total_seconds": round(llm_hist["sum"], 4) if llm_hist else 0.0,
+        "outcomes": {
+            dict(labels)["outcome"]: value
+            for (name, labels), value in counters.items()
+            if name == "cdd_llm_requests_total"
+        },
+    }
+
+    return {"stages": stages, "caches": caches, "llm": llm}
+
+
+def print_timing_summary():
+    summary = timing_summary()
+
+    print("\n" + "=" * 75)
+    print("TIMING SUMMARY")
+    print("=" * 75)
+
+    for name, data in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["total_seconds"]):
+        items = f"  items={data['items']}" if data["items"] else ""
+        print(f"{name:<40} {data['total_seconds']:>10.3f}s  calls={data['calls']}{items}")
+
+    for name, data in sorted(summary["caches"].items()):
+        print(f"cache {name:<34} hit_rate={data['hit_rate']:.2%}  hits={data['hit']}  misses={data['miss']}")
+
+    if summary["llm"]["requests"]:
+        llm = summary["llm"]
+        avg = llm["total_seconds"] / llm["requests"]
+        print(f"{'llm requests':<40} {llm['total_seconds']:>10.3f}s  calls={llm['requests']}  avg={avg:.3f}s  {llm['outcomes']}")
+
+    print("=" * 75)
+
+    return summary
@@ -0,0 +1,188 @@
+import zlib
+from backend.crawler import generate_hash
+from backend.clause_index import index_version
+from backend.clause_store import ingest_version_clauses
+from backend.fingerprint import classify_new_version
+from backend.metrics import stage, inc
+
+
+# ==============================
+# Batched Crawl Writes
+# ==============================
+
+WRITE_BATCH_SIZE = 50
+
+# SQLite caps bound parameters per statement; stay well below it
+_IN_CLAUSE_LIMIT = 500
+
+
+def _chunks(items, size=_IN_CLAUSE_LIMIT):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def upsert_companies(conn, companies):
+    """
+    companies: iterable of (name, url). Inserts missing rows with one
+    executemany and returns {name: id}. Does not commit.
+    """
+
+    companies = dict(companies)
+    conn.executemany(
+        "INSERT OR IGNORE INTO companies (name, url) VALUES (?, ?)",
+        list(companies.items()),
+    )
+
+    ids = {}
+    names = list(companies)
+    for batch in _chunks(names):
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(
+            f"SELECT name, id FROM companies WHERE name IN ({placeholders})", batch
+        )
+        ids.update(cursor.fetchall())
+
+    return ids
+
+
+def latest_hashes(conn, company_ids):
+    """{company_id: hash of its latest version}"""
+
+    result = {}
+    company_ids = list(company_ids)
+    for batch in _chunks(company_ids):
+        placeholders = ",".join("?" for _ in batch)
+        cursor = conn.execute(f"""
+            SELECT pv.company_id, pv.hash FROM policy_versions pv
+            WHERE pv.company_id IN ({placeholders})
+              AND pv.id = (
+                  SELECT id FROM policy_versions
+                  WHERE company_id = pv.company_id
+                  ORDER BY timestamp DESC, id DESC
+                  LIMIT 1
+              )
+        """, batch)
+        result.update(cursor.fetchall())
+
+    return result
+
+
+class CrawlResultWriter:
+    """
+    Buffers crawl results and writes each batch in a single transaction:
+    companies, versions, clauses, section hashes and raw HTML go in with
+    one commit (one fsync) per batch.
+
+    Re-running a batch after a crash is harmless: a result whose hash
+    already is the company's latest version is skipped.
+    """
+
+    def __init__(self, conn, batch_size=WRITE_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.pending = []
+        self.outcomes = {}
+
+    def add(self, entry, text, html=None, sections=None):
+        if not text:
+            print(f"❌ Failed to fetch {entry['company']}")
+            self.outcomes[entry["company"]] = "failed"
+            return
+
+        self.pending.append({
+            "company": entry["company"],
+            "url": entry["url"],
+            "text": text,
+            "hash": generate_hash(text),
+            "html": html,
+            "sections": sections or [],
+        })
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return self.outcomes
+
+        batch, self.pending = self.pending, []
+        conn = self.conn
+
+        with stage("crawl.sqlite_write") as timer:
+            # sqlite3's context manager commits on success, rolls back on error
+            with conn:
+                company_ids = upsert_companies(conn, ((r["company"], r["url"]) for r in batch))
+                latest = latest_hashes(conn, company_ids.values())
+
+                to_insert = []
+                for result in batch:
+                    company_id = company_ids[result["company"]]
+                    if latest.get(company_id) == result["hash"]:
+                        self.outcomes[result["company"]] = "unchanged"
+                        print(f"✓ No change detected for {result['company']}")
+                        continue
+
+                    latest[company_id] = result["hash"]
+                    result["company_id"] = company_id
+                    to_insert.append(result)
+
+                max_before = conn.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM policy_versions"
+                ).fetchone()[0]
+
+                conn.executemany("""
+                    INSERT INTO policy_versions (company_id, hash, content)
+                    VALUES (?, ?, ?)
+                """, [(r["company_id"], r["hash"], r["text"]) for r in to_insert])
+
+                # The write lock is held, so new ids follow insertion order
+                new_ids = conn.execute("""
+                    SELECT id FROM policy_versions WHERE id > ? ORDER BY id
+                """, (max_before,)).fetchall()
+
+                for r, (version_id,) in zip(to_insert, new_ids):
+                    r["version_id"] = version_id
+                    ingest_version_clauses(conn, version_id, r["text"])
+                    r["near"] = classify_new_version(conn, r["company_id"], version_id, r["text"])
+
+                conn.executemany("""
+                    INSERT INTO version_sections (version_id, position, url, hash)
+                    VALUES (?, ?, ?, ?)
+                """, [
+                    (r["version_id"], position, s["url"], generate_hash(s["content"]))
+                    for r in to_insert
+                    for position, s in enumerate(r["sections"])
+                ])
+
+                conn.executemany("""
+                    INSERT INTO raw_snapshots (company_id, url, html_hash, html, version_id)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (
+                        r["company_id"], r["url"], generate_hash(r["html"]),
+                        zlib.compress(r["html"].encode("utf-8")), r["version_id"],
+                    )
+                    for r in to_insert if r["html"]
+                ])
+
+            timer.add_items(len(batch))
+
+        inc("cdd_write_batches_total")
+
+        # Derived data; safe to rebuild with `python -m backend.clause_index update`
+        for r in to_insert:
+            if r["near"]["cosmetic"]:
+                self.outcomes[r["company"]] = "cosmetic"
+                print(f"✓ Cosmetic revision stored for {r['company']} "
+                      f"({r['near']['similarity']} similar to version {r['near']['anchor_id']})")
+                continue
+
+            self.outcomes[r["company"]] = "changed"
+            print(f"✓ New version stored for {r['company']}")
+            try:
+                with stage("crawl.clause_index") as timer:
+                    timer.add_items(index_version(conn, r["version_id"]))
+            except Exception as e:
+                print("Clause index error:", e)
+
+        return self.outcomes
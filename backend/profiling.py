@@ -0,0 +1,231 @@
+import os
+import re
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+from backend.metrics import track_stages, untrack_stages, active_stages
+
+
+# ==============================
+# Settings
+# ==============================
+
+PROFILE_DIR = os.environ.get("CDD_PROFILE_DIR", "backend/profiles")
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# "collapsed": sampled stacks for flamegraph.pl / speedscope / inferno
+# "pstats":    deterministic cProfile output for snakeviz / pstats
+PROFILE_FORMATS = ("collapsed", "pstats")
+
+NO_STAGE = "(no stage)"
+
+# One profile at a time: samples cover every thread, so overlapping
+# profiles would attribute each other's work
+_active = threading.Lock()
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# ==============================
+# Sampling Profiler
+# ==============================
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the profiled thread, and of threads doing its work
+    (pool tasks bound with bind_context, e.g. timeline workers) while they
+    are inside a pipeline stage, every `interval` seconds. Other threads,
+    such as concurrent requests, are left out. Each stack is rooted at the
+    stage names active in its thread. Process-wide traced memory is read at
+    each sample; per stage, the highest reading is kept. That is not the
+    stage's own allocation peak: concurrent work counts too.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, owner=None):
+        self.interval = interval
+        self.owner = owner or threading.get_ident()
+        self.stacks = {}
+        self.stage_samples = {}
+        self.stage_traced_bytes = {}
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="cdd-profiler")
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frames = sys._current_frames()
+        stages = active_stages()
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+        for tid, frame in frames.items():
+            names = stages.get(tid)
+            if tid == self.thread.ident or (tid != self.owner and not names):
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+
+            key = ";".join((names or [NO_STAGE]) + stack)
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+            for name in names or [NO_STAGE]:
+                self.stage_samples[name] = self.stage_samples.get(name, 0) + 1
+                self.stage_traced_bytes[name] = max(self.stage_traced_bytes.get(name, 0), memory)
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+# ==============================
+# Profiled Runs
+# ==============================
+
+def _profile_path(name, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return os.path.join(output_dir, f"{safe}-{stamp}")
+
+
+@contextmanager
+def profile_run(name, output_dir=PROFILE_DIR, fmt="collapsed", track_memory=True):
+    """
+    Profile the enclosed block:
+
+        with profile_run("audit-Google") as profile:
+            run_full_audit("Google")
+        print(profile["files"])
+
+    Writes <name>-<time>.collapsed (or .pstats) plus a .json summary with
+    wall time, the allocation peak, and per stage the sample count and the
+    highest process-wide traced memory seen at its samples. If another profile is already running, the block runs
+    unprofiled and profile["files"] stays empty.
+    """
+
+    if fmt not in PROFILE_FORMATS:
+        raise ValueError(f"Unknown profile format {fmt!r} (use one of: {', '.join(PROFILE_FORMATS)})")
+
+    profile = {"name": name, "files": []}
+
+    if not _active.acquire(blocking=False):
+        profile["skipped"] = "another profile is running"
+        yield profile
+        return
+
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    sampler = SamplingProfiler() if fmt == "collapsed" else None
+    deterministic = cProfile.Profile() if fmt == "pstats" else None
+
+    tracking = track_stages()
+    start = time.perf_counter()
+
+    if sampler:
+        sampler.start()
+    else:
+        deterministic.enable()
+
+    try:
+        yield profile
+    finally:
+        # Released even if stopping or writing fails, or every later profile is skipped
+        try:
+            if sampler:
+                sampler.stop()
+            else:
+                deterministic.disable()
+
+            wall = time.perf_counter() - start
+            untrack_stages(tracking)
+
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+            if started_tracing:
+                tracemalloc.stop()
+
+            base = _profile_path(name, output_dir)
+            if sampler:
+                sampler.write_collapsed(base + ".collapsed")
+                profile["files"].append(base + ".collapsed")
+            else:
+                deterministic.dump_stats(base + ".pstats")
+                profile["files"].append(base + ".pstats")
+
+            summary = {
+                "name": name,
+                "format": fmt,
+                "wall_seconds": round(wall, 4),
+                "peak_alloc_bytes": peak,
+            }
+            if sampler:
+                summary.update({
+                    "sample_interval": sampler.interval,
+                    "samples": sampler.samples,
+                    "stages": {
+                        stage_name: {
+                            "samples": count,
+                            "max_traced_bytes_at_sample": sampler.stage_traced_bytes.get(stage_name) if peak is not None else None,
+                        }
+                        for stage_name, count in sorted(sampler.stage_samples.items())
+                    },
+                })
+
+            with open(base + ".json", "w") as f:
+                json.dump(summary, f, indent=2)
+            profile["files"].append(base + ".json")
+            profile["summary"] = summary
+        finally:
+            _active.release()
+
+
+def print_profile(profile):
+    if not profile["files"]:
+        print(f"Profile skipped: {profile.get('skipped')}")
+        return
+
+    summary = profile["summary"]
+    print(f"\nProfile written ({summary['wall_seconds']}s): {', '.join(profile['files'])}")
+    if summary["format"] == "pstats":
+        pstats.Stats(profile["files"][0]).sort_stats("cumulative").print_stats(15)
+
+
+def strip_profile_flags(argv):
+    """(argv without --profile / --profile=<format>, format or None)."""
+
+    fmt = None
+    rest = []
+    for arg in argv:
+        if arg == "--profile":
+            fmt = "collapsed"
+        elif arg.startswith("--profile="):
+            fmt = arg.split("=", 1)[1]
+        else:
+            rest.append(arg)
+    return rest, fmt
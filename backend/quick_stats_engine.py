@@ -0,0 +1,266 @@
+import sqlite3
+import json
+from backend.database import DB_PATH
+from backend.versioning import get_company_versions
+from backend.clause_store import load_version_chunks, embed_clauses
+from backend.embedding_engine import compute_similarity_matrix
+from backend.similarity_engine import match_clauses
+from backend.drift_engine import compute_structural_drift
+from backend.scoring_config import SCORING, scoring_hash
+from backend.expansion_signal_engine import extract_expansion_signals
+from backend.metrics import stage, record_cache
+
+
+# Scoring settings quick-stats depend on; cached stats are keyed by their hash
+QUICK_STATS_SCORING_KEYS = ("unchanged_threshold", "modified_threshold", "structural_weights")
+
+
+# ==============================
+# Version Lookup
+# ==============================
+
+def fetch_version_timestamps(cursor, company_id, version_ids):
+    """{id: timestamp} for just the requested versions of one company."""
+    if not version_ids:
+        return {}
+
+    placeholders = ",".join("?" for _ in version_ids)
+    cursor.execute(f"""
+        SELECT id, timestamp FROM policy_versions
+        WHERE company_id=? AND id IN ({placeholders})
+    """, (company_id, *version_ids))
+
+    return dict(cursor.fetchall())
+
+
+# ==============================
+# Cache
+# ==============================
+
+def _cache_key(scoring):
+    return scoring_hash(scoring, QUICK_STATS_SCORING_KEYS)
+
+
+def get_cached_stats(cursor, old_id, new_id, scoring=SCORING):
+    """Cached stats of the pair, if computed under the same scoring settings."""
+    cursor.execute("""
+        SELECT result FROM quick_stats_cache
+        WHERE old_version_id=? AND new_version_id=? AND scoring_hash=?
+    """, (old_id, new_id, _cache_key(scoring)))
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def store_cached_stats(conn, rows, scoring=SCORING):
+    """rows: list of (old_id, new_id, result dict)"""
+    key = _cache_key(scoring)
+    conn.executemany("""
+        INSERT OR REPLACE INTO quick_stats_cache (old_version_id, new_version_id, result, scoring_hash)
+        VALUES (?, ?, ?, ?)
+    """, [(old_id, new_id, json.dumps(result), key) for old_id, new_id, result in rows])
+    conn.commit()
+
+
+# ==============================
+# Structural Stats
+# ==============================
+
+def compute_pair_stats(old_chunks, new_chunks, old_embeddings, new_embeddings, scoring=SCORING):
+    """Structural comparison of two chunked versions (no LLM), scored as drift reports are."""
+
+    sim_matrix = compute_similarity_matrix(old_embeddings, new_embeddings)
+    match = match_clauses(sim_matrix, scoring["unchanged_threshold"], scoring["modified_threshold"])
+
+    matched_new = match["matched_new_indices"]
+    added = len(new_chunks) - len(matched_new)
+
+    # Collect new clauses and their expansion signals
+    new_clauses = []
+    all_signals = {}
+    for j in range(len(new_chunks)):
+        if j not in matched_new:
+            signals = extract_expansion_signals(new_chunks[j])
+            new_clauses.append({
+                "text": new_chunks[j],
+                "expansion_signals": signals,
+            })
+            for s in signals:
+                all_signals[s] = all_signals.get(s, 0) + 1
+
+    total_old = len(old_chunks)
+    structural_drift = compute_structural_drift(
+        match["modified"], match["removed"], added, total_old, scoring["structural_weights"]
+    )
+
+    return {
+        "total_old_chunks": total_old,
+        "total_new_chunks": len(new_chunks),
+        "unchanged": match["unchanged"],
+        "modified": match["modified"],
+        "removed": match["removed"],
+        "added": added,
+        "structural_drift": structural_drift,
+        "new_clauses": new_clauses,
+        "expansion_signals_summary": all_signals,
+    }
+
+
+def _pair_result(old_id, old_time, new_id, new_time, stats):
+    return {
+        "old_version_id": old_id,
+        "new_version_id": new_id,
+        "old_version_date": old_time,
+        "new_version_date": new_time,
+        **stats,
+    }
+
+
+# ==============================
+# Quick Stats
+# ==============================
+
+def compute_quick_stats(company_name, old_id=None, new_id=None, scoring=SCORING):
+    """
+    Structural stats between two versions of a company.
+    Defaults to the earliest and latest versions. Results are cached per
+    pair and scoring settings.
+    Returns (result, error) where error is (message, status) on failure.
+    """
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT id FROM companies WHERE name=?", (company_name,))
+        company = cursor.fetchone()
+        if not company:
+            return None, ("Company not found", 404)
+
+        company_id = company[0]
+
+        if old_id is None or new_id is None:
+            versions = get_company_versions(cursor, company_id)
+            if len(versions) < 2:
+                return None, ("Not enough versions for comparison", 400)
+
+            old_id = versions[0][0] if old_id is None else old_id
+            new_id = versions[-1][0] if new_id is None else new_id
+
+        if old_id == new_id:
+            return None, ("Choose two different versions", 400)
+
+        # Before the cache: a cached pair of another company must not be served
+        timestamps = fetch_version_timestamps(cursor, company_id, [old_id, new_id])
+        if old_id not in timestamps or new_id not in timestamps:
+            return None, ("Version not found", 404)
+
+        cached = get_cached_stats(cursor, old_id, new_id, scoring)
+        record_cache("quick_stats", cached is not None)
+        if cached:
+            return {"company": company_name, "cached": True, **cached}, None
+
+        old_time = timestamps[old_id]
+        new_time = timestamps[new_id]
+
+        old_chunks = load_version_chunks(conn, old_id)
+        new_chunks = load_version_chunks(conn, new_id)
+
+        # One lookup for both versions; only unseen clauses hit the model
+        with stage("quick_stats.embed_chunks", items=len(old_chunks) + len(new_chunks)):
+            embeddings = embed_clauses(conn, old_chunks + new_chunks)
+        stats = compute_pair_stats(
+            old_chunks,
+            new_chunks,
+            embeddings[:len(old_chunks)],
+            embeddings[len(old_chunks):],
+            scoring,
+        )
+
+        result = _pair_result(old_id, old_time, new_id, new_time, stats)
+        store_cached_stats(conn, [(old_id, new_id, result)], scoring)
+
+        return {"company": company_name, "cached": False, **result}, None
+
+    finally:
+        conn.close()
+
+
+def compute_adjacent_quick_stats(company_name, scoring=SCORING):
+    """
+    Stats for every adjacent version pair of a company.
+    Uncached pairs are filled with a single batched embedding pass.
+    """
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT id FROM companies WHERE name=?", (company_name,))
+        company = cursor.fetchone()
+        if not company:
+            return None, ("Company not found", 404)
+
+        company_id = company[0]
+        versions = get_company_versions(cursor, company_id)
+        if len(versions) < 2:
+            return None, ("Not enough versions for comparison", 400)
+
+        pairs = [(versions[i - 1][0], versions[i][0]) for i in range(1, len(versions))]
+
+        results = {}
+        missing = []
+        for old_id, new_id in pairs:
+            cached = get_cached_stats(cursor, old_id, new_id, scoring)
+            if cached:
+                results[(old_id, new_id)] = cached
+            else:
+                missing.append((old_id, new_id))
+
+        record_cache("quick_stats", True, len(pairs) - len(missing))
+        record_cache("quick_stats", False, len(missing))
+
+        if missing:
+            needed_ids = sorted({vid for pair in missing for vid in pair})
+            timestamps = fetch_version_timestamps(cursor, company_id, needed_ids)
+
+            # Load every needed version's clauses once, then embed them all together
+            chunks_by_version = {}
+            all_chunks = []
+            offsets = {}
+            for vid in needed_ids:
+                chunks = load_version_chunks(conn, vid)
+                chunks_by_version[vid] = chunks
+                offsets[vid] = len(all_chunks)
+                all_chunks.extend(chunks)
+
+            with stage("quick_stats.embed_chunks", items=len(all_chunks)):
+                embeddings = embed_clauses(conn, all_chunks)
+
+            def version_embeddings(vid):
+                start = offsets[vid]
+                return embeddings[start:start + len(chunks_by_version[vid])]
+
+            new_rows = []
+            for old_id, new_id in missing:
+                stats = compute_pair_stats(
+                    chunks_by_version[old_id],
+                    chunks_by_version[new_id],
+                    version_embeddings(old_id),
+                    version_embeddings(new_id),
+                    scoring,
+                )
+                result = _pair_result(old_id, timestamps[old_id], new_id, timestamps[new_id], stats)
+                results[(old_id, new_id)] = result
+                new_rows.append((old_id, new_id, result))
+
+            store_cached_stats(conn, new_rows, scoring)
+
+        return {
+            "company": company_name,
+            "pairs": [results[pair] for pair in pairs],
+            "computed_pairs": len(missing),
+            "cached_pairs": len(pairs) - len(missing),
+        }, None
+
+    finally:
+        conn.close()
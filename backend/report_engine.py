@@ -7,6 +7,7 @@ from reportlab.lib.units import inch
 
 from backend.drift_engine import compute_policy_drift
 from backend.timeline_engine import compute_timeline_drift
+from backend.metrics import stage, print_timing_summary
 
 
 def generate_audit_report(company_name):
@@ -43,16 +44,27 @@ def generate_audit_report(company_name):
     elements.append(Paragraph("Timeline Analysis", styles["Heading2"]))
     elements.append(Preformatted(json.dumps(timeline, indent=2), styles["Code"]))
 
-    doc.build(elements)
+    with stage("report.build_pdf"):
+        doc.build(elements)
 
     return filepath
 
 
 if __name__ == "__main__":
     import sys
-
-    if len(sys.argv) != 2:
-        print("Usage: python -m backend.report_engine <CompanyName>")
+    from backend.profiling import profile_run, print_profile, strip_profile_flags
+
+    args, profile_format = strip_profile_flags(sys.argv[1:])
+
+    if len(args) != 1:
+        print("Usage: python -m backend.report_engine <CompanyName> [--profile[=collapsed|pstats]]")
+    elif profile_format:
+        with profile_run(f"report-{args[0]}", fmt=profile_format) as profile:
+            path = generate_audit_report(args[0])
+        print(f"\nReport generated at: {path}")
+        print_timing_summary()
+        print_profile(profile)
     else:
-        path = generate_audit_report(sys.argv[1])
-        print(f"\nReport generated at: {path}")
\ No newline at end of file
+        path = generate_audit_report(args[0])
+        print(f"\nReport generated at: {path}")
+        print_timing_summary()
\ No newline at end of file
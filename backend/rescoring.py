@@ -0,0 +1,321 @@
+import sys
+import json
+import time
+import sqlite3
+import numpy as np
+from backend.database import DB_PATH, init_db
+from backend.versioning import iter_company_versions
+from backend.scoring_config import SCORING, load_scoring_config
+from backend.llm_risk_engine import MODEL_NAME, PROMPT_VERSION
+from backend.risk_feed import cdi_risk_level, refresh_risk_feed
+from backend import drift_engine, timeline_engine
+
+
+# ==============================
+# Stored Pair Outputs
+# ==============================
+
+def load_pair_outputs(conn, company_id, fast_diff=False):
+    """{(old_version_id, new_version_id): raw output} for a company's analyzed pairs."""
+
+    rows = conn.execute("""
+        SELECT po.old_version_id, po.new_version_id, po.old_count, po.new_count,
+               po.best_scores, po.best_indices, po.verdicts
+        FROM pair_outputs po
+        JOIN policy_versions pv ON pv.id = po.new_version_id
+        WHERE pv.company_id = ? AND po.fast_diff = ?
+    """, (company_id, int(fast_diff))).fetchall()
+
+    return {
+        (old_id, new_id): {
+            "old_version_id": old_id,
+            "new_version_id": new_id,
+            "old_count": old_count,
+            "new_count": new_count,
+            "best_scores": np.frombuffer(scores, dtype=np.float32),
+            "best_indices": np.frombuffer(indices, dtype=np.int32),
+            "verdicts": {j: (risk, categories) for j, risk, categories in json.loads(verdicts)},
+        }
+        for old_id, new_id, old_count, new_count, scores, indices, verdicts in rows
+    }
+
+
+def _stored_verdicts(conn, version_id, positions):
+    """LLM verdicts for clauses of a version that were matched when it was analyzed."""
+
+    rows = conn.execute("""
+        SELECT vc.position, v.risk_score, v.categories
+        FROM version_clauses vc
+        JOIN clauses c ON c.id = vc.clause_id
+        JOIN llm_verdicts v ON v.clause_hash = c.hash
+        WHERE vc.version_id = ? AND v.model IS ? AND v.prompt_version IS ?
+    """, (version_id, MODEL_NAME, PROMPT_VERSION)).fetchall()
+
+    return {
+        position: (risk, json.loads(categories))
+        for position, risk, categories in rows
+        if position in positions
+    }
+
+
+# ==============================
+# Scoring Pass
+# ==============================
+
+def score_pair(conn, raw, scoring):
+    """
+    Re-match one pair from its stored best scores under the config's
+    thresholds. Returns (modified, removed, added, clause verdicts of the
+    unmatched new clauses in order, count of those without any verdict).
+    """
+
+    scores = raw["best_scores"]
+
+    # Same comparisons as match_clauses, on the same float32 values
+    unchanged_mask = scores > scoring["unchanged_threshold"]
+    modified_mask = ~unchanged_mask & (scores > scoring["modified_threshold"])
+
+    modified = int(modified_mask.sum())
+    removed = len(scores) - int(unchanged_mask.sum()) - modified
+    matched = set(raw["best_indices"][unchanged_mask | modified_mask].tolist())
+
+    unmatched = [j for j in range(raw["new_count"]) if j not in matched]
+    verdicts = raw["verdicts"]
+
+    # Clauses newly unmatched under these thresholds: use any stored verdict
+    needed = {j for j in unmatched if j not in verdicts}
+    if needed:
+        verdicts = {**verdicts, **_stored_verdicts(conn, raw["new_version_id"], needed)}
+
+    clause_results = [
+        {"risk_score": verdicts[j][0], "categories": verdicts[j][1]}
+        for j in unmatched if j in verdicts
+    ]
+
+    added = raw["new_count"] - len(matched)
+
+    return modified, removed, added, clause_results, len(unmatched) - len(clause_results)
+
+
+def _timeline_pair(old_version, new_version, raw, scored, scoring):
+    """A fold_timeline input pair from score_pair output, built as analyze_version_pair does."""
+
+    modified, removed, added, clause_results, _ = scored
+
+    category_severity = {}
+    for result in clause_results:
+        for cat in result["categories"]:
+            category_severity[cat] = max(category_severity.get(cat, 0), result["risk_score"] // 2)
+
+    semantic_score = (
+        sum([c["risk_score"] for c in clause_results]) / len(clause_results)
+        if clause_results else 0
+    )
+
+    return {
+        "old_version_id": old_version[0],
+        "new_version_id": new_version[0],
+        "from": old_version[1],
+        "to": new_version[1],
+        "structural_drift": timeline_engine.compute_structural_drift(
+            modified, removed, added, raw["old_count"], raw["new_count"],
+            scoring["structural_weights"]
+        ),
+        "semantic_score": semantic_score,
+        "category_severity": category_severity,
+    }
+
+
+def _drift_report(conn, raw, scoring):
+    if raw is None:
+        return None
+
+    modified, removed, added, clause_results, missing = score_pair(conn, raw, scoring)
+
+    structural_drift = drift_engine.compute_structural_drift(
+        modified, removed, added, raw["old_count"], scoring["structural_weights"]
+    )
+    semantic_score, level = drift_engine.aggregate_semantic_risk(
+        clause_results, structural_drift, scoring["semantic_risk"]
+    )
+
+    return {
+        "structural_drift": structural_drift,
+        "semantic_score": semantic_score,
+        "risk_level": level,
+        "missing_verdicts": missing,
+    }
+
+
+def rescore_company(conn, company_id, scoring=SCORING, fast_diff=False):
+    """
+    Timeline, CDI and drift reports of one company recomputed from stored
+    pair outputs. The timeline is only rescored when every consecutive
+    pair has been analyzed (cdi is None otherwise). Returns
+    (report, folded timeline for store_timeline_pairs).
+    """
+
+    outputs = load_pair_outputs(conn, company_id, fast_diff)
+    versions = list(iter_company_versions(conn, company_id))
+
+    report = {
+        "pairs": max(len(versions) - 1, 0),
+        "unanalyzed_pairs": 0,
+        "missing_verdicts": 0,
+        "cdi": None,
+        "irreversible": False,
+        "timeline": [],
+        "drift": {"baseline": None, "incremental": None},
+    }
+
+    pairs = []
+    for old_version, new_version in zip(versions, versions[1:]):
+        raw = outputs.get((old_version[0], new_version[0]))
+        if raw is None:
+            report["unanalyzed_pairs"] += 1
+            continue
+
+        scored = score_pair(conn, raw, scoring)
+        report["missing_verdicts"] += scored[4]
+        pairs.append(_timeline_pair(old_version, new_version, raw, scored, scoring))
+
+    folded = []
+    if pairs and not report["unanalyzed_pairs"]:
+        folded = list(timeline_engine.fold_timeline(pairs, scoring, verbose=False))
+        report["timeline"] = [entry for _, entry in folded]
+        report["cdi"] = folded[-1][1]["cdi"]
+        report["irreversible"] = any(entry["irreversible"] for _, entry in folded)
+
+    if len(versions) >= 2:
+        report["drift"]["baseline"] = _drift_report(
+            conn, outputs.get((versions[0][0], versions[-1][0])), scoring
+        )
+        report["drift"]["incremental"] = _drift_report(
+            conn, outputs.get((versions[-2][0], versions[-1][0])), scoring
+        )
+
+    return report, folded
+
+
+# ==============================
+# Comparison
+# ==============================
+
+def compare_scoring(candidate, current=SCORING, fast_diff=False, apply=False):
+    """
+    Rescore every company under the current and the candidate config, side
+    by side. With apply=True the candidate timelines replace the stored
+    ones (timeline_pairs and the risk feed).
+    """
+
+    start = time.perf_counter()
+
+    conn = sqlite3.connect(DB_PATH)
+    companies = conn.execute("SELECT id, name FROM companies ORDER BY name").fetchall()
+
+    rows = []
+    applied = []
+    for company_id, name in companies:
+        before, _ = rescore_company(conn, company_id, current, fast_diff)
+        after, folded = rescore_company(conn, company_id, candidate, fast_diff)
+        rows.append({"company": name, "current": before, "candidate": after})
+
+        if apply and folded:
+            timeline_engine.store_timeline_pairs(conn, company_id, folded, fast_diff)
+            applied.append(company_id)
+
+    if applied:
+        refresh_risk_feed(conn, applied)
+
+    conn.close()
+
+    compared = [
+        r for r in rows
+        if r["current"]["cdi"] is not None and r["candidate"]["cdi"] is not None
+    ]
+    deltas = [abs(r["candidate"]["cdi"] - r["current"]["cdi"]) for r in compared]
+
+    return {
+        "companies": rows,
+        "summary": {
+            "companies": len(rows),
+            "rescored": len(compared),
+            "risk_level_changes": sum(
+                cdi_risk_level(r["current"]["cdi"]) != cdi_risk_level(r["candidate"]["cdi"])
+                for r in compared
+            ),
+            "mean_abs_cdi_delta": round(sum(deltas) / len(deltas), 2) if deltas else 0.0,
+            "max_abs_cdi_delta": round(max(deltas), 2) if deltas else 0.0,
+            "missing_verdicts": sum(r["candidate"]["missing_verdicts"] for r in rows),
+            "applied": len(applied),
+            "seconds": round(time.perf_counter() - start, 3),
+        },
+    }
+
+
+def _drift_cell(drift):
+    if drift is None:
+        return "-"
+    return f"{drift['semantic_score']:.2f} {drift['risk_level']}"
+
+
+def print_comparison(result):
+    print(f"\n{'Company':<24}{'CDI':>16}{'Level':>18}{'Baseline drift':>28}{'Incremental drift':>28}")
+    print("=" * 114)
+
+    for row in result["companies"]:
+        current, candidate = row["current"], row["candidate"]
+
+        if current["cdi"] is None or candidate["cdi"] is None:
+            cdi = f"({current['unanalyzed_pairs']} pairs not analyzed)"
+            level = ""
+        else:
+            cdi = f"{current['cdi']:.2f} → {candidate['cdi']:.2f}"
+            level = f"{cdi_risk_level(current['cdi'])} → {cdi_risk_level(candidate['cdi'])}"
+
+        baseline = f"{_drift_cell(current['drift']['baseline'])} → {_drift_cell(candidate['drift']['baseline'])}"
+        incremental = f"{_drift_cell(current['drift']['incremental'])} → {_drift_cell(candidate['drift']['incremental'])}"
+
+        print(f"{row['company'][:23]:<24}{cdi:>16}{level:>18}{baseline:>28}{incremental:>28}")
+
+    summary = result["summary"]
+    print("=" * 114)
+    print(f"Rescored {summary['rescored']}/{summary['companies']} companies in {summary['seconds']}s; "
+          f"{summary['risk_level_changes']} change risk level, "
+          f"CDI delta mean {summary['mean_abs_cdi_delta']} / max {summary['max_abs_cdi_delta']}.")
+    if summary["missing_verdicts"]:
+        print(f"{summary['missing_verdicts']} newly unmatched clauses have no stored verdict "
+              f"and were left out; re-run the analysis to score them.")
+    if summary["applied"]:
+        print(f"Applied to {summary['applied']} companies (timeline_pairs and risk feed). "
+              f"Set CDD_SCORING_CONFIG so new analyses use the same config.")
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+
+    if len(args) == 2 and args[0] in ("compare", "apply"):
+        init_db()
+        result = compare_scoring(
+            load_scoring_config(args[1]),
+            fast_diff="--fast-diff" in flags,
+            apply=args[0] == "apply",
+        )
+        if "--json" in flags:
+            print(json.dumps(result, indent=2, default=str))
+        else:
+            print_comparison(result)
+
+    elif args == ["show-config"]:
+        print(json.dumps(SCORING, indent=2))
+
+    else:
+        print("Usage: python -m backend.rescoring compare <scoring.json> [--fast-diff] [--json]")
+        print("       python -m backend.rescoring apply <scoring.json> [--fast-diff]")
+        print("       python -m backend.rescoring show-config")
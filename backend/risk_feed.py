@@ -0,0 +1,274 @@
+import sys
+import gzip
+import json
+import struct
+import sqlite3
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from tld import get_fld
+from backend.database import DB_PATH, init_db
+
+
+# ==============================
+# Settings
+# ==============================
+
+# CDI bands, as colored on the dashboard
+HIGH_CDI = 60
+MEDIUM_CDI = 30
+
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+
+# Tombstone level of a domain dropped from the feed, so delta clients forget it
+REMOVED = "REMOVED"
+
+FEED_FIELDS = ["cdi", "risk_level", "irreversible", "last_change"]
+
+# Packed encoding: header, then one record per domain
+BINARY_MAGIC = b"CDDF"
+BINARY_FORMAT_VERSION = 2
+BINARY_HEADER = struct.Struct(">4sBII")     # magic, format version, feed version, count
+BINARY_RECORD = struct.Struct(">HBBI")      # cdi x 100, risk level index, flags, last change (epoch)
+BINARY_REMOVED = 0xFF                       # risk level index of a removed domain
+
+FORMATS = {
+    "json": "application/json",
+    "binary": "application/octet-stream",
+}
+
+# Delta bodies kept per (since, format) for the current feed version
+DELTA_CACHE_SIZE = 256
+
+
+def cdi_risk_level(cdi):
+    if cdi >= HIGH_CDI:
+        return "HIGH"
+    if cdi >= MEDIUM_CDI:
+        return "MEDIUM"
+    return "LOW"
+
+
+def feed_domain(url):
+    """
+    Registrable domain of the policy URL (privacycenter.instagram.com ->
+    instagram.com), which is what the extension matches visited sites on.
+    Hosts without a public suffix (localhost, IPs) are used as they are.
+    """
+    domain = get_fld(url, fail_silently=True, fix_protocol=True)
+    if domain:
+        return domain.lower()
+    host = urlparse(url).netloc.lower().split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def _epoch(timestamp):
+    """Stored timestamps are UTC (SQLite CURRENT_TIMESTAMP format)."""
+    if not timestamp:
+        return 0
+    return int(datetime.fromisoformat(str(timestamp)).replace(tzinfo=timezone.utc).timestamp())
+
+
+# ==============================
+# Refresh (runs when analyses land)
+# ==============================
+
+def refresh_risk_feed(conn, company_ids=None):
+    """
+    Recompute feed rows from stored timeline pairs. Domains whose row
+    changed get the next feed version and the full snapshots are rebuilt,
+    so serving never computes anything. When several companies share a
+    domain, the one with the highest CDI is published. Commits.
+    Returns the feed version (unchanged if nothing changed).
+    """
+
+    # Companies sharing a domain compete for its row, so all of them are
+    # recomputed whenever one is
+    domains = {
+        company_id: feed_domain(url or "")
+        for company_id, url in conn.execute("SELECT id, url FROM companies").fetchall()
+    }
+    if company_ids is not None:
+        refreshed = {domains[c] for c in company_ids if c in domains}
+        domains = {c: d for c, d in domains.items() if d in refreshed}
+    domains = {c: d for c, d in domains.items() if d}
+
+    query = f"""
+        SELECT c.id, c.name,
+               (SELECT tp.cdi FROM timeline_pairs tp
+                WHERE tp.company_id = c.id
+                ORDER BY tp.to_time DESC, tp.fast_diff ASC, tp.id DESC LIMIT 1),
+               (SELECT MAX(tp.irreversible) FROM timeline_pairs tp WHERE tp.company_id = c.id),
+               (SELECT MAX(pv.timestamp) FROM policy_versions pv
+                WHERE pv.company_id = c.id AND pv.cosmetic = 0)
+        FROM companies c
+        WHERE c.id IN ({','.join('?' for _ in domains)})
+    """
+
+    # One row per domain: the riskiest company on it (then the first by name)
+    best = {}
+    for company_id, name, cdi, irreversible, last_change in conn.execute(query, tuple(domains)).fetchall():
+        if cdi is None:
+            continue
+        domain = domains[company_id]
+        if domain not in best or (-cdi, name) < (-best[domain][2], best[domain][1]):
+            best[domain] = (domain, name, cdi, cdi_risk_level(cdi), int(bool(irreversible)), last_change)
+    rows = sorted(best.values())
+
+    current = feed_version(conn)
+
+    changed = []
+    for row in rows:
+        stored = conn.execute("""
+            SELECT company, cdi, risk_level, irreversible, last_change
+            FROM risk_feed WHERE domain=?
+        """, (row[0],)).fetchone()
+        if stored != row[1:]:
+            changed.append(row)
+
+    # A full refresh also drops domains no company maps to any more; they are
+    # kept as tombstones so delta clients learn of the removal
+    stale = []
+    if company_ids is None:
+        stale = [
+            d for (d,) in conn.execute("SELECT domain FROM risk_feed WHERE risk_level != ?", (REMOVED,))
+            if d not in best
+        ]
+
+    if not changed and not stale:
+        return current
+
+    version = current + 1
+    conn.executemany("""
+        UPDATE risk_feed
+        SET company=NULL, cdi=NULL, risk_level=?, irreversible=0, last_change=NULL, version=?
+        WHERE domain=?
+    """, [(REMOVED, version, domain) for domain in stale])
+    conn.executemany("""
+        INSERT OR REPLACE INTO risk_feed (
+            domain, company, cdi, risk_level, irreversible, last_change, version
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(*row, version) for row in changed])
+
+    entries = _feed_entries(conn, since=0)
+    conn.executemany("""
+        INSERT OR REPLACE INTO risk_feed_snapshots (format, version, body)
+        VALUES (?, ?, ?)
+    """, [
+        (fmt, version, gzip.compress(encode_feed(entries, version, 0, fmt)))
+        for fmt in FORMATS
+    ])
+    conn.commit()
+
+    _delta_cache.clear()
+
+    return version
+
+
+# ==============================
+# Encoding
+# ==============================
+
+def _feed_entries(conn, since):
+    """Rows changed after since; tombstones only in deltas (since > 0)."""
+    return conn.execute("""
+        SELECT domain, cdi, risk_level, irreversible, last_change
+        FROM risk_feed WHERE version > ? AND (? > 0 OR risk_level != ?)
+        ORDER BY domain
+    """, (since, since, REMOVED)).fetchall()
+
+
+def encode_feed(entries, version, since, fmt="json"):
+    """
+    json:   {"version", "since", "fields", "domains": {domain: [cdi, level, irreversible, epoch]}}
+            with null for a removed domain
+    binary: BINARY_HEADER, then per domain a length-prefixed UTF-8 name and
+            BINARY_RECORD (cdi x 100, index into RISK_LEVELS or BINARY_REMOVED,
+            bit 0 = irreversible)
+    """
+
+    if fmt == "binary":
+        parts = [BINARY_HEADER.pack(BINARY_MAGIC, BINARY_FORMAT_VERSION, version, len(entries))]
+        for domain, cdi, level, irreversible, last_change in entries:
+            name = domain.encode("utf-8")[:255]
+            parts.append(bytes([len(name)]) + name)
+            if level == REMOVED:
+                parts.append(BINARY_RECORD.pack(0, BINARY_REMOVED, 0, 0))
+                continue
+            parts.append(BINARY_RECORD.pack(
+                int(round(cdi * 100)), RISK_LEVELS.index(level), irreversible, _epoch(last_change)
+            ))
+        return b"".join(parts)
+
+    return json.dumps({
+        "version": version,
+        "since": since,
+        "fields": FEED_FIELDS,
+        "domains": {
+            domain: None if level == REMOVED else [cdi, level, irreversible, _epoch(last_change)]
+            for domain, cdi, level, irreversible, last_change in entries
+        },
+    }, separators=(",", ":")).encode("utf-8")
+
+
+# ==============================
+# Serving
+# ==============================
+
+_delta_cache = {}
+
+
+def feed_version(conn):
+    row = conn.execute("SELECT MAX(version) FROM risk_feed_snapshots").fetchone()
+    return row[0] or 0
+
+
+def feed_etag(version, since, fmt):
+    return f'"{version}-{since}-{fmt}"'
+
+
+def load_feed(conn, since=0, fmt="json"):
+    """
+    (feed version, gzip-compressed body). since=0 (or any version older than
+    the client can delta from) returns the precomputed full snapshot.
+    """
+
+    version = feed_version(conn)
+
+    if since <= 0 or since > version:
+        row = conn.execute(
+            "SELECT body FROM risk_feed_snapshots WHERE format=?", (fmt,)
+        ).fetchone()
+        if row:
+            return version, row[0]
+        return version, gzip.compress(encode_feed([], version, 0, fmt))
+
+    key = (since, fmt)
+    cached = _delta_cache.get(key)
+    if cached and cached[0] == version:
+        return cached
+
+    body = gzip.compress(encode_feed(_feed_entries(conn, since), version, since, fmt))
+
+    if len(_delta_cache) >= DELTA_CACHE_SIZE:
+        _delta_cache.clear()
+    _delta_cache[key] = (version, body)
+
+    return version, body
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "rebuild":
+        init_db()
+        conn = sqlite3.connect(DB_PATH)
+        version = refresh_risk_feed(conn)
+        count = conn.execute("SELECT COUNT(*) FROM risk_feed WHERE risk_level != ?", (REMOVED,)).fetchone()[0]
+        conn.close()
+        print(f"Risk feed at version {version} ({count} domains).")
+
+    else:
+        print("Usage: python -m backend.risk_feed rebuild")
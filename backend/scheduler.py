@@ -0,0 +1,265 @@
+import sys
+import time
+import random
+import sqlite3
+import statistics
+from datetime import datetime
+from urllib.parse import urlparse
+from backend.database import DB_PATH, init_db
+from backend.crawler import load_registry, crawl_entry
+from backend.metrics import inc
+
+
+# ==============================
+# Scheduling Policy
+# ==============================
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+MIN_INTERVAL = 6 * HOUR
+MAX_INTERVAL = 30 * DAY
+DEFAULT_INTERVAL = 2 * DAY
+
+# Interval multipliers after each crawl
+CHANGED_FACTOR = 0.5
+UNCHANGED_FACTOR = 1.5
+FAILURE_BACKOFF = 2.0
+
+# Companies that changed within this window get scheduling priority
+RECENT_CHANGE_WINDOW = 14 * DAY
+
+# Per-domain politeness
+DOMAIN_MIN_DELAY = 30
+DOMAIN_JITTER = 15
+
+IDLE_POLL_SECONDS = 60
+
+
+def clamp_interval(seconds):
+    return max(MIN_INTERVAL, min(MAX_INTERVAL, seconds))
+
+
+def domain_of(url):
+    return urlparse(url).netloc.lower()
+
+
+def _epoch(timestamp):
+    return datetime.fromisoformat(str(timestamp)).timestamp()
+
+
+def initial_interval(cursor, company_name):
+    """
+    Half the median gap between stored versions: a company that changes
+    monthly is checked roughly every two weeks, one that changes twice a
+    year roughly every quarter (capped by MAX_INTERVAL).
+    """
+
+    cursor.execute("""
+        SELECT pv.timestamp FROM policy_versions pv
+        JOIN companies c ON pv.company_id = c.id
+        WHERE c.name=?
+        ORDER BY pv.timestamp ASC
+    """, (company_name,))
+    times = [_epoch(r[0]) for r in cursor.fetchall()]
+
+    if len(times) < 2:
+        return DEFAULT_INTERVAL, (times[-1] if times else None)
+
+    gaps = [b - a for a, b in zip(times, times[1:]) if b > a]
+    if not gaps:
+        return DEFAULT_INTERVAL, times[-1]
+
+    return clamp_interval(statistics.median(gaps) / 2), times[-1]
+
+
+def next_interval(interval, outcome, failures):
+    if outcome == "changed":
+        return clamp_interval(interval * CHANGED_FACTOR)
+    # A cosmetic revision (see backend.fingerprint) is no real change
+    if outcome in ("unchanged", "cosmetic"):
+        return clamp_interval(interval * UNCHANGED_FACTOR)
+    # Failed fetches retry sooner than a normal interval but back off
+    return min(interval, MIN_INTERVAL * (FAILURE_BACKOFF ** min(failures, 6)))
+
+
+def priority(row, now):
+    """
+    Higher is more urgent: how overdue the company is relative to its own
+    interval, plus a bonus if its policy changed recently.
+    """
+
+    overdue = (now - row["next_crawl_at"]) / row["interval_seconds"]
+    recent = row["last_changed_at"] and now - row["last_changed_at"] < RECENT_CHANGE_WINDOW
+    return overdue + (1.0 if recent else 0.0)
+
+
+# ==============================
+# Persistent Queue State
+# ==============================
+
+def sync_registry(conn, registry, now=None):
+    """Add registry entries missing from the schedule (due immediately)."""
+
+    now = now or time.time()
+    cursor = conn.cursor()
+
+    for entry in registry:
+        cursor.execute("SELECT 1 FROM crawl_schedule WHERE company=?", (entry["company"],))
+        if cursor.fetchone():
+            cursor.execute(
+                "UPDATE crawl_schedule SET url=?, domain=? WHERE company=?",
+                (entry["url"], domain_of(entry["url"]), entry["company"]),
+            )
+            continue
+
+        interval, last_changed = initial_interval(cursor, entry["company"])
+        cursor.execute("""
+            INSERT INTO crawl_schedule (
+                company, url, domain, interval_seconds, next_crawl_at, last_changed_at
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (entry["company"], entry["url"], domain_of(entry["url"]), interval, now, last_changed))
+
+    conn.commit()
+
+
+def load_schedule(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT company, url, domain, interval_seconds, next_crawl_at,
+               last_crawled_at, last_changed_at, failures
+        FROM crawl_schedule
+    """)
+    columns = [d[0] for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def domain_next_allowed(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT domain, next_allowed_at FROM crawl_domains")
+    return dict(cursor.fetchall())
+
+
+def record_crawl(conn, row, outcome, now):
+    failures = row["failures"] + 1 if outcome == "failed" else 0
+    interval = next_interval(row["interval_seconds"], outcome, failures)
+    last_changed = now if outcome == "changed" else row["last_changed_at"]
+
+    # Failures keep the learned interval; only the retry time backs off
+    stored_interval = row["interval_seconds"] if outcome == "failed" else interval
+
+    conn.execute("""
+        UPDATE crawl_schedule SET
+            interval_seconds=?, next_crawl_at=?, last_crawled_at=?,
+            last_changed_at=?, failures=?, last_outcome=?
+        WHERE company=?
+    """, (stored_interval, now + interval, now, last_changed, failures, outcome, row["company"]))
+
+    delay = DOMAIN_MIN_DELAY + random.uniform(0, DOMAIN_JITTER)
+    conn.execute("""
+        INSERT INTO crawl_domains (domain, next_allowed_at) VALUES (?, ?)
+        ON CONFLICT(domain) DO UPDATE SET next_allowed_at=excluded.next_allowed_at
+    """, (row["domain"], now + delay))
+
+    conn.commit()
+
+
+# ==============================
+# Scheduler Loop
+# ==============================
+
+def pick_next(conn, now):
+    """
+    Most urgent due company whose domain is not in its politeness delay.
+    Returns (row, None) or (None, seconds until something becomes eligible).
+    """
+
+    schedule = load_schedule(conn)
+    if not schedule:
+        return None, IDLE_POLL_SECONDS
+
+    allowed = domain_next_allowed(conn)
+
+    due = [row for row in schedule if row["next_crawl_at"] <= now]
+    due.sort(key=lambda row: priority(row, now), reverse=True)
+
+    for row in due:
+        if allowed.get(row["domain"], 0) <= now:
+            return row, None
+
+    waits = [row["next_crawl_at"] - now for row in schedule if row["next_crawl_at"] > now]
+    waits += [allowed[row["domain"]] - now for row in due if row["domain"] in allowed]
+    return None, max(1, min(waits + [IDLE_POLL_SECONDS]))
+
+
+def run_scheduler(once=False):
+    """
+    Long-running crawl loop. With once=True, crawls every company that is
+    currently due (respecting domain delays) and returns.
+    """
+
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    registry = load_registry()
+    sync_registry(conn, registry)
+
+    print("Scheduler started.")
+
+    try:
+        while True:
+            now = time.time()
+            row, wait = pick_next(conn, now)
+
+            if row is None:
+                if once and not any(r["next_crawl_at"] <= now for r in load_schedule(conn)):
+                    break
+                time.sleep(wait)
+                continue
+
+            entries = {entry["company"]: entry for entry in registry}
+            entry = entries.get(row["company"], {"company": row["company"], "url": row["url"]})
+
+            outcome = crawl_entry(conn, entry)
+            inc("cdd_scheduler_crawls_total", {"outcome": outcome})
+
+            record_crawl(conn, row, outcome, time.time())
+
+            if not once:
+                # Pick up registry edits without restarting the daemon
+                registry = load_registry()
+                sync_registry(conn, registry)
+
+    except KeyboardInterrupt:
+        print("\nScheduler stopped.")
+
+    finally:
+        conn.close()
+
+
+def print_status():
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    sync_registry(conn, load_registry())
+    now = time.time()
+
+    print(f"{'Company':<20} {'Interval':>10} {'Next crawl':>12} {'Priority':>9}  Last outcome")
+    cursor = conn.cursor()
+    cursor.execute("SELECT company, last_outcome FROM crawl_schedule")
+    outcomes = dict(cursor.fetchall())
+
+    for row in sorted(load_schedule(conn), key=lambda r: r["next_crawl_at"]):
+        print(
+            f"{row['company']:<20} {row['interval_seconds'] / HOUR:>9.1f}h "
+            f"{(row['next_crawl_at'] - now) / HOUR:>11.1f}h "
+            f"{priority(row, now):>9.2f}  {outcomes.get(row['company']) or '-'}"
+        )
+
+    conn.close()
+
+
+if __name__ == "__main__":
+
+    if "--status" in sys.argv:
+        print_status()
+    else:
+        run_scheduler(once="--once" in sys.argv)
@@ -0,0 +1,75 @@
+import os
+import json
+import copy
+import hashlib
+
+
+# ==============================
+# Scoring Weights and Thresholds
+# ==============================
+
+# Every tunable number of the drift, timeline and CDI formulas. Engines use
+# SCORING; `python -m backend.rescoring` recomputes stored analyses under
+# another config without re-embedding or calling the LLM.
+DEFAULT_SCORING = {
+    # Best-match similarity above which an old clause counts as unchanged / modified
+    "unchanged_threshold": 0.95,
+    "modified_threshold": 0.75,
+
+    # Structural drift: weight of each changed clause, per 100 clauses
+    "structural_weights": {"modified": 0.4, "removed": 0.3, "added": 0.3},
+
+    # Drift report semantic risk (0-10)
+    "semantic_risk": {
+        "max_weight": 0.5,
+        "high_count_weight": 0.7,
+        "medium_count_weight": 0.3,
+        "high_clause_score": 7,
+        "medium_clause_score": 4,
+        "structural_divisor": 200,
+        "high_level": 7,
+        "medium_level": 4,
+    },
+
+    # Timeline delta risk per version pair, added to the CDI
+    "delta_weights": {"structural": 0.25, "semantic": 0.5, "escalation": 0.25},
+    "irreversible_multiplier": 1.25,
+}
+
+
+def _merge(base, override):
+    for key, value in override.items():
+        if key not in base:
+            raise ValueError(f"Unknown scoring setting: {key}")
+        if isinstance(base[key], dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"Scoring setting {key} must be an object")
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_scoring_config(path=None):
+    """Defaults, overridden by any settings in the JSON file at path."""
+
+    config = copy.deepcopy(DEFAULT_SCORING)
+    if path:
+        with open(path, "r") as f:
+            _merge(config, json.load(f))
+    return config
+
+
+SCORING = load_scoring_config(os.environ.get("CDD_SCORING_CONFIG"))
+
+
+def scoring_hash(scoring=None, keys=None):
+    """
+    Short hash of a config (SCORING by default), or of just its `keys`, for
+    keying cached results computed under it.
+    """
+
+    scoring = SCORING if scoring is None else scoring
+    if keys is not None:
+        scoring = {key: scoring[key] for key in keys}
+    return hashlib.sha256(json.dumps(scoring, sort_keys=True).encode("utf-8")).hexdigest()[:16]
@@ -1,4 +1,5 @@
 import numpy as np
+from backend.scoring_config import SCORING
 
 
 def safe_cosine_similarity(a, b):
@@ -24,4 +25,53 @@ def compute_similarity_matrix(old_vectors, new_vectors):
     if len(old_vectors) == 0 or len(new_vectors) == 0:
         return np.array([])
 
-    return safe_cosine_similarity(old_vectors, new_vectors)
\ No newline at end of file
+    return safe_cosine_similarity(old_vectors, new_vectors)
+
+# Best-match similarity above which an old clause counts as unchanged / modified
+UNCHANGED_THRESHOLD = SCORING["unchanged_threshold"]
+MODIFIED_THRESHOLD = SCORING["modified_threshold"]
+
+
+def match_clauses(similarity_matrix, unchanged_threshold=UNCHANGED_THRESHOLD,
+                  modified_threshold=MODIFIED_THRESHOLD):
+    """
+    Classify every old clause by its best match among the new clauses.
+    Returns unchanged/modified/removed counts, the set of matched new indices
+    and each old clause's best score and best new index (-1 when there are
+    no new clauses).
+    """
+
+    similarity_matrix = np.asarray(similarity_matrix)
+
+    if similarity_matrix.ndim != 2 or similarity_matrix.shape[1] == 0:
+        removed = similarity_matrix.shape[0] if similarity_matrix.ndim == 2 else 0
+        return {
+            "unchanged": 0,
+            "modified": 0,
+            "removed": removed,
+            "matched_new_indices": set(),
+            "best_scores": np.full(removed, -np.inf, dtype=np.float32),
+            "best_indices": np.full(removed, -1, dtype=np.int32),
+        }
+
+    # argmax returns the first maximum, same as row.tolist().index(max(row))
+    best_indices = similarity_matrix.argmax(axis=1)
+    best_scores = similarity_matrix.max(axis=1)
+
+    # Compare in numpy so thresholds behave exactly like the per-row loop
+    unchanged_mask = best_scores > unchanged_threshold
+    modified_mask = ~unchanged_mask & (best_scores > modified_threshold)
+
+    unchanged = int(unchanged_mask.sum())
+    modified = int(modified_mask.sum())
+    removed = len(best_scores) - unchanged - modified
+    matched_new_indices = set(best_indices[unchanged_mask | modified_mask].tolist())
+
+    return {
+        "unchanged": unchanged,
+        "modified": modified,
+        "removed": removed,
+        "matched_new_indices": matched_new_indices,
+        "best_scores": best_scores,
+        "best_indices": best_indices,
+    }
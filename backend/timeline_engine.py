@@ -1,25 +1,39 @@
+import os
+import json
 import sqlite3
+import hashlib
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from backend.database import DB_PATH
-from backend.text_processing import normalize_text
-from backend.chunking import chunk_text
-from backend.embedding_engine import embed_chunks, compute_similarity_matrix
-from backend.llm_risk_engine import analyze_clause_with_llm
+from backend.versioning import iter_company_versions, previous_version
+from backend.clause_store import (
+    clause_hash, compare_versions, embed_clauses, load_verdicts, store_pair_outputs, store_verdicts,
+    verdict_snapshot,
+)
+from backend.clause_classifier import analyze_clause_tiered
+from backend.llm_risk_engine import MODEL_NAME, PROMPT_VERSION
+from backend.risk_feed import refresh_risk_feed
+from backend.metrics import stage, bind_context
+from backend.scoring_config import SCORING
 
 
 # ==============================
 # Structural Drift (FIXED)
 # ==============================
 
-def compute_structural_drift(modified, removed, added, total_old, total_new):
+def compute_structural_drift(modified, removed, added, total_old, total_new,
+                             weights=SCORING["structural_weights"]):
     if total_old == 0 and total_new == 0:
         return 0.0
 
     max_possible = max(total_old, total_new)
 
     drift = (
-        (modified * 0.4) +
-        (removed * 0.3) +
-        (added * 0.3)
+        (modified * weights["modified"]) +
+        (removed * weights["removed"]) +
+        (added * weights["added"])
     ) / max_possible * 100
 
     return round(min(drift, 100), 2)
@@ -67,105 +81,191 @@ def is_irreversible(previous_categories, current_categories):
 
 
 # ==============================
-# Timeline Drift + CDI
+# Map: Per-Pair Analysis
 # ==============================
 
-def compute_timeline_drift(company_name, return_data=False):
+# Version pairs analyzed concurrently; 1 runs them in order on one connection
+TIMELINE_WORKERS = int(os.environ.get("CDD_TIMELINE_WORKERS", "4"))
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT id FROM companies WHERE name=?", (company_name,))
-    company = cursor.fetchone()
-
-    if not company:
-        print("Company not found.")
-        return
+# Worker connections wait this long (seconds) for another worker's write
+SQLITE_BUSY_TIMEOUT = 30
 
-    company_id = company[0]
 
-    cursor.execute("""
-        SELECT content, timestamp FROM policy_versions
-        WHERE company_id=?
-        ORDER BY timestamp ASC
-    """, (company_id,))
+def analyze_version_pair(conn, old_version, new_version, fast_diff=False,
+                         old_chunks=None, memo=None, verdicts_before=None):
+    """
+    Everything about one version pair that doesn't depend on earlier pairs:
+    matching, structural drift and LLM verdicts. Stored verdicts are reused
+    if stored before verdicts_before (see verdict_snapshot).
+    Returns (pair, new_chunks); pair feeds fold_timeline.
+    """
 
-    versions = cursor.fetchall()
-    conn.close()
+    old_id, old_time = old_version
+    new_id, new_time = new_version
+
+    old_chunks, new_chunks, match = compare_versions(
+        conn, old_id, new_id, "timeline", fast_diff=fast_diff,
+        old_chunks=old_chunks, memo=memo
+    )
+
+    modified = match["modified"]
+    removed = match["removed"]
+    matched_new_indices = match["matched_new_indices"]
+
+    added = len(new_chunks) - len(matched_new_indices)
+
+    # 🔥 Fixed Structural Drift
+    structural_drift = compute_structural_drift(
+        modified,
+        removed,
+        added,
+        len(old_chunks),
+        len(new_chunks)
+    )
+
+    clause_results = []
+    category_severity = {}
+
+    # Cached embeddings used to pick each new clause's prompt context
+    unmatched = [j for j in range(len(new_chunks)) if j not in matched_new_indices]
+    with stage("timeline.llm_context", items=len(unmatched)):
+        old_embeddings = embed_clauses(conn, old_chunks, memo) if unmatched else None
+        new_embeddings = embed_clauses(conn, [new_chunks[j] for j in unmatched], memo)
+
+    # Clauses any company already had analyzed skip the LLM
+    stored = load_verdicts(
+        conn, [new_chunks[j] for j in unmatched], MODEL_NAME, PROMPT_VERSION, verdicts_before
+    )
+
+    with stage("timeline.llm_analysis") as timer:
+        for j, new_embedding in zip(unmatched, new_embeddings):
+            result = stored.get(new_chunks[j]) or analyze_clause_tiered(
+                old_chunks, new_chunks[j], old_embeddings, new_embedding
+            )
+            clause_results.append(result)
+            timer.add_items(1)
+
+            for cat in result.get("categories", []):
+                category_severity[cat] = max(
+                    category_severity.get(cat, 0),
+                    result.get("risk_score", 0) // 2
+                )
+
+    store_pair_outputs(
+        conn, old_id, new_id, fast_diff, len(old_chunks), len(new_chunks),
+        match, zip(unmatched, clause_results)
+    )
+
+    # LLM verdicts double as training data for the local classifier
+    store_verdicts(conn, zip([new_chunks[j] for j in unmatched], clause_results), MODEL_NAME)
+
+    # Rule-based stand-ins for LLM verdicts (LLM unavailable) must not seed later windows
+    fallback = any(r.get("verdict_source") == "rules" for r in clause_results)
+
+    # ⚠ DO NOT TOUCH SEMANTIC RISK
+    semantic_score = (
+        sum([c["risk_score"] for c in clause_results]) / len(clause_results)
+        if clause_results else 0
+    )
+
+    return {
+        "old_version_id": old_id,
+        "new_version_id": new_id,
+        "from": old_time,
+        "to": new_time,
+        "structural_drift": structural_drift,
+        "semantic_score": semantic_score,
+        "category_severity": category_severity,
+        "fallback": fallback,
+    }, new_chunks
+
+
+def _map_pairs_sequential(conn, versions, fast_diff, verdicts_before=None):
+    """
+    Pairs in order on one connection, as a sliding window of two: each
+    version's chunks and embeddings are carried into the next pair, where
+    that version is the old side.
+    """
 
-    if len(versions) < 2:
-        print("Not enough versions.")
-        return
+    old_version = next(versions)
+    old_chunks = None
+    memo = {}
 
-    timeline_results = []
-    cumulative_cdi = 0
-    previous_categories = {}
+    for new_version in versions:
+        pair, new_chunks = analyze_version_pair(
+            conn, old_version, new_version, fast_diff, old_chunks, memo, verdicts_before
+        )
+        yield pair
 
-    print(f"\nTimeline Drift Analysis for {company_name}")
-    print("=" * 75)
+        # Drop vectors of clauses the next pair can't reuse
+        keep = {clause_hash(c) for c in new_chunks}
+        memo = {h: v for h, v in memo.items() if h in keep}
+        old_version, old_chunks = new_version, new_chunks
 
-    for i in range(1, len(versions)):
 
-        old_text, old_time = versions[i - 1]
-        new_text, new_time = versions[i]
+def _map_pairs_parallel(versions, fast_diff, workers, verdicts_before=None):
+    """
+    Pairs on a thread pool, each thread with its own connection, yielded in
+    version order. At most 2 x workers pairs are in flight, so memory stays
+    bounded however long the history is.
+    """
 
-        old_clean = normalize_text(old_text)
-        new_clean = normalize_text(new_text)
+    local = threading.local()
+    connections = []
+    lock = threading.Lock()
 
-        old_chunks = chunk_text(old_clean)
-        new_chunks = chunk_text(new_clean)
+    def run(old_version, new_version):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            local.conn = conn
+            with lock:
+                connections.append(conn)
+        return analyze_version_pair(
+            conn, old_version, new_version, fast_diff, verdicts_before=verdicts_before
+        )[0]
 
-        old_embeddings = embed_chunks(old_chunks)
-        new_embeddings = embed_chunks(new_chunks)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            old_version = next(versions)
 
-        similarity_matrix = compute_similarity_matrix(old_embeddings, new_embeddings)
+            for new_version in versions:
+                in_flight.append(executor.submit(bind_context(run), old_version, new_version))
+                old_version = new_version
 
-        unchanged = modified = removed = 0
-        matched_new_indices = set()
+                if len(in_flight) >= 2 * workers:
+                    yield in_flight.popleft().result()
 
-        for row in similarity_matrix:
-            max_similarity = max(row)
-            max_index = row.tolist().index(max_similarity)
+            while in_flight:
+                yield in_flight.popleft().result()
+    finally:
+        for conn in connections:
+            conn.close()
 
-            if max_similarity > 0.95:
-                unchanged += 1
-                matched_new_indices.add(max_index)
-            elif max_similarity > 0.75:
-                modified += 1
-                matched_new_indices.add(max_index)
-            else:
-                removed += 1
 
-        added = len(new_chunks) - len(matched_new_indices)
+# ==============================
+# Fold: Timeline Drift + CDI
+# ==============================
 
-        # 🔥 Fixed Structural Drift
-        structural_drift = compute_structural_drift(
-            modified,
-            removed,
-            added,
-            len(old_chunks),
-            len(new_chunks)
-        )
+def fold_timeline(pairs, scoring=SCORING, verbose=True, checkpoint=None):
+    """
+    Applies escalation, irreversibility and the cumulative CDI to analyzed
+    pairs in version order. Cheap; the only part that must run sequentially.
+    checkpoint=(cdi, category severity) resumes from the state after an
+    earlier pair (see load_checkpoint). Yields (pair, timeline entry).
+    """
 
-        clause_results = []
-        category_severity = {}
+    delta_weights = scoring["delta_weights"]
 
-        for j in range(len(new_chunks)):
-            if j not in matched_new_indices:
-                result = analyze_clause_with_llm(old_chunks, new_chunks[j])
-                clause_results.append(result)
+    cumulative_cdi, previous_categories = checkpoint or (0, {})
+    previous_categories = dict(previous_categories)
 
-                for cat in result.get("categories", []):
-                    category_severity[cat] = max(
-                        category_severity.get(cat, 0),
-                        result.get("risk_score", 0) // 2
-                    )
+    for pair in pairs:
 
-        # ⚠ DO NOT TOUCH SEMANTIC RISK
-        semantic_score = (
-            sum([c["risk_score"] for c in clause_results]) / len(clause_results)
-            if clause_results else 0
-        )
+        structural_drift = pair["structural_drift"]
+        semantic_score = pair["semantic_score"]
+        category_severity = pair["category_severity"]
 
         escalation_intensity = compute_escalation_intensity(
             previous_categories,
@@ -179,13 +279,13 @@ def compute_timeline_drift(company_name, return_data=False):
         # ==========================================
 
         delta_risk = (
-            0.25 * structural_drift +   # reduced structural weight
-            0.5 * semantic_score +     # semantic unchanged
-            0.25 * escalation_intensity  # slightly increased escalation
+            delta_weights["structural"] * structural_drift +   # reduced structural weight
+            delta_weights["semantic"] * semantic_score +     # semantic unchanged
+            delta_weights["escalation"] * escalation_intensity  # slightly increased escalation
         )
 
         if irreversible:
-            delta_risk *= 1.25
+            delta_risk *= scoring["irreversible_multiplier"]
 
         delta_risk = round(delta_risk, 2)
 
@@ -193,25 +293,289 @@ def compute_timeline_drift(company_name, return_data=False):
 
         previous_categories = category_severity.copy()
 
-        print(f"\n{old_time} → {new_time}")
-        print(f"Structural Drift: {structural_drift}%")
-        print(f"Semantic Risk: {round(semantic_score,2)}/10")
-        print(f"Escalation Intensity: {escalation_intensity}")
-        if irreversible:
-            print("Irreversible Expansion Detected: YES")
-        print(f"Consent Decay Index (CDI): {cumulative_cdi}/100")
-
-        timeline_results.append({
-            "from": old_time,
-            "to": new_time,
+        if verbose:
+            print(f"\n{pair['from']} → {pair['to']}")
+            print(f"Structural Drift: {structural_drift}%")
+            print(f"Semantic Risk: {round(semantic_score,2)}/10")
+            print(f"Escalation Intensity: {escalation_intensity}")
+            if irreversible:
+                print("Irreversible Expansion Detected: YES")
+            print(f"Consent Decay Index (CDI): {cumulative_cdi}/100")
+
+        yield pair, {
+            "from": pair["from"],
+            "to": pair["to"],
             "structural_drift": structural_drift,
             "semantic_score": round(semantic_score, 2),
             "escalation_intensity": escalation_intensity,
             "irreversible": irreversible,
             "cdi": cumulative_cdi
-        })
+        }
+
+
+def store_timeline_pairs(conn, company_id, folded, fast_diff=False, chain=None):
+    """
+    Persist computed pairs for export. A pair already stored with the same
+    result is left alone; one whose result changed is replaced by a new row,
+    so incremental exports pick it up again. Commits.
+
+    chain: history_chain up to the first pair's old version. Pairs then get
+    their own chain hash, until the first pair with fallback verdicts; from
+    there on (and without chain) they are stored but can't be checkpoints.
+    """
+
+    chains = []
+    for pair, _ in folded:
+        if chain is not None and not pair.get("fallback"):
+            chain = _chain_step(chain, pair["new_version_id"])
+        else:
+            chain = None
+        chains.append(chain)
+
+    rows = [
+        (
+            company_id, pair["old_version_id"], pair["new_version_id"],
+            entry["from"], entry["to"], int(fast_diff),
+            pair["structural_drift"], pair["semantic_score"],
+            entry["escalation_intensity"], int(entry["irreversible"]), entry["cdi"],
+            json.dumps(pair["category_severity"], sort_keys=True), pair_chain,
+        )
+        for (pair, entry), pair_chain in zip(folded, chains)
+    ]
+
+    conn.executemany("""
+        DELETE FROM timeline_pairs
+        WHERE old_version_id=? AND new_version_id=? AND fast_diff=? AND NOT (
+            structural_drift IS ? AND semantic_score IS ? AND escalation_intensity IS ?
+            AND irreversible IS ? AND cdi IS ? AND category_severity IS ?
+        )
+    """, [(r[1], r[2], r[5], *r[6:12]) for r in rows])
+
+    conn.executemany("""
+        UPDATE timeline_pairs SET chain_hash=?
+        WHERE old_version_id=? AND new_version_id=? AND fast_diff=?
+    """, [(r[12], r[1], r[2], r[5]) for r in rows])
+
+    conn.executemany("""
+        INSERT OR IGNORE INTO timeline_pairs (
+            company_id, old_version_id, new_version_id, from_time, to_time, fast_diff,
+            structural_drift, semantic_score, escalation_intensity, irreversible, cdi,
+            category_severity, chain_hash
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+
+
+# ==============================
+# Windows and Checkpoints
+# ==============================
+
+def _version_timestamp(conn, company_id, version_id):
+    row = conn.execute(
+        "SELECT timestamp FROM policy_versions WHERE id=? AND company_id=?",
+        (version_id, company_id),
+    ).fetchone()
+    if not row:
+        raise ValueError(f"Version {version_id} not found")
+    return row[0]
+
+
+def _window_end(conn, company_id, until):
+    """(predicate on (id, timestamp), SQL condition, params) for versions at or before until."""
+
+    if isinstance(until, int):
+        end = (_version_timestamp(conn, company_id, until), until)
+        return (lambda v: (v[1], v[0]) <= end), "(timestamp, id) <= (?, ?)", end
+
+    return (lambda v: v[1] <= until), "timestamp <= ?", (until,)
+
+
+def resolve_window(conn, company_id, since=None, until=None, last=None):
+    """
+    Bounds of a timeline window as {"base", "end"}: base is the (id,
+    timestamp) of the version the first windowed pair starts from (None:
+    the first version), end a predicate for versions at or before until.
+
+    since/until: a version id (int) or a timestamp / date string. Pairs are
+    selected by their newer version: after `since` (the version, or any
+    time before the timestamp), and at or before `until`.
+    last: only the last N pairs of that range.
+    """
+
+    end, end_sql, end_params = None, "1", ()
+    if until is not None:
+        end, end_sql, end_params = _window_end(conn, company_id, until)
+
+    bases = []
+
+    if isinstance(since, int):
+        # A cosmetic version isn't in the chain; start from the one it duplicates
+        bases.append(conn.execute("""
+            SELECT id, timestamp FROM policy_versions
+            WHERE company_id=? AND cosmetic=0 AND (timestamp, id) <= (?, ?)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        """, (company_id, _version_timestamp(conn, company_id, since), since)).fetchone())
+    elif since is not None:
+        bases.append(previous_version(conn, company_id, since))
+
+    if last is not None:
+        bases.append(conn.execute(f"""
+            SELECT id, timestamp FROM policy_versions
+            WHERE company_id=? AND cosmetic=0 AND {end_sql}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1 OFFSET ?
+        """, (company_id, *end_params, last)).fetchone())
+
+    bases = [b for b in bases if b is not None]
+    base = max(bases, key=lambda b: (b[1], b[0])) if bases else None
+
+    return {"base": base, "end": end}
+
+
+def _chain_step(chain, version_id):
+    return hashlib.sha256(f"{chain}:{version_id}".encode("utf-8")).hexdigest()
+
+
+def history_chain(conn, company_id, version, scoring=SCORING):
+    """
+    Hash of everything a CDI after version (id, timestamp) depends on: the
+    ids of the analyzed versions up to it, in order, the LLM model and
+    prompt version and the scoring config. Ids only, so it's cheap next to
+    replaying the pairs.
+    """
+
+    chain = hashlib.sha256(
+        json.dumps([MODEL_NAME, PROMPT_VERSION, scoring], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+    for (version_id,) in conn.execute("""
+        SELECT id FROM policy_versions
+        WHERE company_id=? AND cosmetic=0 AND (timestamp, id) <= (?, ?)
+        ORDER BY timestamp ASC, id ASC
+    """, (company_id, version[1], version[0])):
+        chain = _chain_step(chain, version_id)
+
+    return chain
+
+
+def load_checkpoint(conn, company_id, base, fast_diff=False, chain=None):
+    """
+    (cdi, category severity) after the pair ending at version base, from
+    stored timeline pairs. (0, {}) when base is the first version; None when
+    that pair hasn't been computed yet, or was computed over another
+    history, prompt or scoring config (its chain hash isn't chain, by
+    default history_chain up to base) or with fallback verdicts.
+    """
+
+    previous = previous_version(conn, company_id, base[1], base[0])
+    if previous is None:
+        return 0, {}
+
+    if chain is None:
+        chain = history_chain(conn, company_id, base)
+
+    row = conn.execute("""
+        SELECT cdi, category_severity FROM timeline_pairs
+        WHERE old_version_id=? AND new_version_id=? AND fast_diff=? AND chain_hash=?
+    """, (previous[0], base[0], int(fast_diff), chain)).fetchone()
+
+    if row is None:
+        return None
+    return row[0], json.loads(row[1])
+
+
+def compute_timeline_drift(company_name, return_data=False, fast_diff=False,
+                           workers=TIMELINE_WORKERS, since=None, until=None, last=None):
+    """
+    Timeline drift and CDI of a company. since/until/last restrict it to a
+    window (see resolve_window): analysis starts from the CDI checkpoint
+    stored at the window start, so only pairs inside the window are
+    computed. Without a checkpoint the earlier pairs are replayed once
+    (and stored, for next time).
+    """
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT id FROM companies WHERE name=?", (company_name,))
+    company = cursor.fetchone()
+
+    if not company:
+        print("Company not found.")
+        return
+
+    company_id = company[0]
+
+    windowed = since is not None or until is not None or last is not None
+    window = {"base": None, "end": None}
+    checkpoint = None
+    chain = None
+    start = None
+
+    if windowed:
+        with stage("timeline.checkpoint"):
+            window = resolve_window(conn, company_id, since, until, last)
+            if window["base"] is not None:
+                chain = history_chain(conn, company_id, window["base"])
+                checkpoint = load_checkpoint(conn, company_id, window["base"], fast_diff, chain)
+                if checkpoint is not None:
+                    start = (window["base"][1], window["base"][0])
+
+    # Versions are read page by page; only the pairs being analyzed are in memory
+    versions = iter_company_versions(conn, company_id, start=start)
+    if window["end"] is not None:
+        versions = itertools.takewhile(window["end"], versions)
+
+    with stage("timeline.sqlite_read", items=2):
+        first, second = next(versions, None), next(versions, None)
+
+    if second is None:
+        conn.close()
+        if windowed:
+            print("No changes in the requested window.")
+            return [] if return_data else None
+        print("Not enough versions.")
+        return
+
+    versions = itertools.chain([first, second], versions)
+
+    # Chain hash up to the first version analyzed, for the pairs stored below
+    if checkpoint is None:
+        chain = history_chain(conn, company_id, first)
+
+    print(f"\nTimeline Drift Analysis for {company_name}")
+    print("=" * 75)
+
+    replay_until = None
+    if window["base"] is not None and checkpoint is None:
+        replay_until = window["base"][0]
+        print(f"No checkpoint at the window start; replaying from {first[1]}.")
+
+    # Pairs only reuse verdicts from before this run, whatever order workers finish in
+    verdicts_before = verdict_snapshot(conn)
+
+    if workers > 1:
+        pairs = _map_pairs_parallel(versions, fast_diff, workers, verdicts_before)
+    else:
+        pairs = _map_pairs_sequential(conn, versions, fast_diff, verdicts_before)
+
+    folded = list(fold_timeline(pairs, checkpoint=checkpoint))
+
+    # Replayed pairs before the window are stored, but not returned
+    in_window = folded
+    if replay_until is not None:
+        starts = [pair["old_version_id"] for pair, _ in folded]
+        in_window = folded[starts.index(replay_until):] if replay_until in starts else []
+
+    timeline_results = [entry for _, entry in in_window]
+
+    store_timeline_pairs(conn, company_id, folded, fast_diff, chain)
+    refresh_risk_feed(conn, [company_id])
+
+    conn.close()
 
     print("\n" + "=" * 75)
 
     if return_data:
-        return timeline_results
\ No newline at end of file
+        return timeline_results
@@ -21,7 +21,7 @@ def get_earliest_and_latest(company_name):
         SELECT content, timestamp
         FROM policy_versions
         WHERE company_id=?
-        ORDER BY timestamp ASC
+        ORDER BY timestamp ASC, id ASC
         LIMIT 1
     """, (company_id,))
     earliest = cursor.fetchone()
@@ -31,11 +31,101 @@ def get_earliest_and_latest(company_name):
         SELECT content, timestamp
         FROM policy_versions
         WHERE company_id=?
-        ORDER BY timestamp DESC
+        ORDER BY timestamp DESC, id DESC
         LIMIT 1
     """, (company_id,))
     latest = cursor.fetchone()
 
     conn.close()
 
-    return earliest[0], latest[0]
\ No newline at end of file
+    return earliest[0], latest[0]
+
+
+def get_company_versions(cursor, company_id):
+    """
+    Version ids and timestamps only, oldest first (no content); cosmetic
+    revisions excluded. Versions stored in the same second keep id order,
+    as in iter_company_versions.
+    """
+    cursor.execute("""
+        SELECT id, timestamp FROM policy_versions
+        WHERE company_id=? AND cosmetic=0
+        ORDER BY timestamp ASC, id ASC
+    """, (company_id,))
+    return cursor.fetchall()
+
+
+def iter_company_versions(conn, company_id, page_size=500, start=None):
+    """
+    Same rows as get_company_versions, fetched a page at a time.
+    Pages are keyed on (timestamp, id) rather than read from one open
+    cursor, so no read lock is held between pages while the caller (or
+    another connection) writes. start=(timestamp, id) begins at that
+    version (inclusive) instead of the first.
+    """
+
+    last = None
+    while True:
+        if last is None and start is None:
+            cursor = conn.execute("""
+                SELECT id, timestamp FROM policy_versions
+                WHERE company_id=? AND cosmetic=0
+                ORDER BY timestamp ASC, id ASC
+                LIMIT ?
+            """, (company_id, page_size))
+        elif last is None:
+            cursor = conn.execute("""
+                SELECT id, timestamp FROM policy_versions
+                WHERE company_id=? AND cosmetic=0 AND (timestamp, id) >= (?, ?)
+                ORDER BY timestamp ASC, id ASC
+                LIMIT ?
+            """, (company_id, start[0], start[1], page_size))
+        else:
+            cursor = conn.execute("""
+                SELECT id, timestamp FROM policy_versions
+                WHERE company_id=? AND cosmetic=0 AND (timestamp, id) > (?, ?)
+                ORDER BY timestamp ASC, id ASC
+                LIMIT ?
+            """, (company_id, last[1], last[0], page_size))
+
+        rows = cursor.fetchall()
+        yield from rows
+
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+
+
+def previous_version(conn, company_id, timestamp, version_id=None):
+    """
+    (id, timestamp) of the newest analyzed version before the given point:
+    before (timestamp, version_id), or strictly before timestamp when no
+    id is given. None if there is none.
+    """
+
+    if version_id is None:
+        return conn.execute("""
+            SELECT id, timestamp FROM policy_versions
+            WHERE company_id=? AND cosmetic=0 AND timestamp < ?
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        """, (company_id, timestamp)).fetchone()
+
+    return conn.execute("""
+        SELECT id, timestamp FROM policy_versions
+        WHERE company_id=? AND cosmetic=0 AND (timestamp, id) < (?, ?)
+        ORDER BY timestamp DESC, id DESC
+        LIMIT 1
+    """, (company_id, timestamp, version_id)).fetchone()
+
+
+def forget_timeline(conn, company_id, timestamp):
+    """
+    Drop stored timeline pairs ending at or after timestamp, after the
+    history up to there changed (a version inserted, rewritten or
+    reclassified): their CDI folded in the old history. Doesn't commit.
+    """
+
+    conn.execute(
+        "DELETE FROM timeline_pairs WHERE company_id=? AND to_time >= ?", (company_id, timestamp)
+    )
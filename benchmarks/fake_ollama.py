@@ -0,0 +1,207 @@
+import json
+import re
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ==============================
+# Deterministic Verdicts
+# ==============================
+
+VERDICT_RULES = [
+    ("train", "ai_training", 8),
+    ("machine learning", "ai_training", 8),
+    ("profiling", "profiling", 7),
+    ("cross-platform", "cross_platform_sharing", 6),
+    ("across products", "cross_platform_sharing", 6),
+    ("retain", "retention_expansion", 5),
+    ("third-party", "third_party_sharing", 5),
+    ("historical data", "historical_data_reclassification", 7),
+]
+
+
+def fake_verdict(prompt):
+    """Keyword verdict for the NEW CLAUSE section of a risk prompt."""
+    match = re.search(r"NEW CLAUSE:\s*(.*?)\n\s*\n", prompt, re.DOTALL)
+    clause = (match.group(1) if match else prompt).lower()
+
+    categories = []
+    score = 1
+    for keyword, category, weight in VERDICT_RULES:
+        if keyword in clause and category not in categories:
+            categories.append(category)
+            score = max(score, weight)
+
+    return {
+        "risk_score": score,
+        "expansion": bool(categories),
+        "categories": categories,
+        "reason": "fake verdict",
+    }
+
+
+# ==============================
+# Server
+# ==============================
+
+# Filler a chatty model keeps generating after the JSON object
+TRAILING_TEXT = " Note: this assessment is based only on the clause text provided."
+
+
+def tokenize(text, size=4):
+    """Split text into pseudo-tokens of a few characters each."""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeOllamaServer:
+    """
+    Minimal local stand-in for the Ollama HTTP API with configurable latency.
+
+        with FakeOllamaServer(latency=0.2) as server:
+            os.environ["CDD_OLLAMA_URL"] = server.generate_url
+
+    Requests with "stream": true (Ollama's default) get NDJSON chunks, one
+    pseudo-token each, after `latency`, every `token_latency` seconds,
+    followed by `trailing_tokens` tokens of filler after the JSON.
+
+    Outages can be simulated while running: `error_rate` answers that share
+    of generate requests with HTTP 500 (1.0 also fails /api/tags), and
+    `hang_seconds` delays every generate request before it answers.
+    """
+
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0, token_latency=0.0, trailing_tokens=0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.trailing_tokens = trailing_tokens
+        self.requests = 0
+        self.tokens_sent = 0
+        self.early_closes = 0
+        self.error_rate = 0.0
+        self.hang_seconds = 0.0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def generate_url(self):
+        return self.base_url + "/api/generate"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags" and server.error_rate >= 1.0:
+                    self._send_json({"error": "unavailable"}, 503)
+                elif self.path == "/api/tags":
+                    self._send_json({"models": [{"name": "fake"}]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, 404)
+                    return
+
+                server.requests += 1
+
+                if server.hang_seconds:
+                    time.sleep(server.hang_seconds)
+
+                if server.error_rate and random.random() < server.error_rate:
+                    self._send_json({"error": "model runner crashed"}, 500)
+                    return
+
+                time.sleep(server.latency)
+
+                verdict = fake_verdict(payload.get("prompt", ""))
+
+                if payload.get("stream", True):
+                    self._stream(payload.get("model"), json.dumps(verdict))
+                    return
+
+                # A blocking request still waits for every token to be generated
+                tokens = len(tokenize(json.dumps(verdict))) + server.trailing_tokens
+                time.sleep(server.token_latency * tokens)
+
+                self._send_json({
+                    "model": payload.get("model"),
+                    "response": json.dumps(verdict),
+                    "done": True,
+                })
+
+            def _stream(self, model, text):
+                trailing = (TRAILING_TEXT * (server.trailing_tokens // 10 + 1))
+                tokens = tokenize(text) + tokenize(trailing)[:server.trailing_tokens]
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+
+                try:
+                    for token in tokens:
+                        line = {"model": model, "response": token, "done": False}
+                        self.wfile.write((json.dumps(line) + "\n").encode("utf-8"))
+                        self.wfile.flush()
+                        server.tokens_sent += 1
+                        time.sleep(server.token_latency)
+
+                    self.wfile.write((json.dumps({"model": model, "response": "", "done": True}) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client stopped reading once it had a complete verdict
+                    server.early_closes += 1
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 11434
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    token_latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    trailing_tokens = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    server = FakeOllamaServer(
+        latency=latency, port=port, token_latency=token_latency, trailing_tokens=trailing_tokens
+    )
+    print(f"Fake Ollama listening on {server.base_url} (latency {latency}s)")
+    server.httpd.serve_forever()
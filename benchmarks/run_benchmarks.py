@@ -0,0 +1,300 @@
+"""
+Reproducible performance benchmarks.
+
+    python -m benchmarks.run_benchmarks --clauses 200 --versions 10 --churn 0.1 --llm-latency 0.05
+
+Each run seeds a fresh SQLite database with synthetic policy histories,
+points the pipeline at a local fake Ollama server and appends one JSON
+record (params, throughput, p50/p99 latency, peak RSS) to the output file.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+# ==============================
+# Measurement Helpers
+# ==============================
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 2)
+    return round(peak / 1024, 2)
+
+
+def run_case(name, fn, inputs, items_per_call=1):
+    latencies = []
+    start = time.perf_counter()
+
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+
+    elapsed = time.perf_counter() - start
+    calls = len(latencies)
+
+    result = {
+        "calls": calls,
+        "total_seconds": round(elapsed, 4),
+        "throughput_per_sec": round(calls * items_per_call / elapsed, 3) if elapsed else 0.0,
+        "p50_seconds": round(percentile(latencies, 50), 4),
+        "p99_seconds": round(percentile(latencies, 99), 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    print(f"{name:<22} calls={calls:<4} p50={result['p50_seconds']:.4f}s "
+          f"p99={result['p99_seconds']:.4f}s rss={result['peak_rss_mb']}MB")
+
+    return result
+
+
+def fast_diff_parity(db_path, companies):
+    """Structural counts of every adjacent pair, full matrix vs fast diff."""
+
+    from backend.clause_store import compare_versions
+
+    conn = sqlite3.connect(db_path)
+    pairs = mismatches = 0
+
+    for company in companies:
+        version_ids = [r[0] for r in conn.execute("""
+            SELECT pv.id FROM policy_versions pv
+            JOIN companies c ON c.id = pv.company_id
+            WHERE c.name=? ORDER BY pv.timestamp ASC
+        """, (company,))]
+
+        for old_id, new_id in zip(version_ids, version_ids[1:]):
+            counts = []
+            for fast_diff in (False, True):
+                _, new_chunks, match = compare_versions(conn, old_id, new_id, fast_diff=fast_diff)
+                counts.append((
+                    match["unchanged"], match["modified"], match["removed"],
+                    len(new_chunks) - len(match["matched_new_indices"]),
+                ))
+            pairs += 1
+            if counts[0] != counts[1]:
+                mismatches += 1
+
+    conn.close()
+    return {"pairs": pairs, "mismatches": mismatches}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+# ==============================
+# Benchmark Run
+# ==============================
+
+def run_benchmarks(args):
+
+    workdir = tempfile.mkdtemp(prefix="cdd-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+
+    server = FakeOllamaServer(
+        latency=args.llm_latency,
+        token_latency=args.llm_token_latency,
+        trailing_tokens=args.llm_trailing_tokens,
+    ).start()
+
+    # Must be set before any backend module reads its config
+    os.environ["CDD_DB_PATH"] = db_path
+    os.environ["CDD_OLLAMA_URL"] = server.generate_url
+    os.environ["CDD_OLLAMA_STREAM"] = "0" if args.no_stream else "1"
+    # No trained classifier: every unmatched clause reaches the (fake) LLM
+    os.environ["CDD_CLASSIFIER_PATH"] = os.path.join(workdir, "clause_classifier.joblib")
+    # Off by default so later cases don't just replay verdicts stored by earlier ones
+    os.environ["CDD_REUSE_VERDICTS"] = "1" if args.reuse_verdicts else "0"
+
+    from backend.database import init_db
+    from backend.drift_engine import compute_policy_drift
+    from backend.timeline_engine import compute_timeline_drift
+    from backend.quick_stats_engine import compute_quick_stats
+    from backend.expansion_signal_engine import analyze_text_signals
+    from backend.bulk_analysis import analyze_documents
+    from backend.llm_risk_engine import PROMPT_VERSION
+    from backend.clause_store import dedup_report
+    from backend.metrics import timing_summary, reset
+    from benchmarks.synthetic_corpus import seed_corpus, seed_fixture, generate_history
+
+    init_db()
+    companies = seed_corpus(
+        db_path, args.companies, args.clauses, args.versions, args.churn, seed=args.seed
+    )
+    reset()
+
+    print(f"\nBenchmark corpus: {args.companies} companies x {args.versions} versions "
+          f"x ~{args.clauses} clauses, churn {args.churn}, LLM latency {args.llm_latency}s\n")
+
+    results = {}
+
+    def quiet(fn):
+        # Engines print their reports; keep benchmark output readable
+        def wrapper(arg):
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, "w")
+            try:
+                return fn(arg)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+        return wrapper
+
+    results["drift"] = run_case(
+        "drift", quiet(lambda c: compute_policy_drift(c, "incremental", True)), companies
+    )
+
+    results["drift_fast"] = run_case(
+        "drift_fast", quiet(lambda c: compute_policy_drift(c, "incremental", True, fast_diff=True)),
+        companies,
+    )
+
+    results["timeline"] = run_case(
+        "timeline",
+        quiet(lambda c: compute_timeline_drift(c, True, workers=args.timeline_workers)),
+        companies,
+        items_per_call=args.versions - 1,
+    )
+
+    results["timeline_serial"] = run_case(
+        "timeline_serial", quiet(lambda c: compute_timeline_drift(c, True, workers=1)), companies,
+        items_per_call=args.versions - 1,
+    )
+
+    results["quick_stats_cold"] = run_case(
+        "quick_stats_cold", lambda c: compute_quick_stats(c), companies
+    )
+    results["quick_stats_warm"] = run_case(
+        "quick_stats_warm", lambda c: compute_quick_stats(c), companies
+    )
+
+    # The fixture must match exactly; the synthetic corpus (many
+    # near-duplicate clauses) shows how far fast diff can drift
+    fixture = seed_fixture(db_path, seed=args.seed)
+    parity = {
+        "fixture": fast_diff_parity(db_path, [fixture]),
+        "synthetic": fast_diff_parity(db_path, companies),
+    }
+    for corpus, counts in parity.items():
+        print(f"{'fast_diff_' + corpus:<22} pairs={counts['pairs']} mismatches={counts['mismatches']}")
+
+    documents = generate_history(args.clauses, args.documents, args.churn, seed=args.seed)
+    results["analyze_text"] = run_case(
+        "analyze_text", analyze_text_signals, documents
+    )
+    results["analyze_text_bulk"] = run_case(
+        "analyze_text_bulk",
+        lambda docs: list(analyze_documents([{"id": i, "text": d} for i, d in enumerate(docs)])),
+        [documents],
+        items_per_call=len(documents),
+    )
+
+    conn = sqlite3.connect(db_path)
+    clause_store = dedup_report(conn)
+    conn.close()
+    print(f"{'clause_store':<22} occurrences={clause_store['occurrences']} "
+          f"unique={clause_store['unique_normalized']} dedup_ratio={clause_store['dedup_ratio']}")
+
+    llm_requests = server.requests
+    llm_tokens = server.tokens_sent
+    server.stop()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "companies": args.companies,
+            "clauses": args.clauses,
+            "versions": args.versions,
+            "churn": args.churn,
+            "documents": args.documents,
+            "llm_latency": args.llm_latency,
+            "llm_token_latency": args.llm_token_latency,
+            "llm_trailing_tokens": args.llm_trailing_tokens,
+            "stream": not args.no_stream,
+            "timeline_workers": args.timeline_workers,
+            "reuse_verdicts": args.reuse_verdicts,
+            "seed": args.seed,
+        },
+        "results": results,
+        "fast_diff_parity": parity,
+        "clause_store": clause_store,
+        "llm_requests": llm_requests,
+        "llm_tokens_streamed": llm_tokens,
+        "prompt_version": PROMPT_VERSION,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": timing_summary()["stages"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consent Decay Detector benchmarks")
+    parser.add_argument("--companies", type=int, default=3)
+    parser.add_argument("--clauses", type=int, default=100, help="clauses per version")
+    parser.add_argument("--versions", type=int, default=5, help="versions per company")
+    parser.add_argument("--churn", type=float, default=0.1, help="fraction of clauses changed per version")
+    parser.add_argument("--documents", type=int, default=20, help="documents for analyze-text")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake Ollama latency in seconds")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0,
+                        help="fake Ollama delay per streamed token in seconds")
+    parser.add_argument("--llm-trailing-tokens", type=int, default=0,
+                        help="tokens the fake model emits after its JSON verdict")
+    parser.add_argument("--no-stream", action="store_true", help="use blocking Ollama requests")
+    parser.add_argument("--timeline-workers", type=int, default=4,
+                        help="worker threads for the timeline's per-pair analysis")
+    parser.add_argument("--reuse-verdicts", action="store_true",
+                        help="reuse stored LLM verdicts across companies and runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmarks/results.jsonl",
+                        help="JSONL file; one record is appended per run")
+    args = parser.parse_args(argv)
+
+    record = run_benchmarks(args)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    print(f"\nResults appended to {args.output}")
+
+    # Fast diff must reproduce the full matrix's counts on the regression fixture
+    fixture = record["fast_diff_parity"]["fixture"]
+    if fixture["mismatches"]:
+        print(f"FAIL: fast diff differs from the full matrix on {fixture['mismatches']}"
+              f"/{fixture['pairs']} fixture pairs")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
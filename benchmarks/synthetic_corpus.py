@@ -0,0 +1,206 @@
+import os
+import random
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta
+from backend.text_processing import normalize_text
+from backend.chunking import chunk_text
+
+
+TEST_POLICY = os.path.join(os.path.dirname(__file__), "..", "test_policy.txt")
+
+# Phrases mixed into generated clauses so the expansion/LLM paths get exercised
+EXPANSION_PHRASES = [
+    "We may use this information to train models and improve machine learning systems.",
+    "We may retain historical data for long-term storage and product research.",
+    "Information may be combined across products for cross-platform analysis.",
+    "Automated decision systems may rely on behavioral prediction and profiling.",
+    "We may share aggregated data with external partners and third-party vendors.",
+]
+
+QUALIFIERS = [
+    "where permitted by applicable law",
+    "subject to your settings",
+    "for the purposes described in this policy",
+    "as described in our help center",
+    "in accordance with regional requirements",
+    "to the extent necessary to provide the Services",
+]
+
+
+# ==============================
+# Clause Generation
+# ==============================
+
+def load_base_clauses(path=TEST_POLICY):
+    with open(path, "r") as f:
+        return chunk_text(normalize_text(f.read()))
+
+
+def _variant(rng, base_clauses, serial):
+    """A new, distinct clause derived from a base clause or an expansion phrase."""
+    if rng.random() < 0.15:
+        clause = rng.choice(EXPANSION_PHRASES)
+    else:
+        clause = rng.choice(base_clauses)
+
+    clause = clause.rstrip(".!?")
+    return f"{clause}, {rng.choice(QUALIFIERS)} (ref {serial})."
+
+
+def _modify(rng, clause):
+    """Small wording edit that should stay above the 'modified' threshold."""
+    words = clause.rstrip(".!?").split()
+    if len(words) > 4:
+        words.insert(rng.randrange(1, len(words)), rng.choice(["generally", "also", "only", "typically"]))
+    return " ".join(words) + "."
+
+
+def generate_history(clause_count, version_count, churn_rate, seed=0, base_clauses=None):
+    """
+    Returns a list of policy texts (oldest first).
+    Each version changes roughly churn_rate of its clauses: a third modified,
+    a third removed and a third replaced by brand-new clauses.
+    """
+
+    rng = random.Random(seed)
+    base_clauses = base_clauses or load_base_clauses()
+
+    serial = 0
+    clauses = []
+    for _ in range(clause_count):
+        clauses.append(_variant(rng, base_clauses, serial))
+        serial += 1
+
+    history = ["\n".join(clauses)]
+
+    for _ in range(1, version_count):
+        next_clauses = []
+        for clause in clauses:
+            roll = rng.random()
+            if roll >= churn_rate:
+                next_clauses.append(clause)
+                continue
+
+            action = rng.randrange(3)
+            if action == 0:
+                next_clauses.append(_modify(rng, clause))
+            elif action == 2:
+                next_clauses.append(_variant(rng, base_clauses, serial))
+                serial += 1
+
+        # Keep the document size roughly stable
+        while len(next_clauses) < clause_count:
+            next_clauses.insert(rng.randrange(len(next_clauses) + 1), _variant(rng, base_clauses, serial))
+            serial += 1
+
+        clauses = next_clauses
+        history.append("\n".join(clauses))
+
+    return history
+
+
+def fixture_history(path=TEST_POLICY, seed=0):
+    """
+    Realistic edit history of the sample policy: the first half (as in
+    seed_test_data.py), the full text, one paragraph reworded, and one
+    paragraph dropped. Used as the regression fixture for fast-diff parity.
+    """
+
+    rng = random.Random(seed)
+    with open(path, "r") as f:
+        lines = [line for line in f.read().split("\n") if line.strip()]
+
+    half = lines[:len(lines) // 2]
+
+    edited = list(lines)
+    target = rng.randrange(len(edited))
+    edited[target] = _modify(rng, edited[target])
+
+    dropped = list(edited)
+    del dropped[rng.randrange(len(dropped))]
+
+    return ["\n".join(v) for v in (half, lines, edited, dropped)]
+
+
+# ==============================
+# Database Seeding
+# ==============================
+
+def seed_corpus(db_path, companies, clause_count, version_count, churn_rate, seed=0):
+    """
+    Write synthetic companies into db_path (schema must already exist).
+    Returns the list of company names.
+    """
+
+    base_clauses = load_base_clauses()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    names = []
+    start = datetime(2020, 1, 1)
+
+    for c in range(companies):
+        name = f"SyntheticCo{c:03d}"
+        names.append(name)
+
+        cursor.execute(
+            "INSERT INTO companies (name, url) VALUES (?, ?)",
+            (name, f"https://synthetic-{c}.example.com/privacy"),
+        )
+        company_id = cursor.lastrowid
+
+        history = generate_history(
+            clause_count, version_count, churn_rate,
+            seed=seed * 1000 + c, base_clauses=base_clauses,
+        )
+
+        cursor.executemany("""
+            INSERT INTO policy_versions (company_id, timestamp, hash, content)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (
+                company_id,
+                (start + timedelta(days=30 * v)).strftime("%Y-%m-%d %H:%M:%S"),
+                hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                text,
+            )
+            for v, text in enumerate(history)
+        ])
+
+    conn.commit()
+    conn.close()
+
+    return names
+
+
+def seed_fixture(db_path, name="FixturePolicy", seed=0):
+    """Write the fixture_history company into db_path and return its name."""
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "INSERT INTO companies (name, url) VALUES (?, ?)",
+        (name, "https://fixture.example.com/privacy"),
+    )
+    company_id = cursor.lastrowid
+
+    start = datetime(2020, 1, 1)
+    cursor.executemany("""
+        INSERT INTO policy_versions (company_id, timestamp, hash, content)
+        VALUES (?, ?, ?, ?)
+    """, [
+        (
+            company_id,
+            (start + timedelta(days=90 * v)).strftime("%Y-%m-%d %H:%M:%S"),
+            hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            text,
+        )
+        for v, text in enumerate(fixture_history(seed=seed))
+    ])
+
+    conn.commit()
+    conn.close()
+
+    return name
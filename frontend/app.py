@@ -2,21 +2,40 @@ import sys
 import os
 import sqlite3
 import json
-from flask import Flask, render_template, jsonify, request
+import gzip
+import time
+from functools import wraps
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, make_response
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Add project root to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from backend.database import DB_PATH, init_db
-from backend.text_processing import normalize_text
-from backend.chunking import chunk_text
-from backend.embedding_engine import embed_chunks, compute_similarity_matrix
 from backend.drift_engine import compute_policy_drift
 from backend.timeline_engine import compute_timeline_drift
-from backend.expansion_signal_engine import extract_expansion_signals
+from backend.quick_stats_engine import compute_quick_stats, compute_adjacent_quick_stats
+from backend.expansion_signal_engine import analyze_text_signals
+from backend.clause_index import get_search_index
+from backend.clause_store import compute_clause_diff
+from backend.risk_feed import FORMATS, feed_etag, load_feed
+from backend.metrics import render_prometheus
+from backend.profiling import profile_run
+from backend.bulk_analysis import (
+    MAX_BULK_BYTES,
+    BulkRequestError,
+    parse_bulk_documents,
+    analyze_documents,
+)
 
 app = Flask(__name__)
 
+# Largest request body Werkzeug will read (413 beyond it)
+app.config["MAX_CONTENT_LENGTH"] = MAX_BULK_BYTES
+
+# Per-request profiling (?profile=1) writes files on the server; off unless enabled
+app.config["ALLOW_PROFILING"] = os.environ.get("CDD_ALLOW_PROFILING", "0") == "1"
+
 
 # ==========================================
 # Pages
@@ -27,6 +46,39 @@ def index():
     return render_template("index.html")
 
 
+# ==========================================
+# Profiling
+# ==========================================
+
+def profiled(view):
+    """
+    ?profile=1 (or header X-CDD-Profile: 1) profiles this request;
+    ?profile=pstats for cProfile output. File paths come back in the
+    X-Profile-Files header. Costs nothing when not requested. Refused
+    (403) unless CDD_ALLOW_PROFILING=1.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        flag = request.args.get("profile") or request.headers.get("X-CDD-Profile")
+        if not flag or flag == "0":
+            return view(*args, **kwargs)
+
+        if not app.config["ALLOW_PROFILING"]:
+            return jsonify({"error": "Profiling is disabled (set CDD_ALLOW_PROFILING=1)"}), 403
+
+        fmt = "pstats" if flag == "pstats" else "collapsed"
+        with profile_run(f"{request.endpoint}-{request.view_args.get('name', '')}", fmt=fmt) as profile:
+            response = make_response(view(*args, **kwargs))
+
+        if profile["files"]:
+            response.headers["X-Profile-Files"] = ",".join(profile["files"])
+        else:
+            response.headers["X-Profile-Skipped"] = profile["skipped"]
+        return response
+
+    return wrapper
+
+
 # ==========================================
 # API Endpoints
 # ==========================================
@@ -125,11 +177,16 @@ def api_version_content(name, version_id):
 
 
 @app.route("/api/company/<name>/drift")
+@profiled
 def api_drift(name):
-    """Run baseline and incremental drift analysis."""
+    """
+    Run baseline and incremental drift analysis.
+    ?fast=1 only matches clauses inside the edited regions.
+    """
+    fast_diff = request.args.get("fast") == "1"
     try:
-        baseline = compute_policy_drift(name, mode="baseline", return_data=True)
-        incremental = compute_policy_drift(name, mode="incremental", return_data=True)
+        baseline = compute_policy_drift(name, mode="baseline", return_data=True, fast_diff=fast_diff)
+        incremental = compute_policy_drift(name, mode="incremental", return_data=True, fast_diff=fast_diff)
 
         return jsonify({
             "baseline": baseline,
@@ -140,140 +197,213 @@ def api_drift(name):
 
 
 @app.route("/api/company/<name>/timeline")
+@profiled
 def api_timeline(name):
-    """Run timeline drift analysis."""
+    """
+    Run timeline drift analysis (?fast=1 as for drift).
+    A window (?since=<date>&until=<date>, ?since_version=<id>&until_version=<id>,
+    ?last=<N changes>) starts from the stored CDI checkpoint at its start.
+    """
+    fast_diff = request.args.get("fast") == "1"
+    since = request.args.get("since_version", type=int)
+    if since is None:
+        since = request.args.get("since")
+    until = request.args.get("until_version", type=int)
+    if until is None:
+        until = request.args.get("until")
     try:
-        timeline = compute_timeline_drift(name, return_data=True)
+        timeline = compute_timeline_drift(
+            name, return_data=True, fast_diff=fast_diff,
+            since=since, until=until, last=request.args.get("last", type=int),
+        )
         return jsonify({"timeline": timeline})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/company/<name>/quick-stats")
+@profiled
 def api_quick_stats(name):
-    """Get quick structural stats without LLM (fast)."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    """
+    Get quick structural stats without LLM (fast).
+    ?old=<id>&new=<id> picks the pair (default: earliest vs latest),
+    ?mode=adjacent returns every adjacent pair.
+    """
+    if request.args.get("mode") == "adjacent":
+        result, error = compute_adjacent_quick_stats(name)
+    else:
+        result, error = compute_quick_stats(
+            name,
+            old_id=request.args.get("old", type=int),
+            new_id=request.args.get("new", type=int),
+        )
 
-    cursor.execute("SELECT id FROM companies WHERE name=?", (name,))
-    company = cursor.fetchone()
-    if not company:
-        conn.close()
-        return jsonify({"error": "Company not found"}), 404
+    if error:
+        message, status = error
+        return jsonify({"error": message}), status
 
-    company_id = company[0]
+    return jsonify(result)
 
-    cursor.execute("""
-        SELECT content, timestamp FROM policy_versions
-        WHERE company_id=?
-        ORDER BY timestamp ASC
-    """, (company_id,))
 
-    versions = cursor.fetchall()
-    conn.close()
+@app.route("/api/company/<name>/clause-diff")
+@profiled
+def api_clause_diff(name):
+    """
+    Exact clause-level diff between two versions (no embeddings, no LLM).
+    ?old=<id>&new=<id> picks the pair (default: earliest vs latest).
+    """
+    result, error = compute_clause_diff(
+        name,
+        old_id=request.args.get("old", type=int),
+        new_id=request.args.get("new", type=int),
+    )
+
+    if error:
+        message, status = error
+        return jsonify({"error": message}), status
+
+    return jsonify(result)
 
-    if len(versions) < 2:
-        return jsonify({"error": "Not enough versions for comparison"}), 400
 
-    old_text, old_time = versions[0]
-    new_text, new_time = versions[-1]
+@app.route("/api/analyze-text", methods=["POST"])
+@profiled
+def api_analyze_text():
+    """Analyze pasted policy text for expansion signals."""
+    data = request.get_json()
+    text = data.get("text", "")
 
-    old_clean = normalize_text(old_text)
-    new_clean = normalize_text(new_text)
+    if not text.strip():
+        return jsonify({"error": "No text provided"}), 400
 
-    old_chunks = chunk_text(old_clean)
-    new_chunks = chunk_text(new_clean)
+    return jsonify(analyze_text_signals(text))
 
-    old_embeddings = embed_chunks(old_chunks)
-    new_embeddings = embed_chunks(new_chunks)
 
-    sim_matrix = compute_similarity_matrix(old_embeddings, new_embeddings)
+def _read_body(limit):
+    """
+    The request body, or None if it's larger than limit. Chunked uploads
+    have no Content-Length to check first, so reading stops past the limit
+    (get_data() would silently truncate at MAX_CONTENT_LENGTH instead).
+    """
 
-    unchanged = modified = removed = 0
-    matched_new = set()
+    body = bytearray()
+    try:
+        while len(body) <= limit:
+            chunk = request.stream.read(limit + 1 - len(body))
+            if not chunk:
+                break
+            body.extend(chunk)
+    except RequestEntityTooLarge:
+        return None
+
+    return bytes(body) if len(body) <= limit else None
+
+
+@app.route("/api/analyze-text/bulk", methods=["POST"])
+def api_analyze_text_bulk():
+    """
+    Screen many documents in one request.
+    Body is a JSON array or NDJSON; results stream back as NDJSON.
+    """
+    body = _read_body(MAX_BULK_BYTES)
+    if body is None:
+        return jsonify({"error": f"Request body exceeds {MAX_BULK_BYTES} bytes"}), 413
 
-    for row in sim_matrix:
-        max_sim = max(row)
-        max_idx = row.tolist().index(max_sim)
+    try:
+        documents = parse_bulk_documents(body, request.content_type or "")
+    except BulkRequestError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    def generate():
+        errors = 0
+        for result in analyze_documents(documents):
+            if "error" in result:
+                errors += 1
+            yield json.dumps(result) + "\n"
+
+        yield json.dumps({
+            "done": True,
+            "documents": len(documents),
+            "errors": errors,
+        }) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route("/api/search/clauses")
+@profiled
+def api_search_clauses():
+    """
+    Top-k semantic search over every indexed clause.
+    Filters: company (repeatable), since/until (first seen), category (repeatable).
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
+
+    k = min(max(request.args.get("k", 10, type=int), 1), 100)
 
-        if max_sim > 0.95:
-            unchanged += 1
-            matched_new.add(max_idx)
-        elif max_sim > 0.75:
-            modified += 1
-            matched_new.add(max_idx)
-        else:
-            removed += 1
-
-    added = len(new_chunks) - len(matched_new)
-
-    # Collect new clauses and their expansion signals
-    new_clauses = []
-    all_signals = {}
-    for j in range(len(new_chunks)):
-        if j not in matched_new:
-            signals = extract_expansion_signals(new_chunks[j])
-            new_clauses.append({
-                "text": new_chunks[j],
-                "expansion_signals": signals,
-            })
-            for s in signals:
-                all_signals[s] = all_signals.get(s, 0) + 1
-
-    total_old = len(old_chunks)
-    structural_drift = 0.0
-    if total_old > 0:
-        structural_drift = round(
-            ((modified * 0.4 + removed * 0.3 + added * 0.3) / total_old) * 100, 2
+    try:
+        start = time.perf_counter()
+        index = get_search_index()
+        results = index.search(
+            query,
+            k=k,
+            companies=request.args.getlist("company"),
+            since=request.args.get("since"),
+            until=request.args.get("until"),
+            categories=request.args.getlist("category"),
         )
+        took_ms = round((time.perf_counter() - start) * 1000, 2)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify({
-        "company": name,
-        "old_version_date": old_time,
-        "new_version_date": new_time,
-        "total_old_chunks": total_old,
-        "total_new_chunks": len(new_chunks),
-        "unchanged": unchanged,
-        "modified": modified,
-        "removed": removed,
-        "added": added,
-        "structural_drift": structural_drift,
-        "new_clauses": new_clauses,
-        "expansion_signals_summary": all_signals,
+        "query": query,
+        "indexed_clauses": index.indexed,
+        "took_ms": took_ms,
+        "results": results,
     })
 
 
-@app.route("/api/analyze-text", methods=["POST"])
-def api_analyze_text():
-    """Analyze pasted policy text for expansion signals."""
-    data = request.get_json()
-    text = data.get("text", "")
+@app.route("/api/feed")
+def api_feed():
+    """
+    Per-domain consent-risk feed for the browser extension.
+    ?since=<version> returns only domains changed after that version;
+    ?format=binary returns the packed encoding. Served gzipped when the
+    client accepts it, with an ETag for conditional polling.
+    """
+    since = max(request.args.get("since", 0, type=int), 0)
+    fmt = request.args.get("format", "json")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unknown format (use one of: {', '.join(FORMATS)})"}), 400
 
-    if not text.strip():
-        return jsonify({"error": "No text provided"}), 400
+    conn = sqlite3.connect(DB_PATH)
+    version, body = load_feed(conn, since, fmt)
+    conn.close()
 
-    cleaned = normalize_text(text)
-    chunks = chunk_text(cleaned)
+    etag = feed_etag(version, since, fmt)
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        return Response(status=304, headers={"ETag": etag})
 
-    results = []
-    signal_summary = {}
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Feed-Version": str(version),
+        "Vary": "Accept-Encoding",
+    }
+    if request.accept_encodings["gzip"] > 0:
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
 
-    for chunk in chunks:
-        signals = extract_expansion_signals(chunk)
-        if signals:
-            results.append({
-                "text": chunk,
-                "expansion_signals": signals,
-            })
-            for s in signals:
-                signal_summary[s] = signal_summary.get(s, 0) + 1
+    return Response(body, mimetype=FORMATS[fmt], headers=headers)
 
-    return jsonify({
-        "total_chunks": len(chunks),
-        "flagged_chunks": len(results),
-        "flagged_clauses": results,
-        "signal_summary": signal_summary,
-    })
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint for pipeline timings, caches and LLM latency."""
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 
 # ==========================================
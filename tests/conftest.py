@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+
+# Backend modules read their settings at import time: point them at a
+# scratch database and keep them away from any local model, service or LLM
+# (a fake Ollama server is started below)
+_WORKDIR = tempfile.mkdtemp(prefix="cdd-tests-")
+os.environ["CDD_DB_PATH"] = os.path.join(_WORKDIR, "policies.db")
+os.environ["CDD_CLASSIFIER_PATH"] = os.path.join(_WORKDIR, "clause_classifier.joblib")
+os.environ["CDD_PROFILE_DIR"] = os.path.join(_WORKDIR, "profiles")
+os.environ["CDD_EMBEDDING_SERVICE"] = "off"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import itertools
+import pytest
+from benchmarks.fake_ollama import FakeOllamaServer
+
+# One fake LLM for the whole session; its URL is read at import time too
+_OLLAMA = FakeOllamaServer().start()
+os.environ["CDD_OLLAMA_URL"] = _OLLAMA.generate_url
+
+from backend.database import DB_PATH, init_db
+
+init_db()
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(DB_PATH)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def ollama():
+    """The session's fake Ollama server, with outage settings reset afterwards."""
+    from backend.llm_backend import set_backend
+
+    yield _OLLAMA
+    _OLLAMA.error_rate = 0.0
+    _OLLAMA.hang_seconds = 0.0
+    set_backend(None)  # next caller gets a fresh circuit breaker
+
+
+def new_company_name():
+    """Company names are unique per test (the database is shared by all tests)."""
+    return f"TestCo{next(_names):04d}"
+
+
+@pytest.fixture
+def company(conn):
+    """Id of a new company with no versions."""
+
+    name = new_company_name()
+    conn.execute("INSERT INTO companies (name, url) VALUES (?, ?)", (name, f"https://{name.lower()}.example/privacy"))
+    conn.commit()
+    return conn.execute("SELECT id FROM companies WHERE name=?", (name,)).fetchone()[0]
@@ -0,0 +1,42 @@
+import pyarrow.dataset as ds
+from backend.analytics_export import export_dataset
+from backend.versioning import forget_timeline
+
+
+def _pair(conn, company, old_id, new_id, to_time, cdi):
+    conn.execute("""
+        INSERT INTO timeline_pairs (company_id, old_version_id, new_version_id, to_time, fast_diff, irreversible, cdi)
+        VALUES (?, ?, ?, ?, 0, 0, ?)
+    """, (company, old_id, new_id, to_time, cdi))
+    conn.commit()
+
+
+def _current(conn, company, output_dir):
+    """{new_version_id: cdi} left after applying the exported retractions."""
+
+    for name in ("timeline", "timeline_retractions"):
+        export_dataset(conn, name, str(output_dir))
+
+    name = conn.execute("SELECT name FROM companies WHERE id=?", (company,)).fetchone()[0]
+    rows, retractions = (
+        ds.dataset(path, partitioning="hive").to_table().to_pylist() if path.exists() else []
+        for path in (output_dir / "timeline", output_dir / "timeline_retractions")
+    )
+    retracted = {r["pair_id"] for r in retractions}
+    return {r["new_version_id"]: r["cdi"] for r in rows if r["company"] == name and r["id"] not in retracted}
+
+
+def test_retractions_remove_superseded_and_forgotten_pairs(conn, company, tmp_path):
+    base = -1000 * company
+    _pair(conn, company, base, base - 1, "2024-01-01 00:00:00", 10.0)
+    _pair(conn, company, base - 1, base - 2, "2024-06-01 00:00:00", 20.0)
+    assert _current(conn, company, tmp_path) == {base - 1: 10.0, base - 2: 20.0}
+
+    # Recomputed under a new id
+    conn.execute("DELETE FROM timeline_pairs WHERE new_version_id=?", (base - 2,))
+    _pair(conn, company, base - 1, base - 2, "2024-06-01 00:00:00", 35.0)
+    assert _current(conn, company, tmp_path) == {base - 1: 10.0, base - 2: 35.0}
+
+    forget_timeline(conn, company, "2024-03-01 00:00:00")
+    conn.commit()
+    assert _current(conn, company, tmp_path) == {base - 1: 10.0}
@@ -0,0 +1,59 @@
+import io
+import json
+import pytest
+from frontend.app import app
+from backend.bulk_analysis import analyze_documents
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1024)
+    monkeypatch.setattr("frontend.app.MAX_BULK_BYTES", 1024)
+    return app.test_client()
+
+
+def _ndjson(documents):
+    return "".join(json.dumps({"id": i, "text": text}) + "\n" for i, text in enumerate(documents)).encode()
+
+
+def test_results_stream_in_order(client):
+    body = _ndjson(["We may share data with third-party vendors.", "", "We do not sell data."])
+    response = client.post("/api/analyze-text/bulk", data=body, content_type="application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line.get("id") for line in lines[:3]] == [0, 1, 2]
+    assert "error" in lines[1]
+    assert lines[-1] == {"done": True, "documents": 3, "errors": 1}
+
+
+def test_oversized_body_is_rejected(client):
+    body = _ndjson(["x" * 2000])
+    response = client.post("/api/analyze-text/bulk", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 413
+
+
+def test_oversized_chunked_body_is_rejected(client):
+    # No Content-Length: the limit has to hold while reading. WSGI servers
+    # mark dechunked input as terminated.
+    body = _ndjson(["x" * 2000])
+    response = client.post(
+        "/api/analyze-text/bulk",
+        input_stream=io.BytesIO(body),
+        content_type="application/x-ndjson",
+        headers={"Transfer-Encoding": "chunked"},
+        environ_overrides={"wsgi.input_terminated": True},
+    )
+    assert response.status_code == 413
+    assert "exceeds" in response.get_json()["error"]
+
+
+def test_process_pool_keeps_order_and_isolates_errors():
+    documents = [
+        {"id": i, "text": "" if i % 5 == 0 else f"We may retain data for model training ({i})."}
+        for i in range(40)
+    ]
+
+    results = list(analyze_documents(documents, workers=2))
+    assert [r["id"] for r in results] == list(range(40))
+    assert [("error" in r) for r in results] == [i % 5 == 0 for i in range(40)]
+    assert results == list(analyze_documents(documents, workers=1))
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from backend import clause_classifier
+
+
+class ConfidentModel:
+    def predict_proba(self, features):
+        return np.array([[0.01, 0.99]] * len(features))
+
+
+@pytest.fixture
+def trained(monkeypatch):
+    bundle = {"model": ConfidentModel(), "benign_index": 1, "benign_score": 1}
+    monkeypatch.setattr(clause_classifier, "load_classifier", lambda path=None: bundle)
+
+
+def _local(text):
+    verdict, _ = clause_classifier.classify_clause(text, np.zeros(8), [])
+    return verdict is not None
+
+
+def test_audit_sampling_is_deterministic(trained):
+    clauses = [f"Clause {i} describes how we format account settings pages." for i in range(2000)]
+
+    first = [_local(c) for c in clauses]
+    assert first == [_local(c) for c in clauses]
+
+    audited = first.count(False) / len(clauses)
+    assert 0.03 < audited < 0.07
@@ -0,0 +1,54 @@
+from backend.database import DB_PATH
+from backend.crawler import save_new_version, generate_hash
+from backend.clause_index import ClauseSearchIndex, index_missing_versions, reindex_company
+from backend.fingerprint import classify_company_versions
+
+CLAUSES = [
+    "We collect your email address when you register.",
+    "We share purchase history with advertising partners.",
+    "We retain location data for as long as your account is open.",
+]
+
+
+def _store(conn, company_id, text, timestamp):
+    version_id = save_new_version(conn, company_id, generate_hash(text), text)
+    conn.execute("UPDATE policy_versions SET timestamp=? WHERE id=?", (timestamp, version_id))
+    conn.commit()
+    return version_id
+
+
+def _indexed_versions(conn, version_ids):
+    placeholders = ",".join("?" for _ in version_ids)
+    return {r[0] for r in conn.execute(
+        f"SELECT version_id FROM clause_index_versions WHERE version_id IN ({placeholders})", version_ids
+    )}
+
+
+def test_backfill_skips_cosmetic_revisions(conn, company):
+    text = "\n\n".join(CLAUSES)
+    first = _store(conn, company, "Last updated: January 5, 2024\n\n" + text, "2024-01-05 00:00:00")
+    cosmetic = _store(conn, company, "Last updated: March 9, 2024\n\n" + text, "2024-03-09 00:00:00")
+    classify_company_versions(conn, company)
+
+    index_missing_versions(conn)
+    assert _indexed_versions(conn, [first, cosmetic]) == {first}
+
+
+def test_reindexed_rows_leave_the_in_memory_index(conn, company):
+    name = conn.execute("SELECT name FROM companies WHERE id=?", (company,)).fetchone()[0]
+    _store(conn, company, "\n\n".join(CLAUSES), "2024-01-01 00:00:00")
+    reindex_company(conn, company)
+
+    index = ClauseSearchIndex(DB_PATH)
+    index.refresh()
+
+    for _ in range(3):
+        reindex_company(conn, company)
+        index.refresh()
+
+        hits = index.search(CLAUSES[1], k=len(CLAUSES), companies=[name])
+        assert sorted(hit["text"] for hit in hits) == sorted(CLAUSES)
+
+    total = conn.execute("SELECT COUNT(*) FROM clause_index").fetchone()[0]
+    assert index.indexed == len(index.row_ids) == total
+    assert index.size <= total * 2
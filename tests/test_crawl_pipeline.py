@@ -0,0 +1,31 @@
+from conftest import new_company_name
+from backend import crawler
+from backend.crawl_pipeline import run_crawl_pipeline
+
+PAGES = {
+    "https://sections.example/privacy": (
+        '<html><body><p>We collect the information you provide when you register.</p>'
+        '<a href="/privacy/sharing">Sharing</a></body></html>'
+    ),
+    "https://sections.example/privacy/sharing": (
+        "<html><body><p>We share purchase history with advertising partners.</p></body></html>"
+    ),
+}
+
+
+class _Response:
+    def __init__(self, text):
+        self.status_code = 200
+        self.headers = {}
+        self.text = text
+
+
+def test_section_pages_are_extracted_on_the_process_pool(monkeypatch):
+    extracted_here = []
+    monkeypatch.setattr(crawler.requests, "get", lambda url, **kwargs: _Response(PAGES[url]))
+    monkeypatch.setattr(crawler.trafilatura, "extract", lambda html, **kwargs: extracted_here.append(html))
+
+    name = new_company_name()
+    entry = {"company": name, "url": "https://sections.example/privacy", "sections": {"max_depth": 1}}
+    assert run_crawl_pipeline([entry], extract_workers=1) == {name: "changed"}
+    assert extracted_here == []
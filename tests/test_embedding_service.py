@@ -0,0 +1,49 @@
+import os
+import threading
+import numpy as np
+import pytest
+from backend.embedding_service import EmbeddingClient, MicroBatcher, _Handler, _UnixServer, serve
+
+
+@pytest.fixture
+def service(tmp_path):
+    """A service on a socket in a private directory, encoding texts as their lengths."""
+
+    os.chmod(tmp_path, 0o700)
+    path = str(tmp_path / "embedding.sock")
+    server = _UnixServer(path, _Handler)
+    server.model_name = "test-model"
+    server.batcher = MicroBatcher(lambda texts: [[len(t)] for t in texts]).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, path
+    server.shutdown()
+    server.server_close()
+    server.batcher.stop()
+
+
+def test_client_uses_a_socket_owned_by_the_user(service):
+    _, path = service
+    vectors = EmbeddingClient(f"unix:{path}", "test-model").embed(["ab", "abcd"])
+    assert np.array_equal(vectors, np.array([[2], [4]], dtype=np.float32))
+
+
+def test_client_ignores_a_socket_others_can_replace(service, tmp_path):
+    _, path = service
+    os.chmod(tmp_path, 0o777)
+    assert EmbeddingClient(f"unix:{path}", "test-model").embed(["ab"]) is None
+
+
+@pytest.mark.skipif(os.getuid() != 0, reason="needs root to hand the socket to another user")
+def test_client_ignores_a_socket_owned_by_another_user(service):
+    _, path = service
+    os.chown(path, os.getuid() + 1000, -1)
+    assert EmbeddingClient(f"unix:{path}", "test-model").embed(["ab"]) is None
+
+
+def test_serve_leaves_files_it_does_not_own(tmp_path):
+    path = tmp_path / "embedding.sock"
+    path.write_text("not a socket")
+
+    with pytest.raises(PermissionError):
+        serve(f"unix:{path}")
+    assert path.read_text() == "not a socket"
@@ -0,0 +1,9 @@
+from conftest import new_company_name
+from backend.database import DB_PATH
+from benchmarks.synthetic_corpus import seed_fixture
+from benchmarks.run_benchmarks import fast_diff_parity
+
+
+def test_fast_diff_reproduces_full_matrix_on_fixture():
+    name = seed_fixture(DB_PATH, name=new_company_name())
+    assert fast_diff_parity(DB_PATH, [name]) == {"pairs": 3, "mismatches": 0}
@@ -0,0 +1,81 @@
+import os
+from backend.crawler import save_new_version, generate_hash
+from backend.fingerprint import classify_new_version, classify_company_versions, mask_dates
+
+TEST_POLICY = os.path.join(os.path.dirname(__file__), "..", "test_policy.txt")
+
+with open(TEST_POLICY, "r") as f:
+    POLICY = "Last updated: January 5, 2024\n" + f.read() + (
+        "\nYou must be at least 16 years old to use our Services."
+        "\nWe retain account records for 30 days after you delete your account."
+    )
+
+
+def _store(conn, company_id, text):
+    version_id = save_new_version(conn, company_id, generate_hash(text), text)
+    return classify_new_version(conn, company_id, version_id, text)
+
+
+def _revision(conn, company_id, text):
+    """Classification of text stored as the revision after POLICY."""
+    _store(conn, company_id, POLICY)
+    return _store(conn, company_id, text)
+
+
+def test_changed_date_is_cosmetic(conn, company):
+    revised = POLICY.replace("January 5, 2024", "March 12, 2025")
+    assert _revision(conn, company, revised)["cosmetic"]
+
+
+def test_whitespace_and_case_are_cosmetic(conn, company):
+    revised = POLICY.replace("Messages", "MESSAGES").replace(". ", ".   ")
+    assert _revision(conn, company, revised)["cosmetic"]
+
+
+def test_changed_retention_period_is_not_cosmetic(conn, company):
+    revised = POLICY.replace("for 30 days after", "for 3650 days after")
+    assert not _revision(conn, company, revised)["cosmetic"]
+
+
+def test_changed_minimum_age_is_not_cosmetic(conn, company):
+    revised = POLICY.replace("at least 16 years", "at least 13 years")
+    assert not _revision(conn, company, revised)["cosmetic"]
+
+
+def test_added_sentence_is_not_cosmetic(conn, company):
+    revised = POLICY + "\nWe may sell your personal data to third-party advertisers."
+    result = _revision(conn, company, revised)
+    assert not result["cosmetic"]
+    assert result["similarity"] > 0.95  # nearly identical as whole documents
+
+
+def test_backfill_matches_classification_at_crawl(conn, company):
+    _store(conn, company, POLICY)
+    _store(conn, company, POLICY.replace("January 5, 2024", "February 1, 2024"))
+    _store(conn, company, POLICY.replace("for 30 days after", "for 90 days after"))
+
+    assert classify_company_versions(conn, company) == 1
+    flags = [r[0] for r in conn.execute(
+        "SELECT cosmetic FROM policy_versions WHERE company_id=? ORDER BY id", (company,)
+    )]
+    assert flags == [0, 1, 0]
+
+
+def test_only_dates_are_masked():
+    assert mask_dates("Effective 2024-01-05") == "#date#"
+    assert mask_dates("Updated on 5th of March 2023") == "#date#"
+    assert mask_dates("Logs from before Jan. 3, 2023 are deleted.") == "Logs from before #date# are deleted."
+    assert mask_dates("We keep logs for 90 days in May.") == "We keep logs for 90 days in May."
+
+
+def test_reordered_clauses_are_not_cosmetic(conn, company):
+    share = "\n\nWe share your contact list with advertising partners."
+    opt_out = "\n\nYou may opt out of this sharing at any time."
+    _store(conn, company, POLICY + share + opt_out)
+    assert not _store(conn, company, POLICY + opt_out + share)["cosmetic"]
+
+
+def test_dropped_repeated_clause_is_not_cosmetic(conn, company):
+    repeated = "\n\nWe may sell your personal data to third-party advertisers."
+    _store(conn, company, POLICY + repeated + repeated)
+    assert not _store(conn, company, POLICY + repeated)["cosmetic"]
@@ -0,0 +1,91 @@
+import time
+import pytest
+from backend.llm_backend import (
+    CircuitBreaker, LLMBackend, OllamaProvider, set_backend, BREAKER_MIN_CALLS, BREAKER_TIMEOUT_STREAK,
+)
+from backend.llm_risk_engine import analyze_clause_with_llm
+
+READ_TIMEOUT = 0.2
+COOLDOWN = 0.5
+
+CLAUSE = "We may share your data with third-party partners for advertising."
+
+
+@pytest.fixture
+def backend(ollama):
+    backend = LLMBackend(
+        OllamaProvider(url=ollama.generate_url, read_timeout=READ_TIMEOUT),
+        CircuitBreaker(cooldown=COOLDOWN),
+    )
+    set_backend(backend)
+    return backend
+
+
+def _verdict():
+    return analyze_clause_with_llm(["We collect your email address."], CLAUSE)
+
+
+def _assert_outage_handled(backend, ollama):
+    # The breaker opens after its minimum number of failed calls
+    for _ in range(BREAKER_MIN_CALLS):
+        assert _verdict()["verdict_source"] == "rules"
+    assert backend.breaker.state == "open"
+
+    # Open: rule verdicts at once, without contacting the server
+    requests = ollama.requests
+    start = time.perf_counter()
+    verdicts = [_verdict() for _ in range(20)]
+    assert time.perf_counter() - start < READ_TIMEOUT
+    assert {v["verdict_source"] for v in verdicts} == {"rules"}
+    assert ollama.requests == requests
+
+    # Recovered: after the cooldown the probe lets one trial through, which closes it
+    ollama.error_rate = 0.0
+    ollama.hang_seconds = 0.0
+    time.sleep(COOLDOWN)
+    assert _verdict()["verdict_source"] == "llm"
+    assert backend.breaker.state == "closed"
+
+
+def test_server_errors_open_and_close_the_breaker(backend, ollama):
+    ollama.error_rate = 1.0
+    _assert_outage_handled(backend, ollama)
+
+
+def test_hanging_server_opens_and_closes_the_breaker(backend, ollama):
+    ollama.hang_seconds = READ_TIMEOUT * 2
+    _assert_outage_handled(backend, ollama)
+
+
+def test_hanging_server_fails_fast(backend, ollama):
+    ollama.hang_seconds = READ_TIMEOUT * 5
+    requests = ollama.requests
+
+    start = time.perf_counter()
+    for _ in range(BREAKER_TIMEOUT_STREAK):
+        assert _verdict()["verdict_source"] == "rules"
+    assert backend.breaker.state == "open"
+
+    # One read timeout per call, no retries
+    assert ollama.requests - requests == BREAKER_TIMEOUT_STREAK
+    assert time.perf_counter() - start < READ_TIMEOUT * (BREAKER_TIMEOUT_STREAK + 1)
+
+
+def test_only_the_trial_call_decides_while_half_open():
+    breaker = CircuitBreaker(min_calls=1, cooldown=0)
+
+    late = breaker.allow(lambda: True)      # admitted while closed, still running
+    breaker.record(False, breaker.allow(lambda: True))
+    assert breaker.state == "open"
+
+    trial = breaker.allow(lambda: True)
+    assert breaker.state == "half_open" and trial
+    assert not breaker.allow(lambda: True)
+
+    # The late call's outcome neither closes the circuit nor frees the trial slot
+    breaker.record(True, late)
+    assert breaker.state == "half_open"
+    assert not breaker.allow(lambda: True)
+
+    breaker.record(False, trial)
+    assert breaker.state == "open"
@@ -0,0 +1,88 @@
+import os
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from frontend.app import app
+from backend.metrics import stage, bind_context
+from backend.profiling import PROFILE_DIR, profile_run
+
+TEXT = {"text": "We may share your data with third-party partners."}
+
+
+def _profiles():
+    return set(os.listdir(PROFILE_DIR)) if os.path.isdir(PROFILE_DIR) else set()
+
+
+def test_profiling_requests_are_refused_by_default():
+    before = _profiles()
+    client = app.test_client()
+
+    for response in (
+        client.post("/api/analyze-text?profile=1", json=TEXT),
+        client.post("/api/analyze-text", json=TEXT, headers={"X-CDD-Profile": "pstats"}),
+    ):
+        assert response.status_code == 403
+        assert "X-Profile-Files" not in response.headers
+
+    assert _profiles() == before
+    assert client.post("/api/analyze-text", json=TEXT).status_code == 200
+
+
+def test_profiling_requests_when_enabled(monkeypatch):
+    monkeypatch.setitem(app.config, "ALLOW_PROFILING", True)
+
+    response = app.test_client().post("/api/analyze-text?profile=1", json=TEXT)
+    assert response.status_code == 200
+    files = response.headers["X-Profile-Files"].split(",")
+    assert all(os.path.exists(path) for path in files)
+
+
+def test_failed_profile_write_does_not_block_later_profiles(tmp_path):
+    unwritable = tmp_path / "file"
+    unwritable.write_text("")
+
+    with pytest.raises(OSError):
+        with profile_run("broken", output_dir=str(unwritable / "profiles")):
+            pass
+
+    with profile_run("next", output_dir=str(tmp_path)) as profile:
+        pass
+    assert "skipped" not in profile
+    assert profile["files"]
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_only_the_profiled_runs_threads_are_sampled(tmp_path):
+    stop = threading.Event()
+
+    def other_request():
+        while not stop.is_set():
+            with stage("other.request"):
+                _busy(0.01)
+
+    other = threading.Thread(target=other_request)
+    other.start()
+    try:
+        with profile_run("scoped", output_dir=str(tmp_path)) as profile:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                tasks = [executor.submit(bind_context(_worker)) for _ in range(2)]
+                for task in tasks:
+                    task.result()
+    finally:
+        stop.set()
+        other.join()
+
+    stages = profile["summary"]["stages"]
+    assert "profiled.worker" in stages
+    assert "other.request" not in stages
+
+
+def _worker():
+    with stage("profiled.worker"):
+        _busy(0.1)
@@ -0,0 +1,48 @@
+import copy
+from backend.crawler import save_new_version, generate_hash
+from backend.quick_stats_engine import compute_quick_stats
+from backend.scoring_config import SCORING
+from conftest import new_company_name
+
+OLD = "We collect your email address.\nWe use it to send receipts."
+NEW = "We collect your email address.\nWe share it with advertising partners."
+
+
+def _company_with_versions(conn):
+    name = new_company_name()
+    company_id = conn.execute(
+        "INSERT INTO companies (name, url) VALUES (?, ?)", (name, f"https://{name.lower()}.example/privacy")
+    ).lastrowid
+    ids = []
+    for text, timestamp in ((OLD, "2024-01-01 00:00:00"), (NEW, "2024-06-01 00:00:00")):
+        version_id = save_new_version(conn, company_id, generate_hash(text), text)
+        conn.execute("UPDATE policy_versions SET timestamp=? WHERE id=?", (timestamp, version_id))
+        ids.append(version_id)
+    conn.commit()
+    return name, ids
+
+
+def test_cached_pair_of_another_company_is_not_served(conn):
+    name, _ = _company_with_versions(conn)
+    other, (old_id, new_id) = _company_with_versions(conn)
+
+    result, error = compute_quick_stats(other, old_id, new_id)
+    assert error is None and result["company"] == other
+
+    assert compute_quick_stats(other, old_id, new_id)[0]["cached"]
+    assert compute_quick_stats(name, old_id, new_id) == (None, ("Version not found", 404))
+
+
+def test_cached_stats_follow_the_scoring_config(conn):
+    name, (old_id, new_id) = _company_with_versions(conn)
+    doubled = copy.deepcopy(SCORING)
+    doubled["structural_weights"] = {k: v * 2 for k, v in SCORING["structural_weights"].items()}
+
+    current, _ = compute_quick_stats(name, old_id, new_id)
+    assert current["structural_drift"] > 0
+
+    tuned, _ = compute_quick_stats(name, old_id, new_id, scoring=doubled)
+    assert not tuned["cached"]
+    assert tuned["structural_drift"] == round(current["structural_drift"] * 2, 2)
+
+    assert compute_quick_stats(name, old_id, new_id, scoring=doubled)[0]["cached"]
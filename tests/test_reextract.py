@@ -0,0 +1,58 @@
+import sqlite3
+from backend.database import DB_PATH
+from backend.crawler import save_new_version, save_raw_snapshot, extract_text, generate_hash
+from backend.clause_index import index_version
+from backend.clause_store import ingest_version_clauses
+from backend.fingerprint import classify_company_versions
+from backend.crawl_pipeline import reextract_snapshots
+
+PARAGRAPHS = [
+    "We collect the information you provide when you create an account with us.",
+    "We use your contact details to send you service announcements and receipts.",
+    "You can delete your account at any time from the settings page of the app.",
+]
+
+# Stored text that a newer extractor no longer produces (navigation captured as content)
+STALE = "\n".join(PARAGRAPHS + ["Home About Careers Press Blog Help Center and Contact Us pages."])
+
+HTML = "<html><head><title>Privacy</title></head><body><article>" + "".join(
+    f"<p>{p}</p>" for p in PARAGRAPHS
+) + "</article></body></html>"
+
+
+def _store(conn, company_id, text, timestamp, html=None):
+    version_id = save_new_version(conn, company_id, generate_hash(text), text)
+    conn.execute("UPDATE policy_versions SET timestamp=? WHERE id=?", (timestamp, version_id))
+    ingest_version_clauses(conn, version_id, text)
+    if html:
+        save_raw_snapshot(conn, company_id, "https://example.com/privacy", html, version_id)
+    conn.commit()
+    return version_id
+
+
+def test_reextract_rebuilds_everything_derived_from_the_text(conn, company):
+    name = conn.execute("SELECT name FROM companies WHERE id=?", (company,)).fetchone()[0]
+    extracted = extract_text(HTML)
+
+    first = _store(conn, company, extracted, "2024-01-01 00:00:00")
+    second = _store(conn, company, STALE, "2024-06-01 00:00:00", HTML)
+    classify_company_versions(conn, company)
+    for version_id in (first, second):
+        index_version(conn, version_id)
+    conn.execute("""
+        INSERT INTO pair_outputs (old_version_id, new_version_id, fast_diff, old_count, new_count, verdicts)
+        VALUES (?, ?, 0, 3, 4, '[]')
+    """, (first, second))
+    conn.commit()
+
+    assert reextract_snapshots(name, apply=True, extract_workers=1) == (1, 1)
+
+    conn = sqlite3.connect(DB_PATH)
+    assert conn.execute("SELECT content FROM policy_versions WHERE id=?", (second,)).fetchone()[0] == extracted
+    assert conn.execute("SELECT COUNT(*) FROM pair_outputs WHERE new_version_id=?", (second,)).fetchone()[0] == 0
+
+    # Now the same clauses as the first version: cosmetic, and out of the index
+    assert conn.execute("SELECT cosmetic FROM policy_versions WHERE id=?", (second,)).fetchone()[0] == 1
+    indexed = [r[0] for r in conn.execute("SELECT text FROM clause_index WHERE company_id=?", (company,))]
+    assert indexed and not any("Careers" in text for text in indexed)
+    conn.close()
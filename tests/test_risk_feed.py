@@ -0,0 +1,104 @@
+import gzip
+import json
+from conftest import new_company_name
+from frontend.app import app
+from backend.risk_feed import (
+    BINARY_HEADER, BINARY_RECORD, BINARY_REMOVED,
+    feed_domain, feed_version, load_feed, refresh_risk_feed,
+)
+
+
+def _company(conn, url, cdi):
+    """A company at url whose stored timeline ends at cdi."""
+
+    name = new_company_name()
+    cursor = conn.execute("INSERT INTO companies (name, url) VALUES (?, ?)", (name, url))
+    conn.execute("""
+        INSERT INTO timeline_pairs (company_id, old_version_id, new_version_id, to_time, fast_diff, irreversible, cdi)
+        VALUES (?, ?, ?, '2025-01-01 00:00:00', 0, 0, ?)
+    """, (cursor.lastrowid, -cursor.lastrowid, cursor.lastrowid, cdi))
+    conn.commit()
+    return cursor.lastrowid, name
+
+
+def _feed_row(conn, domain):
+    return conn.execute("SELECT company, cdi FROM risk_feed WHERE domain=?", (domain,)).fetchone()
+
+
+def _json_feed(conn, since):
+    return json.loads(gzip.decompress(load_feed(conn, since, "json")[1]))
+
+
+def _binary_feed(conn, since):
+    """{domain: (cdi x 100, level index, flags, epoch)}"""
+    body = gzip.decompress(load_feed(conn, since, "binary")[1])
+    count = BINARY_HEADER.unpack_from(body)[3]
+    offset = BINARY_HEADER.size
+    records = {}
+    for _ in range(count):
+        size = body[offset]
+        domain = body[offset + 1:offset + 1 + size].decode("utf-8")
+        offset += 1 + size
+        records[domain] = BINARY_RECORD.unpack_from(body, offset)
+        offset += BINARY_RECORD.size
+    return records
+
+
+def test_feed_domain_is_the_registrable_domain():
+    assert feed_domain("https://privacycenter.instagram.com/policy") == "instagram.com"
+    assert feed_domain("https://www.whatsapp.com/legal/privacy-policy") == "whatsapp.com"
+    assert feed_domain("https://help.example.co.uk/privacy") == "example.co.uk"
+    assert feed_domain("http://localhost:5000/privacy") == "localhost"
+
+
+def test_companies_sharing_a_domain_keep_the_riskiest_row(conn):
+    domain = f"{new_company_name().lower()}.com"
+    low_id, _ = _company(conn, f"https://privacy.{domain}/policy", 20.0)
+    high_id, high = _company(conn, f"https://www.{domain}/terms", 70.0)
+
+    # Refreshing either company alone must not let it take over the row
+    refresh_risk_feed(conn, [high_id])
+    refresh_risk_feed(conn, [low_id])
+    assert _feed_row(conn, domain) == (high, 70.0)
+    assert _feed_row(conn, f"privacy.{domain}") is None
+
+    version = refresh_risk_feed(conn, [high_id])
+    assert refresh_risk_feed(conn, [low_id]) == version
+
+
+def test_full_rebuild_drops_domains_no_company_maps_to(conn):
+    company_id, name = _company(conn, f"https://{new_company_name().lower()}.com/privacy", 40.0)
+    conn.execute("""
+        INSERT INTO risk_feed (domain, company, cdi, risk_level, irreversible, version)
+        VALUES ('privacy.gone.example', ?, 40.0, 'MEDIUM', 0, 1)
+    """, (name,))
+    conn.commit()
+
+    before = refresh_risk_feed(conn, [company_id])
+    assert _feed_row(conn, "privacy.gone.example") == (name, 40.0)
+
+    version = refresh_risk_feed(conn)
+    assert _feed_row(conn, "privacy.gone.example") == (None, None)
+
+    # Full feeds leave it out; deltas carry a tombstone
+    assert "privacy.gone.example" not in _json_feed(conn, 0)["domains"]
+    assert _json_feed(conn, before)["domains"]["privacy.gone.example"] is None
+    assert _binary_feed(conn, before)["privacy.gone.example"][1] == BINARY_REMOVED
+
+    assert refresh_risk_feed(conn) == version
+
+
+def test_feed_headers_are_parsed(conn):
+    _company(conn, f"https://{new_company_name().lower()}.com/privacy", 40.0)
+    refresh_risk_feed(conn)
+    client = app.test_client()
+
+    response = client.get("/api/feed", headers={"Accept-Encoding": "gzip;q=0, deflate"})
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.data)["version"] == feed_version(conn)
+
+    assert client.get("/api/feed", headers={"Accept-Encoding": "br, gzip"}).headers["Content-Encoding"] == "gzip"
+
+    etag = response.headers["ETag"]
+    assert client.get("/api/feed", headers={"If-None-Match": f'"x", W/{etag}'}).status_code == 304
+    assert client.get("/api/feed", headers={"If-None-Match": etag[:-2] + '"'}).status_code == 200
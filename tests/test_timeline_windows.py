@@ -0,0 +1,82 @@
+import json
+import sqlite3
+import hashlib
+import pytest
+from datetime import datetime, timedelta
+from conftest import new_company_name
+from backend.database import DB_PATH
+from backend.bulk_import import import_snapshots
+from backend.timeline_engine import compute_timeline_drift
+from benchmarks.synthetic_corpus import generate_history
+
+HISTORY = generate_history(clause_count=30, version_count=8, churn_rate=0.25, seed=7)
+
+
+def _timestamp(v):
+    return (datetime(2022, 1, 1) + timedelta(days=30 * v)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _import(tmp_path, name, versions):
+    path = tmp_path / f"{name}-{versions[0]}.jsonl"
+    path.write_text("".join(
+        json.dumps({
+            "company": name, "url": f"https://{name.lower()}.example/privacy",
+            "timestamp": _timestamp(v), "text": HISTORY[v],
+        }) + "\n"
+        for v in versions
+    ))
+    import_snapshots(str(path))
+
+
+def _timeline(name, **window):
+    return compute_timeline_drift(name, True, workers=1, **window)
+
+
+@pytest.fixture
+def name(tmp_path, ollama):
+    """A company holding HISTORY without version 2, with every checkpoint stored."""
+
+    name = new_company_name()
+    _import(tmp_path, name, [0, 1, 3, 4, 5, 6, 7])
+    assert _timeline(name, last=2) == _timeline(name)[-2:]
+    return name
+
+
+def test_bulk_import_mid_history_invalidates_checkpoints(tmp_path, name):
+    _import(tmp_path, name, [2])
+
+    windowed = _timeline(name, last=2)
+    assert windowed == _timeline(name)[-2:]
+
+
+def test_checkpoint_of_another_history_is_not_used(name):
+    # Inserted behind the importer's back: only the chain hash notices
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("""
+        INSERT INTO policy_versions (company_id, timestamp, hash, content)
+        SELECT id, ?, ?, ? FROM companies WHERE name=?
+    """, (_timestamp(2), hashlib.sha256(HISTORY[2].encode()).hexdigest(), HISTORY[2], name))
+    conn.commit()
+    conn.close()
+
+    windowed = _timeline(name, last=2)
+    assert windowed == _timeline(name)[-2:]
+
+
+def test_fallback_verdicts_are_not_checkpoints(name, ollama):
+    # Every pair re-analyzed while the LLM is down
+    ollama.error_rate = 1.0
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("DELETE FROM llm_verdicts")
+    conn.commit()
+    degraded = _timeline(name)
+    conn.close()
+
+    ollama.error_rate = 0.0
+    from backend.llm_backend import set_backend
+    set_backend(None)
+
+    windowed = _timeline(name, last=2)
+    full = _timeline(name)
+    assert windowed == full[-2:]
+    assert degraded != full
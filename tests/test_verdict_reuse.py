@@ -0,0 +1,27 @@
+import hashlib
+from backend.timeline_engine import compute_timeline_drift
+
+BASE = [
+    "We collect the information you provide when you create an account with us.",
+    "We use your contact details to send you service announcements and receipts.",
+    "You can delete your account at any time from the settings page of the app.",
+]
+ADDED = "Our partners may combine your purchase history with offline loyalty programs."
+
+
+def test_run_does_not_reuse_its_own_verdicts(conn, company, ollama):
+    name = conn.execute("SELECT name FROM companies WHERE id=?", (company,)).fetchone()[0]
+
+    # ADDED appears, disappears and comes back: two pairs need a verdict for it
+    history = [BASE, BASE + [ADDED], BASE, BASE + [ADDED]]
+    conn.executemany("""
+        INSERT INTO policy_versions (company_id, timestamp, hash, content) VALUES (?, ?, ?, ?)
+    """, [
+        (company, f"2024-0{v + 1}-01 00:00:00", hashlib.sha256(f"{name}{v}".encode()).hexdigest(), "\n".join(c))
+        for v, c in enumerate(history)
+    ])
+    conn.commit()
+
+    requests = ollama.requests
+    compute_timeline_drift(name, workers=1)
+    assert ollama.requests - requests == 2
@@ -0,0 +1,17 @@
+from backend.crawler import save_new_version, generate_hash
+from backend.versioning import get_company_versions, iter_company_versions, get_earliest_and_latest
+
+
+def test_versions_stored_in_the_same_second_keep_id_order(conn, company):
+    texts = [f"We retain account records for {days} days." for days in (30, 60, 90)]
+    ids = [save_new_version(conn, company, generate_hash(t), t) for t in texts]
+    conn.executemany(
+        "UPDATE policy_versions SET timestamp='2024-01-01 00:00:00' WHERE id=?", [(i,) for i in ids]
+    )
+    conn.commit()
+
+    assert [v[0] for v in get_company_versions(conn.cursor(), company)] == ids
+    assert [v[0] for v in iter_company_versions(conn, company, page_size=2)] == ids
+
+    name = conn.execute("SELECT name FROM companies WHERE id=?", (company,)).fetchone()[0]
+    assert get_earliest_and_latest(name) == (texts[0], texts[-1])